@@ -1,17 +1,20 @@
 import os                                                # Para recorrer carpetas, crear rutas y validar estructuras del dataset
-import pickle                                            # Para guardar embeddings como archivos binarios .pkl (serialización rápida y reproducible)
+import sys                                               # Para importar la galería empaquetada desde script_principal/
 import face_recognition                                  # Librería de reconocimiento facial basada en dlib (detección, extracción de embeddings)
 
-# Carpeta donde se guardarán los archivos .pkl con embeddings serializados
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "script_principal"))
+from galeria_empaquetada import GaleriaEmpaquetada       # Mismo formato que usa el bot (matriz float32 + índice JSON, sin pickle)
+
+# Carpeta de la galería empaquetada (galeria.json + galeria_XXXXXX.f32)
 EMBEDDINGS_DIR = "embeddings/"
-os.makedirs(EMBEDDINGS_DIR, exist_ok=True)               # Crea la carpeta si no existe
+galeria = GaleriaEmpaquetada(EMBEDDINGS_DIR)             # Crea la carpeta si no existe
 
 # Carpeta donde están las imágenes organizadas por persona (dataset de entrada)
 DATASET_PATH = "dataset/"
 
 def generar_embeddings():
     """
-     Genera embeddings faciales para cada persona en el dataset y los guarda como .pkl.
+     Genera embeddings faciales para cada persona en el dataset y los guarda en la galería empaquetada.
     
     Recorre cada subcarpeta, procesa imágenes, detecta caras y guarda vectores de encodings por persona.
     """
@@ -23,10 +26,7 @@ def generar_embeddings():
         if not os.path.isdir(person_folder):
             continue                                     # Ignora archivos sueltos que no sean carpetas
 
-        # Ruta destino para el archivo .pkl de esa persona
-        person_embeddings_path = os.path.join(EMBEDDINGS_DIR, f"{person_name}.pkl")
-
-        if os.path.exists(person_embeddings_path):
+        if galeria.encodings_de(person_name) is not None:
             print(f"⚠️ {person_name} ya tiene embeddings guardados. Se omite.")
             continue                                     # Evita reprocesar si ya existen embeddings
 
@@ -57,11 +57,10 @@ def generar_embeddings():
             except Exception as e:
                 print(f"❌ Error procesando {filename}: {e}")  # Captura errores por imagen corrupta, formato inválido, etc.
 
-        # Serializa y guarda el archivo .pkl si se generaron embeddings correctamente
+        # Guarda la identidad en la galería si se generaron embeddings correctamente
         if person_encodings:
-            with open(person_embeddings_path, "wb") as f:
-                pickle.dump({"encodings": person_encodings, "name": person_name}, f)
-            print(f"\n✅ Embeddings guardados en {person_embeddings_path}")
+            galeria.guardar_identidad(person_name, person_encodings)
+            print(f"\n✅ Embeddings de {person_name} guardados en {EMBEDDINGS_DIR}")
 
     print("\n🚀 Procesamiento completado.")
 
@@ -0,0 +1,136 @@
+# === IMPORTS ===
+import os                                                 # Metadatos (mtime/tamaño) del índice
+import threading                                          # Lock para serializar recargas concurrentes
+import numpy as np                                        # Normas por bloque de la galería
+
+from galeria import Galeria                               # Snapshot inmutable de la base de rostros
+from galeria_empaquetada import GaleriaEmpaquetada        # Formato en disco: matriz float32 mapeable + índice
+from indice_vectorial import IndiceIVF                    # Búsqueda aproximada para galerías grandes
+
+
+class AlmacenEmbeddings:
+    """
+    Mantiene la galería sincronizada con la galería empaquetada de 'embeddings_dir'.
+    Registra mtime y tamaño del índice y sólo lo vuelve a leer cuando cambia.
+    La matriz se mapea en memoria (no se copia) y las normas ||g||² se reutilizan
+    para los bloques de identidades que no cambiaron, así que una recarga cuesta
+    en proporción a lo agregado, no al tamaño de la galería.
+    Cada galería nueva se publica como un snapshot completo reemplazando la
+    referencia de una sola vez: quien lee 'galeria' nunca ve una carga a medias.
+    'indice' elige la búsqueda: "exacto", "ivf" o "auto" (IVF a partir de 'minimo_ivf'
+    embeddings). El índice IVF se guarda en 'indice_ivf.npz', las altas nuevas se le
+    agregan sin reentrenar y sólo se reconstruye tras una compactación o si la galería
+    creció mucho desde el último entrenamiento.
+    Con 'guardar_indice=False' el índice se lee pero nunca se escribe ni se entrena (procesos
+    que sólo consultan la galería que mantiene otro proceso): mientras no aparezca el índice
+    de la galería vigente se usa la búsqueda exacta.
+    """
+
+    def __init__(self, embeddings_dir, indice="auto", nprobe=8, minimo_ivf=50000, guardar_indice=True):
+        # 'embeddings_dir' puede ser un directorio o una GaleriaEmpaquetada ya creada
+        if isinstance(embeddings_dir, GaleriaEmpaquetada):
+            self.empaquetada = embeddings_dir
+        else:
+            self.empaquetada = GaleriaEmpaquetada(embeddings_dir)
+        self.embeddings_dir = self.empaquetada.directorio
+        self.tipo_indice = indice                         # "exacto" | "ivf" | "auto"
+        self.nprobe = nprobe                              # Listas IVF revisadas por consulta (recall vs. velocidad)
+        self.minimo_ivf = minimo_ivf                      # En "auto", embeddings a partir de los cuales se usa IVF
+        self.guardar_indice = guardar_indice              # False: no escribe indice_ivf.npz
+        self.ruta_ivf = os.path.join(self.embeddings_dir, "indice_ivf.npz")
+        self._ivf = None
+        self._firma = None                                # (mtime_ns, tamaño) del índice ya cargado
+        self.esperando_ivf = False                        # Sólo lectura: falta el indice_ivf.npz de esta galería
+        self._firma_ivf = None                            # (mtime_ns, tamaño) de indice_ivf.npz al quedar esperando
+        self._normas = {}                                 # (datos, inicio, cantidad) -> ||g||² del bloque
+        self._lock = threading.Lock()
+        self.revision = 0                                 # Revisión del índice publicada
+        self.galeria = Galeria()                          # Snapshot vigente (sólo lectura)
+
+    @staticmethod
+    def _firma_de(ruta):
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def actualizar(self):
+        """
+        Relee el índice sólo si cambió (o, en sólo lectura, si apareció el índice IVF que
+        faltaba) y publica una nueva galería. Retorna True si la galería cambió.
+        """
+        with self._lock:
+            firma = self._firma_de(self.empaquetada.ruta_indice)
+            if firma is None:
+                return False
+            if firma == self._firma and not (self.esperando_ivf and self._firma_de(self.ruta_ivf) != self._firma_ivf):
+                return False
+
+            try:
+                indice, matriz = self.empaquetada.mapear()
+            except Exception as e:
+                # Índice reemplazado durante una compactación: se reintenta en la próxima pasada
+                print(f"[⚠️] No se pudo leer la galería: {e}")
+                return False
+
+            normas = np.zeros(len(matriz), dtype=np.float32)
+            bloques = []
+            vigentes = {}
+            nuevos = 0
+            for ident in indice["identidades"]:
+                inicio, cantidad = ident["inicio"], ident["cantidad"]
+                clave = (indice["datos"], inicio, cantidad)
+                if clave not in self._normas:
+                    bloque = matriz[inicio:inicio + cantidad]
+                    self._normas[clave] = np.einsum("ij,ij->i", bloque, bloque)
+                    nuevos += 1
+                vigentes[clave] = self._normas[clave]
+                normas[inicio:inicio + cantidad] = vigentes[clave]
+                bloques.append((ident["nombre"], inicio, cantidad))
+            eliminados = len(self._normas) - len(vigentes)
+            self._normas = vigentes
+
+            indice_vec = self._indice_para(indice["datos"], matriz, bloques)
+            self.galeria = Galeria.desde_bloques(matriz, bloques, normas, indice_vec)   # Publicación atómica del snapshot
+            self.revision = indice["revision"]
+            self._firma = firma
+            print(f"[🔁] Galería actualizada (rev {self.revision}): +{nuevos} / -{eliminados} identidades, "
+                  f"{len(self.galeria)} embeddings")
+            return True
+
+    def _indice_para(self, datos, matriz, bloques):
+        """
+        Retorna el índice IVF para esta matriz (cargado, extendido o reentrenado), o None
+        si corresponde la búsqueda exacta.
+        """
+        self.esperando_ivf = False
+        validas = sum(cantidad for _, _, cantidad in bloques)
+        if self.tipo_indice == "exacto" or (self.tipo_indice == "auto" and validas < self.minimo_ivf) or not validas:
+            return None
+
+        sirve = lambda i: (i is not None and i.datos == datos and i.filas <= len(matriz)
+                           and not i.necesita_reentrenar(validas))
+        ivf = self._ivf
+        if not sirve(ivf):
+            ivf = IndiceIVF.cargar(self.ruta_ivf, self.nprobe)   # P. ej. tras una compactación, el que guardó otro proceso
+        if sirve(ivf):
+            if ivf.filas == len(matriz):
+                self._ivf = ivf
+                return ivf
+            ivf = ivf.agregar(matriz)                     # Alta incremental: filas nuevas a sus listas
+            print(f"[🧭] Índice IVF extendido a {ivf.filas} filas")
+        elif not self.guardar_indice:
+            # Sólo lectura: no se entrena; se espera a que el proceso que mantiene la galería lo guarde
+            print("[🧭] Índice IVF de esta galería todavía no disponible, búsqueda exacta")
+            self.esperando_ivf = True
+            self._firma_ivf = self._firma_de(self.ruta_ivf)
+            return None
+        else:
+            filas = np.concatenate([np.arange(inicio, inicio + cantidad) for _, inicio, cantidad in bloques])
+            ivf = IndiceIVF.entrenar(matriz, filas, nprobe=self.nprobe, datos=datos)
+            print(f"[🧭] Índice IVF entrenado: {len(ivf.centroides)} listas sobre {validas} embeddings")
+        if self.guardar_indice:
+            ivf.guardar(self.ruta_ivf)
+        self._ivf = ivf
+        return ivf
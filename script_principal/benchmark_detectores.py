@@ -0,0 +1,73 @@
+# === IMPORTS ===
+import sys                                                # Argumentos de línea de comandos
+import time                                               # Medición de tiempos
+import json                                               # Exportación de resultados
+import cv2                                                # Conversión BGR → RGB
+
+from benchmark_escala import cargar_frames, coincidencias   # Mismos frames y mismo criterio de recall
+from detectores import crear_detector                     # Detectores a comparar
+
+IOU_MIN = 0.3                                             # Cada detector dibuja cajas de distinto tamaño: IoU más laxo
+
+
+def medir(frames, detectores, referencia="hog", upsample=1):
+    """
+    Corre cada detector sobre los mismos frames y mide fps y recall contra las cajas del
+    detector de 'referencia' (por defecto HOG a resolución completa).
+    Retorna una lista de diccionarios (uno por detector).
+    """
+    rgbs = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+    detector_ref = crear_detector(referencia)
+    cajas_ref = [detector_ref.detectar(rgb, upsample) for rgb in rgbs]
+    total_ref = sum(len(c) for c in cajas_ref)
+
+    resultados = []
+    for especificacion in detectores:
+        try:
+            detector = crear_detector(especificacion)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"[⚠️] {especificacion}: {e}")
+            continue
+        if rgbs:
+            detector.detectar(rgbs[0], upsample)              # Calentamiento (carga de la red, etc.)
+
+        inicio = time.perf_counter()
+        detecciones = [detector.detectar(rgb, upsample) for rgb in rgbs]
+        duracion = time.perf_counter() - inicio
+
+        encontradas = sum(coincidencias(r, d, IOU_MIN) for r, d in zip(cajas_ref, detecciones))
+        resultados.append({
+            "detector": detector.nombre,
+            "frames": len(frames),
+            "fps": len(frames) / duracion if duracion > 0 else 0.0,
+            "ms_por_frame": 1000 * duracion / max(1, len(frames)),
+            "rostros_referencia": total_ref,
+            "rostros_detectados": sum(len(d) for d in detecciones),
+            "recall": encontradas / total_ref if total_ref else None,
+        })
+    return resultados
+
+
+# Modo CLI: python benchmark_detectores.py <carpeta_frames> [detectores separados por coma] [salida.json] [--referencia=hog]
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not argumentos:
+        print("Uso: python benchmark_detectores.py <carpeta_frames> [hog,haar,lbp,dnn,haar>hog] [salida.json] "
+              "[--referencia=hog]")
+        sys.exit(1)
+
+    referencia = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--referencia=")), "hog")
+    frames = cargar_frames(argumentos[0])
+    detectores = argumentos[1].split(",") if len(argumentos) > 1 else ["hog", "haar", "lbp", "dnn", "haar>hog", "lbp>hog"]
+    print(f"[📊] {len(frames)} frames, detectores {detectores}, referencia {referencia}")
+
+    resultados = medir(frames, detectores, referencia)
+    print(f"\n{'detector':>12} {'fps':>7} {'ms/frame':>9} {'rostros':>8} {'recall':>7}")
+    for r in resultados:
+        rec = f"{r['recall']:.2f}" if r["recall"] is not None else "-"
+        print(f"{r['detector']:>12} {r['fps']:>7.2f} {r['ms_por_frame']:>9.1f} {r['rostros_detectados']:>8} {rec:>7}")
+
+    if len(argumentos) > 2:
+        with open(argumentos[2], "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n[💾] Resultados guardados en {argumentos[2]}")
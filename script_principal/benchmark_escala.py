@@ -0,0 +1,78 @@
+# === IMPORTS ===
+import os                                                 # Recorrido de la carpeta de frames
+import sys                                                # Argumentos de línea de comandos
+import time                                               # Medición de tiempos
+import json                                               # Exportación de resultados
+import cv2                                                # Lectura de imágenes
+
+from deteccion_rostros import detectar_ubicaciones        # Detección con escala y remapeo
+from seguimiento import iou                               # Coincidencia de cajas contra la referencia
+
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def cargar_frames(carpeta, maximo=None):
+    """
+    Carga (BGR) las imágenes de una carpeta, en orden de nombre.
+    """
+    archivos = sorted(f for f in os.listdir(carpeta) if f.lower().endswith(EXTENSIONES))[:maximo]
+    frames = [cv2.imread(os.path.join(carpeta, f)) for f in archivos]
+    return [f for f in frames if f is not None]
+
+
+def coincidencias(referencia, detectadas, iou_min=0.5):
+    """
+    Cantidad de cajas de referencia que tienen una detección con IoU >= iou_min.
+    """
+    return sum(1 for ref in referencia if any(iou(ref, d) >= iou_min for d in detectadas))
+
+
+def medir(frames, escalas, upsample_si_vacio=False):
+    """
+    Usa la detección a resolución completa como referencia y, para cada escala,
+    mide fps de detección y recall contra esa referencia.
+    Retorna una lista de diccionarios (uno por escala).
+    """
+    referencia = [detectar_ubicaciones(f, escala=1.0)[1] for f in frames]
+    total_ref = sum(len(r) for r in referencia)
+
+    resultados = []
+    for escala in escalas:
+        inicio = time.perf_counter()
+        detecciones = [detectar_ubicaciones(f, escala=escala, upsample_si_vacio=upsample_si_vacio)[1] for f in frames]
+        duracion = time.perf_counter() - inicio
+
+        encontradas = sum(coincidencias(r, d) for r, d in zip(referencia, detecciones))
+        resultados.append({
+            "escala": escala,
+            "upsample_si_vacio": upsample_si_vacio,
+            "frames": len(frames),
+            "fps": len(frames) / duracion if duracion > 0 else 0.0,
+            "ms_por_frame": 1000 * duracion / max(1, len(frames)),
+            "rostros_referencia": total_ref,
+            "rostros_detectados": sum(len(d) for d in detecciones),
+            "recall": encontradas / total_ref if total_ref else None,
+        })
+    return resultados
+
+
+# Modo CLI: python benchmark_escala.py <carpeta_frames> [escalas separadas por coma] [salida.json]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python benchmark_escala.py <carpeta_frames> [1.0,0.75,0.5,0.25] [salida.json]")
+        sys.exit(1)
+
+    frames = cargar_frames(sys.argv[1])
+    escalas = [float(e) for e in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1.0, 0.75, 0.5, 0.25]
+    print(f"[📊] {len(frames)} frames, escalas {escalas}")
+
+    resultados = medir(frames, escalas) + medir(frames, [e for e in escalas if e < 1.0], upsample_si_vacio=True)
+    print(f"\n{'escala':>7} {'upsample':>9} {'fps':>7} {'ms/frame':>9} {'recall':>7}")
+    for r in resultados:
+        rec = f"{r['recall']:.2f}" if r["recall"] is not None else "-"
+        print(f"{r['escala']:>7.2f} {str(r['upsample_si_vacio']):>9} {r['fps']:>7.2f} {r['ms_por_frame']:>9.1f} {rec:>7}")
+
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n[💾] Resultados guardados en {sys.argv[3]}")
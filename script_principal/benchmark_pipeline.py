@@ -0,0 +1,153 @@
+# === IMPORTS ===
+import os                                                 # Rutas, wait4 (CPU total del proceso hijo)
+import sys                                                # Argumentos de línea de comandos
+import json                                               # Resultados por corrida
+import time                                               # Duración de cada corrida
+import shutil                                             # Limpieza de los directorios temporales
+import tempfile                                           # Directorio de trabajo aislado por corrida
+import subprocess                                         # Cada corrida en un proceso propio (memoria pico limpia)
+import numpy as np                                        # Embeddings de relleno para las galerías grandes
+
+from galeria_empaquetada import GaleriaEmpaquetada        # Galería de cada corrida
+from constructor_embeddings import _codificar_imagen      # Encodings de las personas conocidas del fixture
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cap_rostro.py")
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")
+GALERIAS_POR_DEFECTO = [10, 1000, 10000, 100000]
+POR_IDENTIDAD_RELLENO = 20                                # Embeddings por identidad de relleno (como una ráfaga real)
+
+
+def codificar_conocidos(carpeta):
+    """
+    Encodings de las personas conocidas del fixture: '<carpeta>/<Nombre>/*.jpg'.
+    """
+    conocidos = {}
+    if not os.path.isdir(carpeta):
+        return conocidos
+    for nombre in sorted(os.listdir(carpeta)):
+        ruta = os.path.join(carpeta, nombre)
+        if not os.path.isdir(ruta):
+            continue
+        encs = [_codificar_imagen(os.path.join(ruta, f))[0] for f in sorted(os.listdir(ruta))
+                if f.lower().endswith(EXTENSIONES)]
+        encs = [e for e in encs if e is not None]
+        if encs:
+            conocidos[nombre] = np.array(encs, dtype=np.float32)
+    return conocidos
+
+
+def preparar_galeria(directorio, conocidos, tamano, semilla=0):
+    """
+    Arma en 'directorio' una galería con las personas conocidas más identidades de
+    relleno (vectores aleatorios lejos de cualquier rostro real) hasta 'tamano' embeddings.
+    """
+    identidades = dict(conocidos)
+    faltan = tamano - sum(len(e) for e in conocidos.values())
+    rng = np.random.default_rng(semilla)
+    i = 0
+    while faltan > 0:
+        cantidad = min(POR_IDENTIDAD_RELLENO, faltan)
+        centro = rng.normal(0, 0.09, 128)
+        identidades[f"relleno_{i:06d}"] = centro + rng.normal(0, 0.02, (cantidad, 128))
+        faltan -= cantidad
+        i += 1
+    if identidades:
+        GaleriaEmpaquetada(directorio).guardar_identidades(identidades)
+
+
+def correr(escena, conocidos, tamano, nativa=False):
+    """
+    Corre cap_rostro.py en modo replay sobre 'escena' en un directorio temporal propio.
+    Retorna el resultado del replay (fps, CPU, memoria pico, latencias por etapa) más
+    el tiempo y CPU totales del proceso, arranque incluido.
+    """
+    trabajo = tempfile.mkdtemp(prefix="bench_")
+    try:
+        preparar_galeria(os.path.join(trabajo, "embeddings"), conocidos, tamano)
+        salida = os.path.join(trabajo, "metricas.json")
+        comando = [sys.executable, SCRIPT, "--replay", os.path.abspath(escena), "--metricas", salida]
+        if not nativa:
+            comando.append("--maxima")
+
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(comando, cwd=trabajo, stdout=subprocess.DEVNULL)
+        if hasattr(os, "wait4"):
+            _, estado, uso = os.wait4(proceso.pid, 0)
+            proceso.returncode = os.waitstatus_to_exitcode(estado)
+            cpu_total = uso.ru_utime + uso.ru_stime
+        else:
+            proceso.wait()
+            cpu_total = None
+        total_s = time.perf_counter() - inicio
+
+        if proceso.returncode != 0 or not os.path.exists(salida):
+            return {"error": f"cap_rostro.py terminó con código {proceso.returncode}"}
+        with open(salida, "r", encoding="utf-8") as f:
+            resultado = json.load(f)
+
+        procesados = resultado["metricas"]["contadores"].get("frames_procesados", 0)
+        resultado.update({
+            "fps": procesados / resultado["duracion_s"] if resultado["duracion_s"] else 0.0,
+            "proceso_s": total_s,                         # Incluye arranque y carga de la galería
+            "cpu_total_s": cpu_total,                     # Idem, en CPU
+            "cpu_ms_por_frame": 1000 * resultado["cpu_s"] / procesados if procesados else None,
+        })
+        return resultado
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+
+def suite(fixtures, galerias, nativa=False):
+    """
+    Corre cada escena de '<fixtures>/escenas/' con cada tamaño de galería.
+    Las personas de '<fixtures>/conocidos/<Nombre>/' se enrolan en todas las galerías.
+    """
+    conocidos = codificar_conocidos(os.path.join(fixtures, "conocidos"))
+    carpeta_escenas = os.path.join(fixtures, "escenas")
+    escenas = sorted(os.listdir(carpeta_escenas))
+    print(f"[📊] {len(escenas)} escenas, {len(conocidos)} conocidos, galerías {galerias}")
+
+    corridas = []
+    for escena in escenas:
+        for tamano in galerias:
+            print(f"[▶️] {escena} / galería {tamano}...")
+            resultado = correr(os.path.join(carpeta_escenas, escena), conocidos, tamano, nativa)
+            resultado.update({"escena": escena, "galeria": tamano})
+            corridas.append(resultado)
+    return {"fecha": time.strftime("%Y-%m-%d %H:%M:%S"), "modo": "nativa" if nativa else "maxima",
+            "python": sys.version.split()[0], "cpus": os.cpu_count(), "corridas": corridas}
+
+
+def _ms(etapas, etapa, clave):
+    valor = etapas.get(etapa, {}).get(clave)
+    return f"{1000 * valor:.1f}" if valor is not None else "-"
+
+
+# Modo CLI: python benchmark_pipeline.py <fixtures> [salida.json] [galerías separadas por coma] [--nativa]
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not argumentos:
+        print("Uso: python benchmark_pipeline.py <fixtures> [salida.json] [10,1000,10000,100000] [--nativa]")
+        sys.exit(1)
+
+    galerias = [int(g) for g in argumentos[2].split(",")] if len(argumentos) > 2 else GALERIAS_POR_DEFECTO
+    reporte = suite(argumentos[0], galerias, nativa="--nativa" in sys.argv)
+
+    print(f"\n{'escena':<14} {'galería':>8} {'fps':>7} {'cpu ms/f':>9} {'mem MB':>7} "
+          f"{'det p50/p95':>12} {'cod p50/p95':>12} {'comp p95':>9} {'alertas':>8}")
+    for r in reporte["corridas"]:
+        if "error" in r:
+            print(f"{r['escena']:<14} {r['galeria']:>8} {r['error']}")
+            continue
+        etapas = r["metricas"]["etapas"]
+        cpu = f"{r['cpu_ms_por_frame']:.1f}" if r["cpu_ms_por_frame"] is not None else "-"
+        mem = f"{r['memoria_pico_mb']:.0f}" if r["memoria_pico_mb"] is not None else "-"
+        print(f"{r['escena']:<14} {r['galeria']:>8} {r['fps']:>7.1f} {cpu:>9} {mem:>7} "
+              f"{_ms(etapas, 'deteccion', 'p50') + '/' + _ms(etapas, 'deteccion', 'p95'):>12} "
+              f"{_ms(etapas, 'codificacion', 'p50') + '/' + _ms(etapas, 'codificacion', 'p95'):>12} "
+              f"{_ms(etapas, 'comparacion', 'p95'):>9} {r['alertas']:>8}")
+
+    if len(argumentos) > 1:
+        with open(argumentos[1], "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"\n[💾] Resultados guardados en {argumentos[1]}")
@@ -0,0 +1,323 @@
+# === IMPORTS ===
+import os                                                 # Recorrido de carpetas, archivos de resultados
+import re                                                 # Fecha/hora de inicio en el nombre del archivo
+import csv                                                # Línea de tiempo exportable a planilla
+import sys                                                # Salida con error
+import json                                               # Resultados por tramo y línea de tiempo
+import time                                               # Velocidad respecto del tiempo real
+import hashlib                                            # Clave estable de cada tramo (para reanudar)
+import argparse                                           # Opciones de la línea de comandos
+from datetime import datetime, timedelta                  # Hora absoluta de cada coincidencia
+from concurrent.futures import ProcessPoolExecutor, as_completed   # Tramos en paralelo
+import cv2                                                # Lectura de video y miniaturas
+import numpy as np                                        # Encodings de la imagen de consulta
+
+from galeria import Galeria                               # Comparación en lote contra la base
+from almacen_embeddings import AlmacenEmbeddings          # Galería empaquetada mapeada en memoria (compartida)
+from deteccion_rostros import detectar_ubicaciones, codificar_rostros   # Mismo pipeline que cap_rostro.py
+from detector_movimiento import DetectorMovimiento        # Compuerta por movimiento entre muestras
+
+EXTENSIONES_VIDEO = (".mp4", ".mkv", ".avi", ".mov", ".ts", ".h264", ".dav")
+PATRON_FECHA = re.compile(r"(\d{8})[_\-T]?(\d{6})")       # p. ej. camara1_20240315_221500.mp4
+VERSION_TRAMO = 1                                         # Cambia si cambia el formato de los resultados por tramo
+
+# Estado de cada proceso del pool (se carga una vez por proceso)
+_galeria = None
+_opciones = None
+
+
+# ----------------------------------- planificación -----------------------------------
+def listar_videos(rutas):
+    """
+    Expande archivos y carpetas (recursivo) a la lista ordenada de videos.
+    """
+    videos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, archivos in os.walk(ruta):
+                videos += [os.path.join(raiz, a) for a in archivos if a.lower().endswith(EXTENSIONES_VIDEO)]
+        elif os.path.isfile(ruta):
+            videos.append(ruta)
+    return sorted(set(os.path.abspath(v) for v in videos))
+
+
+def hora_inicio(ruta):
+    """
+    Fecha/hora de inicio de la grabación si figura en el nombre del archivo, o None.
+    """
+    m = PATRON_FECHA.search(os.path.basename(ruta))
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(1) + m.group(2), "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+def planificar(videos, tramo_s):
+    """
+    Divide cada video en tramos de 'tramo_s' segundos. Retorna la lista de tareas.
+    """
+    tareas = []
+    for video in videos:
+        cap = cv2.VideoCapture(video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if frames <= 0:
+            print(f"[⚠️] No se pudo leer la duración de {video}, se omite")
+            continue
+        duracion = frames / fps
+        inicio = 0.0
+        while inicio < duracion:
+            tareas.append({"archivo": video, "inicio": inicio, "fin": min(duracion, inicio + tramo_s), "fps": fps})
+            inicio += tramo_s
+    return tareas
+
+
+def clave_tramo(tarea, opciones):
+    """
+    Identificador estable del tramo y de los parámetros que afectan su resultado.
+    """
+    st = os.stat(tarea["archivo"])
+    datos = [VERSION_TRAMO, tarea["archivo"], st.st_size, int(st.st_mtime), round(tarea["inicio"], 3),
+             round(tarea["fin"], 3), opciones["paso_s"], opciones["escala"], opciones["tolerancia"],
+             opciones["movimiento"], opciones["firma_galeria"], opciones["detector"]]
+    return hashlib.sha1(json.dumps(datos).encode()).hexdigest()[:16]
+
+
+# ------------------------------------ trabajadores ------------------------------------
+def _iniciar_trabajador(embeddings_dir, consulta, opciones):
+    """
+    Carga la galería una vez por proceso: la empaquetada se mapea en memoria (el sistema
+    operativo comparte las páginas entre procesos) o se arma con la imagen de consulta.
+    El índice IVF lo prepara main() antes del pool; acá sólo se lee, nunca se entrena.
+    """
+    global _galeria, _opciones
+    cv2.setNumThreads(1)                                  # Un hilo por proceso: el paralelismo lo da el pool
+    _opciones = opciones
+    if consulta is not None:
+        _galeria = Galeria({consulta["nombre"]: np.asarray(consulta["encodings"], dtype=np.float32)})
+    else:
+        almacen = AlmacenEmbeddings(embeddings_dir, indice=opciones["indice"], guardar_indice=False)
+        almacen.actualizar()
+        _galeria = almacen.galeria
+
+
+def _miniatura(recorte, ruta, lado=160):
+    alto, ancho = recorte.shape[:2]
+    factor = lado / max(alto, ancho, 1)
+    if factor < 1:
+        recorte = cv2.resize(recorte, (max(1, int(ancho * factor)), max(1, int(alto * factor))), interpolation=cv2.INTER_AREA)
+    cv2.imwrite(ruta, recorte)
+
+
+def _procesar_tramo(tarea):
+    """
+    Recorre un tramo de video muestreando un frame cada 'paso_s' segundos (los demás sólo
+    se avanzan con grab()), filtra por movimiento y compara los rostros con la galería.
+    Escribe el resultado del tramo (y sus miniaturas) en disco y lo retorna.
+    """
+    op = _opciones
+    fps = tarea["fps"]
+    paso = max(1, int(round(op["paso_s"] * fps)))
+    primero, ultimo = int(tarea["inicio"] * fps), int(tarea["fin"] * fps)
+    movimiento = DetectorMovimiento(rechequeo=op["rechequeo_s"]) if op["movimiento"] else None
+
+    cap = cv2.VideoCapture(tarea["archivo"])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, primero)
+    muestreados = analizados = 0
+    habia_rostros = False                                 # Mientras hay rostros se analiza cada muestra
+    coincidencias = []
+    for indice in range(primero, ultimo):
+        if (indice - primero) % paso:
+            if not cap.grab():                            # Avanza sin convertir el frame
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            break
+        muestreados += 1
+        t = indice / fps
+
+        if movimiento is not None:
+            pasa, regiones = movimiento.evaluar(frame, forzar=habia_rostros, ahora=t)   # Reloj del video
+            if not pasa:
+                continue
+        else:
+            regiones = None
+        analizados += 1
+
+        rgb, ubicaciones = detectar_ubicaciones(frame, op["detector"], regiones, op["escala"])
+        rostros = codificar_rostros(frame, rgb, ubicaciones)
+        habia_rostros = bool(rostros)
+        resultados = _galeria.identificar([r["encoding"] for r in rostros], tolerancia=op["tolerancia"])
+        for rostro, resultado in zip(rostros, resultados):
+            nombre = resultado["nombre"]
+            if nombre is None or (op["personas"] and nombre not in op["personas"]):
+                continue
+            miniatura = f"{tarea['clave']}_{indice:08d}_{len(coincidencias)}.jpg"
+            _miniatura(rostro["recorte"], os.path.join(op["salida"], "miniaturas", miniatura))
+            coincidencias.append({"persona": nombre, "t": round(t, 2), "distancia": round(resultado["distancia"], 4),
+                                  "ubicacion": list(rostro["ubicacion"]), "miniatura": miniatura})
+    cap.release()
+
+    resultado = dict(tarea, muestreados=muestreados, analizados=analizados, coincidencias=coincidencias)
+    ruta = os.path.join(op["salida"], "tramos", f"{tarea['clave']}.json")
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)                       # Un tramo existe sólo si terminó completo
+    return resultado
+
+
+# ----------------------------------- línea de tiempo -----------------------------------
+def armar_linea_de_tiempo(resultados, separacion_s):
+    """
+    Agrupa las coincidencias de una misma persona en un mismo archivo separadas por menos
+    de 'separacion_s' en apariciones (desde, hasta, mejor distancia y su miniatura).
+    """
+    por_clave = {}
+    for r in resultados:
+        for c in r["coincidencias"]:
+            por_clave.setdefault((c["persona"], r["archivo"]), []).append(c)
+
+    apariciones = []
+    for (persona, archivo), lista in por_clave.items():
+        inicio_grabacion = hora_inicio(archivo)
+        actual = None
+        for c in sorted(lista, key=lambda c: c["t"]):
+            if actual is None or c["t"] - actual["hasta"] > separacion_s:
+                actual = {"persona": persona, "camara": os.path.basename(os.path.dirname(archivo)),
+                          "archivo": archivo, "desde": c["t"], "hasta": c["t"], "detecciones": 0,
+                          "distancia": c["distancia"], "miniatura": c["miniatura"]}
+                apariciones.append(actual)
+            actual["hasta"] = c["t"]
+            actual["detecciones"] += 1
+            if c["distancia"] < actual["distancia"]:
+                actual["distancia"], actual["miniatura"] = c["distancia"], c["miniatura"]
+        if inicio_grabacion is not None:
+            for a in apariciones:
+                if a["archivo"] == archivo and "hora_desde" not in a:
+                    a["hora_desde"] = (inicio_grabacion + timedelta(seconds=a["desde"])).strftime("%Y-%m-%d %H:%M:%S")
+                    a["hora_hasta"] = (inicio_grabacion + timedelta(seconds=a["hasta"])).strftime("%Y-%m-%d %H:%M:%S")
+
+    apariciones.sort(key=lambda a: (a.get("hora_desde", ""), a["archivo"], a["desde"]))
+    return apariciones
+
+
+def guardar_linea_de_tiempo(salida, apariciones):
+    with open(os.path.join(salida, "linea_de_tiempo.json"), "w", encoding="utf-8") as f:
+        json.dump(apariciones, f, indent=2, ensure_ascii=False)
+    columnas = ["persona", "camara", "archivo", "desde", "hasta", "hora_desde", "hora_hasta",
+                "detecciones", "distancia", "miniatura"]
+    with open(os.path.join(salida, "linea_de_tiempo.csv"), "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=columnas, extrasaction="ignore")
+        escritor.writeheader()
+        escritor.writerows(apariciones)
+
+
+# ---------------------------------------- CLI ----------------------------------------
+def codificar_consulta(ruta_imagen, nombre):
+    """
+    Encoding del rostro más grande de la imagen de consulta.
+    """
+    import face_recognition
+    imagen = face_recognition.load_image_file(ruta_imagen)
+    ubicaciones = face_recognition.face_locations(imagen, model="hog")
+    if not ubicaciones:
+        return None
+    mayor = max(ubicaciones, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+    encoding = face_recognition.face_encodings(imagen, known_face_locations=[mayor])[0]
+    return {"nombre": nombre, "encodings": [np.asarray(encoding, dtype=np.float32).tolist()]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Búsqueda de personas en grabaciones (offline, en paralelo).")
+    parser.add_argument("videos", nargs="+", help="Archivos de video o carpetas con videos")
+    parser.add_argument("--salida", required=True, help="Carpeta de resultados (permite reanudar)")
+    parser.add_argument("--embeddings", default="embeddings", help="Galería empaquetada a usar")
+    parser.add_argument("--imagen", help="Buscar sólo a la persona de esta imagen (en lugar de la galería)")
+    parser.add_argument("--nombre", default="consulta", help="Nombre para la persona de --imagen")
+    parser.add_argument("--personas", default="", help="Reportar sólo estas personas (separadas por coma)")
+    parser.add_argument("--paso", type=float, default=1.0, help="Segundos entre frames analizados")
+    parser.add_argument("--tramo", type=float, default=300.0, help="Segundos de video por tarea")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    parser.add_argument("--tolerancia", type=float, default=0.4, help="Distancia máxima para una coincidencia")
+    parser.add_argument("--escala", type=float, default=0.5, help="Escala del frame para la detección")
+    parser.add_argument("--detector", default="hog", help="Detector: hog, cnn, haar, lbp, dnn o cascada (ej. haar>hog)")
+    parser.add_argument("--sin-movimiento", action="store_true", help="Analizar todas las muestras")
+    parser.add_argument("--separacion", type=float, default=10.0, help="Segundos que separan dos apariciones")
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.join(args.salida, "tramos"), exist_ok=True)
+    os.makedirs(os.path.join(args.salida, "miniaturas"), exist_ok=True)
+
+    consulta = None
+    if args.imagen:
+        consulta = codificar_consulta(args.imagen, args.nombre)
+        if consulta is None:
+            print(f"[❌] No se encontró un rostro en {args.imagen}")
+            return 1
+        firma = hashlib.sha1(json.dumps(consulta).encode()).hexdigest()[:12]
+    else:
+        almacen = AlmacenEmbeddings(args.embeddings, indice="auto")
+        almacen.actualizar()                              # Entrena o extiende el índice IVF una sola vez, antes del pool
+        firma = str(almacen.revision)
+
+    opciones = {
+        "salida": os.path.abspath(args.salida), "paso_s": args.paso, "escala": args.escala,
+        "tolerancia": args.tolerancia, "movimiento": not args.sin_movimiento, "rechequeo_s": 10.0,
+        "personas": [p.strip() for p in args.personas.split(",") if p.strip()],
+        "indice": "auto", "firma_galeria": firma, "detector": args.detector,
+    }
+
+    videos = listar_videos(args.videos)
+    tareas = planificar(videos, args.tramo)
+    for tarea in tareas:
+        tarea["clave"] = clave_tramo(tarea, opciones)
+
+    # Reanudación: los tramos ya terminados se leen de disco
+    resultados, pendientes = [], []
+    for tarea in tareas:
+        ruta = os.path.join(args.salida, "tramos", f"{tarea['clave']}.json")
+        if os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                resultados.append(json.load(f))
+        else:
+            pendientes.append(tarea)
+
+    total_video = sum(t["fin"] - t["inicio"] for t in tareas)
+    print(f"[🔎] {len(videos)} videos, {total_video / 3600:.1f} h en {len(tareas)} tramos "
+          f"({len(tareas) - len(pendientes)} ya procesados), {args.workers} procesos")
+
+    inicio = time.perf_counter()
+    procesado = 0.0
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_iniciar_trabajador,
+                                 initargs=(args.embeddings, consulta, opciones)) as pool:
+            futuros = [pool.submit(_procesar_tramo, t) for t in pendientes]
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                try:
+                    r = futuro.result()
+                except Exception as e:
+                    print(f"[❌] Tramo fallido: {e}")     # Queda pendiente para la próxima ejecución
+                    continue
+                resultados.append(r)
+                procesado += r["fin"] - r["inicio"]
+                transcurrido = time.perf_counter() - inicio
+                print(f"[🎞️] {i}/{len(pendientes)} {os.path.basename(r['archivo'])} "
+                      f"{r['inicio']:.0f}-{r['fin']:.0f}s: {len(r['coincidencias'])} coincidencias "
+                      f"({procesado / transcurrido:.0f}x tiempo real)")
+
+    apariciones = armar_linea_de_tiempo(resultados, args.separacion)
+    guardar_linea_de_tiempo(args.salida, apariciones)
+    print(f"[✅] {len(apariciones)} apariciones → {os.path.join(args.salida, 'linea_de_tiempo.json')}")
+    for a in apariciones[:20]:
+        cuando = a.get("hora_desde") or f"{os.path.basename(a['archivo'])} {a['desde']:.0f}s"
+        print(f"   {a['persona']:<15} {a['camara']:<12} {cuando} ({a['hasta'] - a['desde']:.0f}s)")
+    return 0
+
+
+# Modo CLI: python busqueda_forense.py <videos/carpetas...> --salida resultados [--imagen foto.jpg | --personas Ana]
+if __name__ == "__main__":
+    sys.exit(main())
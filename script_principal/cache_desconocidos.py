@@ -0,0 +1,152 @@
+# === IMPORTS ===
+import time                                               # Vencimiento (TTL) de cada entrada
+import threading                                          # Acceso desde la detección y desde el bot
+import numpy as np                                        # Matriz de encodings y distancias vectorizadas
+
+
+class CacheDesconocidos:
+    """
+    Encodings de desconocidos recientes, para no volver a alertar por la misma persona.
+    Las entradas viven en una matriz NumPy preasignada (capacidad × dim); cada fila
+    guarda a qué desconocido pertenece y cuándo se agregó. Las filas vencen tras 'ttl'
+    segundos y, con la matriz llena, se reemplazan las más viejas.
+    Búsqueda de vecino más cercano en lote (una sola operación matricial) y baja de un
+    desconocido en O(k) con el índice identidad → filas.
+    """
+
+    def __init__(self, dim=128, capacidad=10000, ttl=7200.0, tolerancia=0.4):
+        self.dim = dim
+        self.capacidad = capacidad                        # Máximo de encodings guardados
+        self.ttl = ttl                                    # Segundos que se recuerda cada encoding
+        self.tolerancia = tolerancia                      # Distancia máxima para considerar "ya visto"
+        self._matriz = np.zeros((capacidad, dim), dtype=np.float32)
+        self._normas = np.zeros(capacidad, dtype=np.float32)       # ||fila||², para distancias sin restar vectores
+        self._tiempos = np.zeros(capacidad, dtype=np.float64)
+        self._validos = np.zeros(capacidad, dtype=bool)
+        self._duenos = [None] * capacidad                 # Identidad de cada fila
+        self._filas = {}                                  # identidad → set de filas
+        self._libres = list(range(capacidad - 1, -1, -1))  # Pila de filas disponibles
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.consultas = 0
+        self.aciertos = 0
+        self.vencidos = 0
+        self.desalojados = 0
+
+    def __len__(self):
+        return self.capacidad - len(self._libres)
+
+    def _liberar(self, fila):
+        self._validos[fila] = False
+        dueno = self._duenos[fila]
+        self._duenos[fila] = None
+        filas = self._filas.get(dueno)
+        if filas is not None:
+            filas.discard(fila)
+            if not filas:
+                del self._filas[dueno]
+        self._libres.append(fila)
+
+    def _purgar(self, ahora):
+        vencidas = np.flatnonzero(self._validos & (self._tiempos < ahora - self.ttl))
+        for fila in vencidas:
+            self._liberar(int(fila))
+        self.vencidos += len(vencidas)
+
+    def purgar(self, ahora=None):
+        """
+        Libera las filas vencidas. Retorna cuántas quedaron vigentes.
+        """
+        with self._lock:
+            self._purgar(ahora if ahora is not None else time.time())
+            return len(self)
+
+    def agregar(self, identidad, encodings, ahora=None):
+        """
+        Guarda los encodings de un desconocido. Si no hay lugar, reemplaza las filas más viejas.
+        """
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)[-self.capacidad:]
+        ahora = ahora if ahora is not None else time.time()
+        with self._lock:
+            self._purgar(ahora)
+            faltan = len(encodings) - len(self._libres)
+            if faltan > 0:
+                validas = np.flatnonzero(self._validos)
+                viejas = validas[np.argpartition(self._tiempos[validas], faltan - 1)[:faltan]]
+                for fila in viejas:
+                    self._liberar(int(fila))
+                self.desalojados += faltan
+
+            filas = [self._libres.pop() for _ in range(len(encodings))]
+            self._matriz[filas] = encodings
+            self._normas[filas] = np.einsum("ij,ij->i", encodings, encodings)
+            self._tiempos[filas] = ahora
+            self._validos[filas] = True
+            for fila in filas:
+                self._duenos[fila] = identidad
+            self._filas.setdefault(identidad, set()).update(filas)
+
+    def buscar(self, encodings, ahora=None):
+        """
+        Compara un lote de encodings contra el caché en una sola operación.
+        Retorna, por cada encoding, (identidad, distancia) del vecino más cercano vigente
+        si está dentro de la tolerancia, o (None, distancia) si no (distancia None con el caché vacío).
+        """
+        consultas = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        ahora = ahora if ahora is not None else time.time()
+        with self._lock:
+            self.consultas += len(consultas)
+            vigentes = np.flatnonzero(self._validos & (self._tiempos >= ahora - self.ttl))
+            if len(consultas) == 0 or len(vigentes) == 0:
+                return [(None, None)] * len(consultas)
+
+            # ||a - b||² = ||a||² + ||b||² - 2 a·b
+            cuadrados = (np.einsum("ij,ij->i", consultas, consultas)[:, None]
+                         + self._normas[vigentes][None, :]
+                         - 2.0 * consultas @ self._matriz[vigentes].T)
+            cercanos = np.argmin(cuadrados, axis=1)
+            distancias = np.sqrt(np.maximum(cuadrados[np.arange(len(consultas)), cercanos], 0.0))
+
+            resultados = []
+            for fila, distancia in zip(vigentes[cercanos], distancias):
+                if distancia <= self.tolerancia:
+                    self.aciertos += 1
+                    resultados.append((self._duenos[fila], float(distancia)))
+                else:
+                    resultados.append((None, float(distancia)))
+            return resultados
+
+    def contiene(self, encoding, ahora=None):
+        """
+        True si el encoding coincide con algún desconocido reciente.
+        """
+        return self.buscar([encoding], ahora)[0][0] is not None
+
+    def eliminar(self, identidad):
+        """
+        Quita todos los encodings de un desconocido (O(k) en sus filas). Retorna cuántos se quitaron.
+        """
+        with self._lock:
+            filas = list(self._filas.get(identidad, ()))
+            for fila in filas:
+                self._liberar(fila)
+            return len(filas)
+
+    def estadisticas(self):
+        """
+        Ocupación, memoria y tasa de aciertos del caché.
+        """
+        with self._lock:
+            return {
+                "entradas": len(self),
+                "capacidad": self.capacidad,
+                "identidades": len(self._filas),
+                "memoria_bytes": int(self._matriz.nbytes + self._normas.nbytes
+                                     + self._tiempos.nbytes + self._validos.nbytes),
+                "consultas": self.consultas,
+                "aciertos": self.aciertos,
+                "tasa_aciertos": self.aciertos / self.consultas if self.consultas else 0.0,
+                "vencidos": self.vencidos,
+                "desalojados": self.desalojados,
+            }
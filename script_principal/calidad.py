@@ -0,0 +1,80 @@
+# === IMPORTS ===
+import cv2                                                # Nitidez (Laplaciano), brillo y contraste
+import face_recognition                                   # Landmarks de 5 puntos para estimar el giro
+
+# Umbrales por defecto (None en cualquiera de ellos desactiva esa medida)
+CRITERIOS_POR_DEFECTO = {
+    "lado_min": 48,                                       # Lado menor de la caja, en píxeles de la imagen a codificar
+    "nitidez_min": 40.0,                                  # Varianza del Laplaciano del recorte llevado a 96 px de ancho
+    "brillo_min": 40,                                     # Media de gris mínima (rostro muy oscuro)
+    "brillo_max": 220,                                    # Media de gris máxima (rostro quemado)
+    "contraste_min": 15,                                  # Desvío estándar de gris mínimo
+    "giro_max": 0.35,                                     # Desvío de la nariz respecto del centro de los ojos (en distancias entre ojos)
+}
+ANCHO_NORMALIZADO = 96                                    # La nitidez se mide siempre a este ancho para poder comparar
+
+
+def _giro(rgb, ubicacion):
+    """
+    Giro lateral estimado con los landmarks de 5 puntos: 0 de frente, ~0.5 o más de perfil.
+    None si no se pudieron obtener.
+    """
+    puntos = face_recognition.face_landmarks(rgb, [ubicacion], model="small")
+    if not puntos or not puntos[0].get("nose_tip"):
+        return None
+    puntos = puntos[0]
+    ojo_izq = sum(x for x, _ in puntos["left_eye"]) / len(puntos["left_eye"])
+    ojo_der = sum(x for x, _ in puntos["right_eye"]) / len(puntos["right_eye"])
+    nariz = puntos["nose_tip"][0][0]
+    return abs(nariz - (ojo_izq + ojo_der) / 2) / max(1.0, abs(ojo_der - ojo_izq))
+
+
+def evaluar_calidad(imagen, ubicacion, criterios=None, rgb=None):
+    """
+    Puntúa el rostro en 'ubicacion' (top, right, bottom, left) de 'imagen' (BGR) con medidas
+    baratas, antes de pagar el encoding. El giro sólo se mide si se pasa 'rgb' y el resto
+    de las medidas ya aprobó (los landmarks son la parte más cara).
+    Retorna un diccionario con "apto", "motivo" (None, "chico", "oscuro", "quemado",
+    "sin_contraste", "borroso", "girado"), "puntaje" (0–1, para elegir las mejores
+    capturas) y cada medida.
+    """
+    c = dict(CRITERIOS_POR_DEFECTO, **(criterios or {}))
+    top, right, bottom, left = ubicacion
+    recorte = imagen[max(0, top):bottom, max(0, left):right]
+    lado = min(recorte.shape[:2]) if recorte.size else 0
+    resultado = {"apto": False, "motivo": "chico", "puntaje": 0.0, "lado": lado,
+                 "nitidez": None, "brillo": None, "contraste": None, "giro": None}
+    if lado == 0 or (c["lado_min"] and lado < c["lado_min"]):
+        return resultado
+
+    gris = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY) if recorte.ndim == 3 else recorte
+    alto_norm = max(1, int(gris.shape[0] * ANCHO_NORMALIZADO / gris.shape[1]))
+    gris = cv2.resize(gris, (ANCHO_NORMALIZADO, alto_norm), interpolation=cv2.INTER_AREA)
+    brillo, desvio = cv2.meanStdDev(gris)
+    brillo, contraste = float(brillo[0][0]), float(desvio[0][0])
+    nitidez = float(cv2.Laplacian(gris, cv2.CV_64F).var())
+    resultado.update(brillo=brillo, contraste=contraste, nitidez=nitidez)
+
+    if c["brillo_min"] is not None and brillo < c["brillo_min"]:
+        resultado["motivo"] = "oscuro"
+    elif c["brillo_max"] is not None and brillo > c["brillo_max"]:
+        resultado["motivo"] = "quemado"
+    elif c["contraste_min"] is not None and contraste < c["contraste_min"]:
+        resultado["motivo"] = "sin_contraste"
+    elif c["nitidez_min"] is not None and nitidez < c["nitidez_min"]:
+        resultado["motivo"] = "borroso"
+    else:
+        resultado["motivo"] = None
+        if rgb is not None and c["giro_max"] is not None:
+            resultado["giro"] = _giro(rgb, ubicacion)
+            if resultado["giro"] is not None and resultado["giro"] > c["giro_max"]:
+                resultado["motivo"] = "girado"
+    resultado["apto"] = resultado["motivo"] is None
+
+    # Puntaje para ordenar capturas: nitidez y tamaño pesan más que la luz y el giro
+    nit = min(1.0, nitidez / (3 * (c["nitidez_min"] or 40.0)))
+    tam = min(1.0, lado / (3 * (c["lado_min"] or 48)))
+    luz = 1.0 - min(1.0, abs(brillo - 128) / 128)
+    pose = 1.0 - min(1.0, resultado["giro"] / (2 * (c["giro_max"] or 0.35))) if resultado["giro"] is not None else 1.0
+    resultado["puntaje"] = 0.4 * nit + 0.3 * tam + 0.1 * luz + 0.2 * pose
+    return resultado
@@ -1,15 +1,28 @@
 # === IMPORTS ===
-import cv2                                                # Captura y procesamiento de video en tiempo real
 import os                                                 # Manejo de directorios y archivos
 import time                                               # Control de tiempo y delays
-import pickle                                             # Serialización y deserialización de datos (embeddings, etc.)
 import threading                                          # Ejecución concurrente (notificación, procesamiento paralelo)
 import shutil                                             # Operaciones de archivo (mover, copiar, eliminar)
-import requests                                           # Envío de datos HTTP (notificaciones externas, si aplica)
-import face_recognition                                   # Detección y reconocimiento facial basado en deep learning
 import sys                                                # Acceso a parámetros del sistema y manipulación de flujo de ejecución
-import subprocess                                         # Usado para lanzar comandos externos, ej: actualización de embeddings vía script con argumentos (--generar nombre)
-from datetime import datetime, timedelta                  # Timestamps y control de ventanas temporales
+import asyncio                                            # Espera no bloqueante de los enrolamientos desde el bot
+import json                                               # Métricas del modo replay
+from datetime import timedelta                            # Ventana mínima entre avisos de un mismo rostro
+
+from configuracion import cargar_camaras, DETECTOR_ENROLAMIENTO, CRITERIOS_CALIDAD   # Configuración por cámara (camaras.json) y del enrolamiento
+from lector_camara import LectorCamaraDual                # Substream para detectar, stream principal para recortes
+from almacen_embeddings import AlmacenEmbeddings          # Recarga incremental de embeddings + snapshot de galería
+from galeria_empaquetada import GaleriaEmpaquetada, migrar_pickles   # Galería en disco y migración de los .pkl por persona
+from prototipos import compactar_identidad, sincronizar, directorio_prototipos   # Prototipos por identidad (galería compacta)
+from constructor_embeddings import ConstructorEmbeddings  # Generación de embeddings en paralelo con caché por imagen
+from trabajador_enrolamiento import TrabajadorEnrolamiento  # Cola de altas procesada por un hilo con modelos cargados
+from notificador import NotificadorTelegram, NotificadorLocal   # Alertas en segundo plano (cola, reintentos, 429) / stub local
+from escritor_imagenes import EscritorImagenes, codificar_jpeg   # Imágenes en memoria; a disco sólo por lotes y en segundo plano
+from cache_desconocidos import CacheDesconocidos          # Desconocidos recientes: matriz con TTL y búsqueda en lote
+from metricas import Metricas, ServidorMetricas, rss_bytes, rss_pico_bytes   # Latencias por etapa, contadores y endpoint Prometheus
+from fuente_replay import FuenteReplay                    # Video o carpeta de imágenes en lugar de la cámara (replay)
+from vigilancia_camara import VigilanciaCamara            # Pipeline de una cámara: captura → detección → ... → acciones
+from supervisor import Supervisor                         # Varias cámaras: un proceso trabajador por cámara
+from concurrent.futures import ProcessPoolExecutor        # Detección y encoding en procesos (PROCESOS_PIPELINE)
 
 # Telegram Bot (para notificar rostro detectado)
 from telegram import Update
@@ -19,7 +32,39 @@ from telegram.ext import Application, CommandHandler, MessageHandler, ContextTyp
 TELEGRAM_TOKEN = "<TOKEN>"                               # Token privado del bot de Telegram
 CHAT_ID = "<ID_DEL_CHAT>"                                # ID del chat donde se enviarán las alertas
 CAMARA_RTSP = "<URL_RTSP>"                               # Dirección RTSP de la cámara IP
+CAMARAS_CONFIG = "camaras.json"                          # Configuración por cámara (opcional; si no existe se usa CAMARA_RTSP)
 DELAY_NOTIFICACION_MIN = 5                               # Delay mínimo entre notificaciones (en minutos) para un mismo rostro
+TOLERANCIA_RECONOCIMIENTO = 0.4                          # Distancia máxima para considerar un rostro como conocido
+CAPTURAS_DESCONOCIDO = 20                                # Imágenes a juntar por cada desconocido
+CANDIDATAS_DESCONOCIDO = 30                              # Capturas evaluadas por desconocido: se guardan las 20 mejores
+ESPACIADO_CAPTURAS_S = 2                                 # Segundos mínimos entre capturas de un mismo desconocido
+LIMITE_RECOLECCION_S = 90                                # Tiempo máximo (s) para juntar las capturas de un desconocido
+REVERIFICAR_TRACK_S = 10                                 # Cada cuántos segundos se vuelve a codificar un rostro seguido
+AREA_MOVIMIENTO_MIN = 0.005                              # Fracción del frame que debe cambiar para correr la detección
+RECHEQUEO_REPOSO_S = 10                                  # Con la escena quieta, se analiza un frame completo cada N segundos
+TTL_DESCONOCIDOS_S = 7200                               # Tiempo que se recuerda a un desconocido para no repetir la alerta
+MAX_ENCODINGS_DESCONOCIDOS = 10000                      # Tope de encodings de desconocidos en memoria (se descartan los más viejos)
+INDICE_GALERIA = "auto"                                  # Búsqueda en la galería: "exacto", "ivf" o "auto" (IVF en galerías grandes)
+NPROBE_GALERIA = 8                                       # Listas IVF revisadas por rostro: más = mejor recall, más lento
+MAX_PROTOTIPOS = 5                                       # Prototipos (k-means) que se guardan por persona
+SOLO_PROTOTIPOS = False                                  # Comparar sólo contra los prototipos en lugar de todos los embeddings
+PUERTO_METRICAS = 9108                                   # Endpoint local Prometheus (http://127.0.0.1:9108/metrics); None lo desactiva
+PAUSA_ENTRE_FRAMES_S = 0.2                               # Intervalo mínimo entre frames tomados de la cámara
+TRABAJADORES_DETECCION = max(1, (os.cpu_count() or 2) // 2)   # Detecciones en paralelo
+TRABAJADORES_CODIFICACION = max(1, (os.cpu_count() or 2) // 4)   # Encodings en paralelo
+CAPACIDAD_COLAS = 2                                      # Elementos en espera entre dos etapas del pipeline
+POLITICA_COLAS = "descartar_viejo"                       # "descartar_viejo" (siempre frames frescos) o "bloquear" (no pierde frames)
+PROCESOS_PIPELINE = False                                # True: detección y encoding en un pool de procesos en lugar de hilos
+PROCESOS_CAMARAS = None                                  # Con varias cámaras: procesos trabajadores (None = uno por cámara)
+LATIDO_MAX_S = 60                                        # Segundos sin avance antes de reiniciar el proceso de una cámara
+
+# Modo replay: python cap_rostro.py --replay <video|carpeta> [--maxima] [--metricas salida.json]
+# Reproduce un video grabado sin cámara ni Telegram (alertas a un stub local) y guarda las métricas al terminar
+MODO_REPLAY = len(sys.argv) >= 3 and sys.argv[1] == "--replay"
+REPLAY_MAXIMA = MODO_REPLAY and "--maxima" in sys.argv  # Sin pausas ni frames salteados: mide el costo por frame
+if REPLAY_MAXIMA:
+    PAUSA_ENTRE_FRAMES_S = 0
+    POLITICA_COLAS = "bloquear"
 
 # === ESTRUCTURA DE DIRECTORIOS (se crean si no existen) ===
 dataset_dir = 'dataset'                                  # Almacén de imágenes etiquetadas
@@ -31,25 +76,64 @@ os.makedirs(dataset_dir, exist_ok=True)
 os.makedirs(embeddings_dir, exist_ok=True)
 os.makedirs(temp_dir, exist_ok=True)
 
+# === MÉTRICAS ===
+metricas = Metricas()                                    # Se consultan con /stats y en el endpoint local
+escritor = EscritorImagenes(metricas=metricas).iniciar()   # Capturas de desconocidos a disco sin frenar la detección
+
+# === NOTIFICACIONES ===
+if MODO_REPLAY:
+    notificador = NotificadorLocal(os.path.join(temp_dir, "replay_alertas"))   # Stub: no sale nada a Telegram
+else:
+    notificador = NotificadorTelegram(TELEGRAM_TOKEN, CHAT_ID, metricas=metricas).iniciar()   # La detección nunca espera a la red
+
+# === CÁMARAS ===
+camaras_config = cargar_camaras(CAMARAS_CONFIG, CAMARA_RTSP)   # Una o varias cámaras (camaras.json)
+MULTICAMARA = len(camaras_config) > 1 and not MODO_REPLAY      # Varias cámaras: un proceso por cámara (supervisor)
+config_camara = camaras_config[0]                        # Ajustes de la cámara de este proceso (una sola cámara)
+if MODO_REPLAY:
+    camara = FuenteReplay(sys.argv[2], maxima=REPLAY_MAXIMA)   # Frames grabados en lugar del RTSP
+else:
+    camara = LectorCamaraDual(config_camara["rtsp"], config_camara["rtsp_sub"])   # Se inicia junto con la detección
+
 # === VARIABLES DE REFERENCIA ===
-known_face_encodings = []                                # Lista de vectores de rostros conocidos
-known_face_names = []                                    # Nombres asociados a cada rostro
+constructor = ConstructorEmbeddings(dataset_dir, os.path.join(embeddings_dir, "cache_imagenes.npz"),
+                                    detector=DETECTOR_ENROLAMIENTO, criterios_calidad=CRITERIOS_CALIDAD)
+galeria_completa = GaleriaEmpaquetada(embeddings_dir)    # Todos los embeddings de cada persona
+galeria_prototipos = GaleriaEmpaquetada(directorio_prototipos(embeddings_dir))   # Pocos prototipos por persona
+almacen = AlmacenEmbeddings(galeria_prototipos if SOLO_PROTOTIPOS else galeria_completa,
+                            indice=INDICE_GALERIA, nprobe=NPROBE_GALERIA)   # 'almacen.galeria' es el snapshot vigente
+revision_prototipada = None                              # Revisión de la galería completa ya llevada a prototipos
+supervisor = None                                        # Supervisor de los procesos por cámara (MULTICAMARA)
 
 
 def cargar_embeddings():
     """
-    Carga los vectores faciales (embeddings) previamente almacenados en archivos .pkl.
-    Actualiza las listas globales de 'known_face_encodings' y 'known_face_names'.
+    Sincroniza la galería con la galería empaquetada del disco (sólo si cambió).
+    Con SOLO_PROTOTIPOS, las personas nuevas o modificadas por otras vías (migración,
+    constructor_embeddings.py) se compactan a prototipos antes de recargar.
+    Nunca lee .pkl: se migran una sola vez con --migrar-pkl (ver abajo).
     """
-    known_face_encodings.clear()
-    known_face_names.clear()
-    
-    for archivo in os.listdir(embeddings_dir):
-        if archivo.endswith(".pkl"):
-            with open(os.path.join(embeddings_dir, archivo), "rb") as f:
-                data = pickle.load(f)
-                known_face_encodings.extend(data["encodings"])
-                known_face_names.extend([data["name"]] * len(data["encodings"]))
+    global revision_prototipada
+
+    if SOLO_PROTOTIPOS:
+        revision = galeria_completa.leer_indice()["revision"]
+        if revision != revision_prototipada:
+            actualizadas = sincronizar(galeria_completa, galeria_prototipos, MAX_PROTOTIPOS)
+            if actualizadas:
+                print(f"[🧩] Prototipos actualizados para {actualizadas} personas")
+            revision_prototipada = revision
+    cambio = almacen.actualizar()
+    if supervisor is not None:
+        supervisor.publicar_revision(almacen.revision)   # Los procesos de cada cámara vuelven a mapear la galería
+    return cambio
+
+# Migración única de los .pkl del formato anterior (pickle ejecuta código: sólo a pedido explícito)
+pkls_pendientes = [a for a in os.listdir(embeddings_dir) if a.endswith(".pkl")]
+if "--migrar-pkl" in sys.argv:
+    migrar_pickles(embeddings_dir, galeria_completa)
+elif pkls_pendientes:
+    print(f"[⚠️] {len(pkls_pendientes)} archivos .pkl sin migrar en {embeddings_dir}/ (se ignoran). "
+          f"Migrar con: python cap_rostro.py --migrar-pkl")
 
 # Inicializa la base de rostros conocidos desde el disco
 cargar_embeddings()
@@ -59,236 +143,186 @@ cargar_embeddings()
 esperando_nombre = False                     # Flag cuando se espera un nombre por parte del usuario
 procesando_desconocido = None                # Rostro no reconocido en procesamiento activo
 cola_desconocidos = []                       # Cola de rostros desconocidos para verificar posteriormente
-contador_desconocidos = 1                    # ID incremental para etiquetar rostros desconocidos
-deteccion_activa = True                      # Flag para habilitar o pausar la detección
-ultima_notificacion = {}                     # Mapeo de última notificación por rostro
-encodings_desconocidos_vivos = []            # Lista de vectores faciales recientes sin reconocimiento
-fecha_contador = datetime.now().date()       # Fecha actual para reiniciar contador diario
+ultima_notificacion = {}                     # Mapeo de última notificación por rostro (entre todas las cámaras)
+desconocidos_recientes = CacheDesconocidos(capacidad=MAX_ENCODINGS_DESCONOCIDOS, ttl=TTL_DESCONOCIDOS_S,
+                                           tolerancia=TOLERANCIA_RECONOCIMIENTO)   # Vectores faciales recientes sin reconocimiento
 
 # ========================== FUNCIONES ==========================
-def capturar_imagen(ruta):
+def notificar_conocido(nombre, foto, hora, camara=None):
     """
-    Captura un frame desde la cámara RTSP, detecta rostro y lo guarda opcionalmente.
-    Retorna el rostro recortado en formato imagen o None si no hay detección.
+    Avisa por Telegram que se detectó a 'nombre' (foto: recorte BGR o bytes JPEG), salvo
+    que ya se haya avisado hace menos de DELAY_NOTIFICACION_MIN desde cualquier cámara.
+    La foto se codifica en memoria y pasa directo al notificador (sin tocar el disco).
     """
-    cap = cv2.VideoCapture(CAMARA_RTSP)                          # Inicializa la captura de la cámara IP
-    ret, frame = cap.read()                                      # Lee un frame
-    cap.release()                                                # Libera el recurso de video
-
-    if not ret or frame is None:
-        return None                                              # Falla en la captura, se retorna vacío
-
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)                 # Conversión a RGB (requerido por face_recognition)
-    locs = face_recognition.face_locations(rgb, model="hog")     # Detecta rostro usando modelo HOG (rápido y CPU-friendly)
-
-    if not locs:
-        print("[⚠️] No se detectó rostro, se omite el frame.")
-        return None                                              # Sin detección facial, se ignora
-
-    top, right, bottom, left = locs[0]                           # Extrae coordenadas del primer rostro
-    rostro = frame[top:bottom, left:right]                       # Recorta el rostro del frame original
-
-    if ruta:
-        cv2.imwrite(ruta, rostro)                                # Guarda el rostro en disco si se indica ruta
+    ultima = ultima_notificacion.get(nombre)
+    if ultima and hora - ultima <= timedelta(minutes=DELAY_NOTIFICACION_MIN):
+        return
+    ultima_notificacion[nombre] = hora
 
-    return rostro                                                # Devuelve el rostro recortado
+    donde = f" en {camara}" if MULTICAMARA and camara else ""
+    mensaje = f"✅ {nombre} fue detectado{donde} el {hora.strftime('%d/%m/%Y %H:%M:%S')}"
+    if not isinstance(foto, bytes):
+        foto = codificar_jpeg(foto)                      # JPEG sólo cuando se envía
+        if foto is None:
+            return
+    metricas.contar("alertas_conocidos")
+    notificador.enviar_foto(foto, mensaje, clave=f"conocido:{nombre}")
 
 def enviar_desconocido_telegram(desconocido):
     """
-    Envía la primera imagen del rostro desconocido detectado vía Telegram.
+    Envía la mejor imagen del rostro desconocido detectado vía Telegram (los bytes JPEG
+    que trae el desconocido, sin releerla del disco).
     Incluye fecha/hora de detección y consulta al usuario si lo reconoce.
     """
-    primera_img = desconocido["imagenes"][0]                      # Imagen del rostro desconocido
-    mensaje = f"🕵️ Se detectó una persona desconocida ({desconocido['id']}) el {desconocido['hora'].strftime('%d/%m/%Y %H:%M:%S')}"
+    primera_img = desconocido.get("foto") or desconocido["imagenes"][0]   # Imagen del rostro desconocido
+    donde = f" en {desconocido['camara']}" if desconocido.get("camara") else ""
+    mensaje = (f"🕵️ Se detectó una persona desconocida ({desconocido['id']}){donde} "
+               f"el {desconocido['hora'].strftime('%d/%m/%Y %H:%M:%S')}")
     pregunta = "❓ ¿Conocés a esta persona? (Sí / No)"
 
-    with open(primera_img, "rb") as img:
-        # Envía la foto con un mensaje informativo
-        requests.post(f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto",
-                      data={"chat_id": CHAT_ID, "caption": mensaje},
-                      files={"photo": img})
-
-    # Envía la pregunta como mensaje separado
-    requests.post(f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-                  data={"chat_id": CHAT_ID, "text": pregunta})
+    # Envía la foto con un mensaje informativo y la pregunta como mensaje separado (en segundo plano)
+    notificador.enviar_foto(primera_img, mensaje)
+    notificador.enviar_mensaje(pregunta)
 
 
 def generar_embeddings_para(nombre):
     """
     Genera vectores faciales (embeddings) a partir de imágenes de un nombre dado.
-    Guarda los vectores en un archivo .pkl y actualiza la base.
+    Guarda los vectores en la galería empaquetada, los compacta en prototipos y actualiza la base.
+    Retorna la revisión de la galería ya publicada en memoria, o None si falló.
     """
-    carpeta = os.path.join(dataset_dir, nombre)
-    encodings = []
+    with metricas.medir("enrolamiento"):
+        encodings = constructor.construir(nombre)        # Sólo codifica imágenes nuevas o modificadas (pool de procesos)
+
+        if len(encodings) == 0:
+            print(f"[⛔] No se generaron embeddings para {nombre}.")
+            notificador.enviar_mensaje(f"⚠️ No se pudieron generar embeddings para {nombre}.")
+            return None
 
-    for filename in sorted(os.listdir(carpeta)):
-        path = os.path.join(carpeta, filename)
         try:
-            image = face_recognition.load_image_file(path)
-            if image is None or image.size == 0:
-                print(f"[⛔] Imagen vacía o corrupta: {filename}")
-                continue
-
-            locs = face_recognition.face_locations(image, model="hog")
-            encs = face_recognition.face_encodings(image, locs)
-
-            if encs:
-                encodings.append(encs[0])
-                print(f"[✅] Embedding generado para {filename}")
-            else:
-                print(f"[⚠️] No se detectó rostro en {filename}, se omite.")
+            revision = galeria_completa.guardar_identidad(nombre, encodings)   # Alta en la galería empaquetada
+            revision_proto = compactar_identidad(galeria_completa, galeria_prototipos, nombre,
+                                                 MAX_PROTOTIPOS, encodings)   # Prototipos de la persona
+            if SOLO_PROTOTIPOS:
+                revision = revision_proto                   # La galería en uso es la de prototipos
+
+            cargar_embeddings()  # Recarga la base con el nuevo rostro
+            print(f"[📦] {len(encodings)} embeddings de {nombre} guardados (revisión {revision})")
+            notificador.enviar_mensaje(f"✅ {nombre} agregado correctamente.")
+            return revision
         except Exception as e:
-            print(f"[❌] Error en {filename}: {e}")
-
-    if not encodings:
-        print(f"[⛔] No se generaron embeddings para {nombre}.")
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-            data={"chat_id": CHAT_ID, "text": f"⚠️ No se pudieron generar embeddings para {nombre}."}
-        )
-        return
+            print(f"[💥] Error al guardar embeddings: {e}")
+            notificador.enviar_mensaje(f"❌ No se pudo guardar el archivo para {nombre}.")
+            return None
 
+# Trabajador de enrolamiento: procesa las altas en este mismo proceso (modelos y pool ya cargados)
+enrolador = TrabajadorEnrolamiento(generar_embeddings_para)
+
+async def esperar_enrolamiento(nombre, futuro):
+    """
+    Espera (sin bloquear el bot) a que el alta de 'nombre' quede publicada en la galería.
+    """
     try:
-        path_pkl = os.path.join(embeddings_dir, f"{nombre}.pkl")
-        with open(path_pkl, "wb") as f:
-            pickle.dump({"encodings": encodings, "name": nombre}, f)
-
-        cargar_embeddings()  # Recarga la base con el nuevo rostro
-        print(f"[📦] Embeddings guardados en {path_pkl}")
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-            data={"chat_id": CHAT_ID, "text": f"✅ {nombre} agregado correctamente."}
-        )
-    except Exception as e:
-        print(f"[💥] Error al guardar .pkl: {e}")
-        requests.post(
-            f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
-            data={"chat_id": CHAT_ID, "text": f"❌ No se pudo guardar el archivo para {nombre}."}
-        )
+        revision = await asyncio.wrap_future(futuro)
+    except Exception:
+        return                                           # El error ya fue registrado por el trabajador
+    if revision is not None:
+        print(f"[🔁] {nombre} activo en la galería (revisión {revision})")
 
-def deteccion():
+def registrar_desconocido(desconocido):
+    """
+    Recibe un desconocido con sus capturas ya recolectadas, lo encola y
+    lo envía por Telegram si no hay otro esperando respuesta.
+    """
+    global procesando_desconocido
+
+    # Con varias cámaras, la misma persona puede llegar desde otra cámara: se pregunta una sola vez
+    if MULTICAMARA and desconocidos_recientes.buscar(desconocido["encodings"])[0][0] is not None:
+        print(f"[🔁] {desconocido['id']} ya fue reportado desde otra cámara: capturas descartadas")
+        shutil.rmtree(os.path.join(temp_dir, desconocido["id"]), ignore_errors=True)
+        return
+
+    desconocidos_recientes.agregar(desconocido["id"], desconocido["encodings"])
+    cola_desconocidos.append(desconocido)
+
+    # Inicia proceso de notificación si no hay otro activo
+    if procesando_desconocido is None:
+        procesando_desconocido = cola_desconocidos.pop(0)
+        enviar_desconocido_telegram(procesando_desconocido)
+
+def olvidar_desconocido(desconocido_id):
     """
-    Loop principal de vigilancia. Captura frames, detecta rostros,
-    compara con base de conocidos y gestiona desconocidos (almacenamiento + notificación).
+    Quita un desconocido ya resuelto del caché de desconocidos recientes, también en los
+    procesos de cada cámara (cada uno tiene su propio caché).
     """
-    global contador_desconocidos, procesando_desconocido, encodings_desconocidos_vivos, fecha_contador
+    desconocidos_recientes.eliminar(desconocido_id)
+    if supervisor is not None:
+        supervisor.olvidar_desconocido(desconocido_id)
+
+# Parámetros de la vigilancia de cada cámara
+parametros_vigilancia = {
+    "tolerancia": TOLERANCIA_RECONOCIMIENTO,
+    "demora_notificacion_min": DELAY_NOTIFICACION_MIN,
+    "capturas_desconocido": CAPTURAS_DESCONOCIDO,
+    "candidatas_desconocido": CANDIDATAS_DESCONOCIDO,
+    "criterios_calidad": CRITERIOS_CALIDAD,
+    "espaciado_capturas_s": ESPACIADO_CAPTURAS_S,
+    "limite_recoleccion_s": LIMITE_RECOLECCION_S,
+    "reverificar_track_s": REVERIFICAR_TRACK_S,
+    "area_movimiento_min": AREA_MOVIMIENTO_MIN,
+    "rechequeo_reposo_s": RECHEQUEO_REPOSO_S,
+    "ttl_desconocidos_s": TTL_DESCONOCIDOS_S,
+    "max_encodings_desconocidos": MAX_ENCODINGS_DESCONOCIDOS,
+    "pausa_entre_frames_s": PAUSA_ENTRE_FRAMES_S,
+    "trabajadores_deteccion": TRABAJADORES_DETECCION,
+    "trabajadores_codificacion": TRABAJADORES_CODIFICACION,
+    "capacidad_colas": CAPACIDAD_COLAS,
+    "politica_colas": POLITICA_COLAS,
+}
+
+if MULTICAMARA:
+    # Un proceso por cámara; avisos, desconocidos y galería se centralizan en este proceso
+    vigilancia = None
+    supervisor = Supervisor(camaras_config, almacen.embeddings_dir, temp_dir, notificar_conocido, registrar_desconocido,
+                            parametros=parametros_vigilancia, procesos=PROCESOS_CAMARAS, indice=INDICE_GALERIA,
+                            nprobe=NPROBE_GALERIA, latido_max=LATIDO_MAX_S, al_aviso=notificador.enviar_mensaje,
+                            metricas=metricas)
+else:
+    # Una sola cámara: el pipeline corre en hilos de este proceso
+    pool_pipeline = ProcessPoolExecutor(max_workers=TRABAJADORES_DETECCION + TRABAJADORES_CODIFICACION) \
+        if PROCESOS_PIPELINE else None                   # Detección y encoding en otros procesos
+    vigilancia = VigilanciaCamara(config_camara, camara, almacen, temp_dir, notificar_conocido, registrar_desconocido,
+                                  metricas=metricas, parametros=parametros_vigilancia,
+                                  desconocidos_recientes=desconocidos_recientes, recargar_galeria=cargar_embeddings,
+                                  pool=pool_pipeline, escritor=escritor)
+
+# Valores que se leen en cada consulta de métricas
+metricas.registrar_medidor("cola_notificaciones", notificador.pendientes, "Mensajes de Telegram en espera")
+metricas.registrar_medidor("cola_enrolamiento", enrolador.pendientes, "Altas en espera de generar embeddings")
+metricas.registrar_medidor("cola_escritura", escritor.pendientes, "Lotes de imágenes esperando escribirse a disco")
+metricas.registrar_medidor("cola_desconocidos", lambda: len(cola_desconocidos), "Desconocidos esperando respuesta")
+metricas.registrar_medidor("galeria_embeddings", lambda: len(almacen.galeria))
+metricas.registrar_medidor("desconocidos_recientes", lambda: len(desconocidos_recientes))
+metricas.registrar_medidor("notificaciones_enviadas", lambda: notificador.enviados)
+metricas.registrar_medidor("notificaciones_fallidas", lambda: notificador.fallidos)
+metricas.registrar_medidor("notificaciones_descartadas", lambda: notificador.descartados)
+metricas.registrar_medidor("rss_bytes", rss_bytes, "Memoria residente del proceso")
 
-    ultima_carga = time.time()                           # Marca de última recarga de embeddings
+def deteccion():
+    """
+    Corre la vigilancia de la cámara (pipeline en hilos, ver vigilancia_camara.py) hasta
+    que se agote la fuente (fin del video en modo replay).
+    """
+    vigilancia.ejecutar()
 
+def mantener_galeria():
+    """
+    Con varias cámaras: sincroniza la galería cada 10 s (prototipos, índice)
+    una sola vez para todos; los procesos de cada cámara sólo la vuelven a mapear.
+    """
     while True:
-        if not deteccion_activa:
-            time.sleep(1)                                # Pausa si el sistema está desactivado
-            continue
-
-        # Recarga periódica de base de rostros (embeddings)
-        if time.time() - ultima_carga > 10:
-            cargar_embeddings()
-            print("[🔁] Embeddings actualizados en hilo de detección")
-            ultima_carga = time.time()
-
-        ahora = datetime.now()
-        hoy = datetime.now().date()
-
-        # Reinicio diario del contador de desconocidos
-        if hoy != fecha_contador:
-            contador_desconocidos = 1
-            fecha_contador = hoy
-
-        # Captura imagen y guarda frame temporal
-        path_img = os.path.join(temp_dir, "frame.jpg")
-        frame = capturar_imagen(path_img)
-        if frame is None:
-            continue
-
-        # Detección y extracción de características del rostro
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        locs = face_recognition.face_locations(rgb)
-        encs = face_recognition.face_encodings(rgb, locs)
-
-        for i, enc in enumerate(encs):
-            # Comparación contra rostros conocidos
-            matches = face_recognition.compare_faces(known_face_encodings, enc, tolerance=0.4)
-            if True in matches:
-                idx = matches.index(True)
-                name = known_face_names[idx]
-                ultima = ultima_notificacion.get(name)
-
-                # Notifica si no fue detectado recientemente
-                if not ultima or (ahora - ultima > timedelta(minutes=DELAY_NOTIFICACION_MIN)):
-                    mensaje = f"✅ {name} fue detectado el {ahora.strftime('%d/%m/%Y %H:%M:%S')}"
-                    with open(path_img, "rb") as img:
-                        requests.post(f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto",
-                                      data={"chat_id": CHAT_ID, "caption": mensaje},
-                                      files={"photo": img})
-                    ultima_notificacion[name] = ahora
-
-            else:
-                # Verifica si el rostro ya fue detectado como desconocido recientemente
-                es_repetido = False
-                for enc_vivo in encodings_desconocidos_vivos:
-                    distancia = face_recognition.face_distance([enc_vivo], enc)[0]
-                    if distancia < 0.4:
-                        es_repetido = True
-                        break
-                if es_repetido:
-                    continue
-
-                # Inicializa carpeta para nuevo rostro desconocido
-                desconocido_id = f"desconocido_{contador_desconocidos}"
-                carpeta = os.path.join(temp_dir, desconocido_id)
-                os.makedirs(carpeta, exist_ok=True)
-                fotos = []
-                encoding_objetivo = enc  # 🧠 Para seguimiento por identidad
-
-                # Captura 20 imágenes espaciadas para ese rostro
-                for j in range(20):
-                    frame_captura = capturar_imagen(None)
-                    if frame_captura is None:
-                        continue
-
-                    rgb_j = cv2.cvtColor(frame_captura, cv2.COLOR_BGR2RGB)
-                    locs_j = face_recognition.face_locations(rgb_j)
-                    encs_j = face_recognition.face_encodings(rgb_j, locs_j)
-
-                    rostro_encontrado = False
-                    for loc_j, enc_j in zip(locs_j, encs_j):
-                        distancia = face_recognition.face_distance([encoding_objetivo], enc_j)[0]
-                        if distancia < 0.4:
-                            top, right, bottom, left = loc_j
-                            rostro = frame_captura[top:bottom, left:right]
-                            img_path = os.path.join(carpeta, f"{desconocido_id}_{j+1}.jpg")
-                            cv2.imwrite(img_path, rostro)
-                            fotos.append(img_path)
-                            rostro_encontrado = True
-                            break
-
-                    if not rostro_encontrado:
-                        print(f"[⚠️] No se encontró rostro objetivo en frame {j+1}")
-                    time.sleep(2)
-
-                # Validación de cantidad mínima de imágenes antes de continuar
-                if len(fotos) < 3:
-                    print(f"[🗑️] Carpeta {desconocido_id} descartada por baja cantidad de imágenes ({len(fotos)} capturas)")
-                    shutil.rmtree(carpeta, ignore_errors=True)
-                    continue
-
-                # Registra rostro desconocido y encola para procesar
-                encodings_desconocidos_vivos.append(encoding_objetivo)
-                cola_desconocidos.append({
-                    "id": desconocido_id,
-                    "encodings": [encoding_objetivo],
-                    "imagenes": fotos,
-                    "hora": ahora
-                })
-
-                # Inicia proceso de notificación si no hay otro activo
-                if procesando_desconocido is None:
-                    procesando_desconocido = cola_desconocidos.pop(0)
-                    enviar_desconocido_telegram(procesando_desconocido)
-
-                contador_desconocidos += 1
-
-        time.sleep(1)                       # Espera breve antes de procesar el siguiente frame 
+        time.sleep(10)
+        cargar_embeddings()
 
 async def recibir_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -298,7 +332,7 @@ async def recibir_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
     - Si el usuario responde "No", se descartan las imágenes y se limpia el estado.
     """
 
-    global esperando_nombre, procesando_desconocido, encodings_desconocidos_vivos
+    global esperando_nombre, procesando_desconocido
 
     mensaje = update.message.text.lower().strip()
 
@@ -320,22 +354,11 @@ async def recibir_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         await update.message.reply_text(f"📂 Nuevas imágenes añadidas para {nombre}. Actualizando embeddings...")
 
-        subprocess.Popen(["python", __file__, "--generar", nombre])
+        # Encola el alta en el trabajador; el aviso llega cuando la galería nueva está publicada
+        context.application.create_task(esperar_enrolamiento(nombre, enrolador.encolar(nombre)))
 
-        for _ in range(20):
-            path_pkl = os.path.join(embeddings_dir, f"{nombre}.pkl")
-            if os.path.exists(path_pkl):
-                cargar_embeddings()
-                print(f"[🔁] Embeddings actualizados en memoria para {nombre}")
-                break
-            time.sleep(0.5)
-
-        # Limpiar buffer de encodings vivos
-        encodings_desconocidos_vivos = [
-            e for e in encodings_desconocidos_vivos
-            if all(face_recognition.face_distance([e], enc)[0] > 0.4
-                   for enc in procesando_desconocido["encodings"])
-        ]
+        # Ya resuelto: deja de contar como desconocido reciente
+        olvidar_desconocido(procesando_desconocido["id"])
 
         procesando_desconocido = None
         esperando_nombre = False
@@ -350,12 +373,8 @@ async def recibir_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
             shutil.rmtree(carpeta)
         await update.message.reply_text("🗑️ Imágenes descartadas.")
         
-        # Limpiar buffer de encodings vivos
-        encodings_desconocidos_vivos = [
-            e for e in encodings_desconocidos_vivos
-            if all(face_recognition.face_distance([e], enc)[0] > 0.4
-                   for enc in procesando_desconocido["encodings"])
-        ]
+        # Ya resuelto: deja de contar como desconocido reciente
+        olvidar_desconocido(procesando_desconocido["id"])
 
         procesando_desconocido = None
         esperando_nombre = False
@@ -375,16 +394,67 @@ async def recibir_mensaje(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🤖 Bot listo. Detectando personas...")
 
+# Comando /stats del bot: latencias por etapa, contadores, colas y memoria
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    resumen = metricas.resumen()
+    if supervisor is not None:
+        resumen += "\n\n" + supervisor.resumen()
+    await update.message.reply_text(resumen)
+
 # Modo CLI: permite generar embeddings manualmente (ej: python script.py --generar Lionel), solo si se requiere uso manual
 if len(sys.argv) == 3 and sys.argv[1] == "--generar":
     generar_embeddings_para(sys.argv[2])
+    notificador.vaciar(timeout=30)                           # Envía los avisos pendientes antes de salir
+    escritor.detener(timeout=30)                             # Y escribe las imágenes pendientes
+    sys.exit(0)
+
+# Modo replay: corre la detección sobre el video hasta el final y guarda las métricas
+if MODO_REPLAY and __name__ == "__main__":
+    inicio_replay, cpu_inicio = time.perf_counter(), time.process_time()
+    camara.iniciar()
+    deteccion()
+    duracion, cpu_s = time.perf_counter() - inicio_replay, time.process_time() - cpu_inicio
+    resultado = {
+        "fuente": sys.argv[2],
+        "modo": "maxima" if REPLAY_MAXIMA else "nativa",
+        "duracion_s": duracion,
+        "cpu_s": cpu_s,                                  # CPU de todos los hilos durante el replay
+        "memoria_pico_mb": rss_pico_bytes() / 1e6,
+        "frames_leidos": camara.leidos,
+        "galeria_embeddings": len(almacen.galeria),
+        "alertas": len(notificador.mensajes),
+        "metricas": metricas.como_dict(),
+    }
+    procesados = resultado["metricas"]["contadores"].get("frames_procesados", 0)
+    print(f"[🎞️] Replay terminado: {procesados} frames en {duracion:.1f}s "
+          f"({procesados / duracion if duracion else 0:.1f} fps), {resultado['alertas']} alertas")
+    if "--metricas" in sys.argv:
+        ruta = sys.argv[sys.argv.index("--metricas") + 1]
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    escritor.detener(timeout=30)                             # Capturas pendientes a disco antes de salir
     sys.exit(0)
 
 # Arranque del sistema: detección + bot Telegram
 if __name__ == "__main__":
-    threading.Thread(target=deteccion, daemon=True).start()   # Hilo para vigilancia facial
+    constructor.calentar()                                    # Pool de embeddings listo antes de lanzar hilos
+    enrolador.iniciar()                                       # Hilo de enrolamiento (reemplaza al subproceso --generar)
+    if PUERTO_METRICAS:
+        ServidorMetricas(metricas, PUERTO_METRICAS).iniciar()   # Endpoint Prometheus local
+    if supervisor is not None:
+        supervisor.iniciar()                                  # Un proceso de vigilancia por cámara
+        supervisor.publicar_revision(almacen.revision)
+        threading.Thread(target=mantener_galeria, daemon=True).start()   # Recarga única de la galería
+    else:
+        camara.iniciar()                                      # Hilo lector RTSP persistente
+        threading.Thread(target=deteccion, daemon=True).start()   # Hilo para vigilancia facial
 
     app = Application.builder().token(TELEGRAM_TOKEN).build()
     app.add_handler(CommandHandler("start", start))           # Handler para /start
+    app.add_handler(CommandHandler("stats", stats))           # Handler para /stats
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_mensaje))  # Mensajes normales
-    app.run_polling()                                         # Inicia escucha de mensajes Telegram        
\ No newline at end of file
+    app.run_polling()                                         # Inicia escucha de mensajes Telegram
+
+    # Cierre (Ctrl+C): avisos y capturas pendientes antes de salir
+    notificador.vaciar(timeout=30)
+    escritor.detener(timeout=30)
@@ -0,0 +1,48 @@
+# === IMPORTS ===
+import os                                                 # Verificación de existencia del archivo de cámaras
+import json                                               # Lectura de la configuración de cámaras
+
+from zonas import ZonasCamara                             # Validación de los polígonos de zonas
+
+# Valores por defecto de cada cámara (cualquier clave puede sobrescribirse en camaras.json)
+CAMARA_POR_DEFECTO = {
+    "nombre": "principal",                                # Identificador de la cámara (logs, carpetas, alertas)
+    "rtsp": None,                                         # Dirección RTSP del stream principal (alta resolución)
+    "rtsp_sub": None,                                     # Substream de baja resolución para detectar (None = sólo el principal)
+    "escala_deteccion": 0.5,                              # Escala del frame para detectar (1.0 = resolución completa)
+    "upsample_si_vacio": False,                           # Segunda pasada con upsample si no se encontró ningún rostro
+    "detector": "hog",                                    # Detector en vivo (ver detectores.py): "hog", "haar>hog", "dnn", ...
+    "zonas": None,                                        # Polígonos [[x, y], ...] (0–1) donde buscar rostros (None = todo)
+    "exclusiones": [],                                    # Polígonos (0–1) donde se descartan rostros (televisor, calle...)
+}
+
+# Enrolamiento: los leen el bot (cap_rostro.py) y el CLI de constructor_embeddings.py, que comparten la caché
+DETECTOR_ENROLAMIENTO = "hog"                            # Detector para las fotos del dataset (el de cada cámara va en camaras.json)
+CRITERIOS_CALIDAD = {"lado_min": 48, "nitidez_min": 40.0, "brillo_min": 40, "brillo_max": 220,
+                     "contraste_min": 15, "giro_max": 0.35}   # Calidad mínima para codificar un rostro (ver calidad.py)
+
+
+def cargar_camaras(ruta, rtsp_por_defecto=None):
+    """
+    Lee la lista de cámaras desde un JSON (lista de objetos, o {"camaras": [...]}).
+    Cada cámara se completa con CAMARA_POR_DEFECTO. Si el archivo no existe, retorna
+    una única cámara con 'rtsp_por_defecto'.
+    """
+    if not os.path.exists(ruta):
+        return [dict(CAMARA_POR_DEFECTO, rtsp=rtsp_por_defecto)]
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    if isinstance(datos, dict):
+        datos = datos.get("camaras", [])
+
+    camaras = []
+    for i, cam in enumerate(datos):
+        config = dict(CAMARA_POR_DEFECTO, **cam)
+        if config["nombre"] == CAMARA_POR_DEFECTO["nombre"] and i > 0:
+            config["nombre"] = f"camara_{i + 1}"          # Nombres únicos si no se indicaron
+        if not config["rtsp"]:
+            raise ValueError(f"La cámara '{config['nombre']}' no tiene 'rtsp' configurado")
+        ZonasCamara(config["zonas"], config["exclusiones"])   # Falla al arrancar, no en el proceso de la cámara
+        camaras.append(config)
+    return camaras
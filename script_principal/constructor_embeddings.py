@@ -0,0 +1,235 @@
+# === IMPORTS ===
+import os                                                 # Recorrido del dataset y metadatos de archivos
+import sys                                                # Argumentos de línea de comandos
+import time                                               # Medición de throughput
+import hashlib                                            # Hash de contenido para la caché por imagen
+import json                                               # Detector y criterios de calidad con los que se generó la caché
+import threading                                          # Serializa el uso de la caché entre hilos
+from itertools import repeat                              # Mismo detector y criterios para cada imagen del pool
+from concurrent.futures import ProcessPoolExecutor        # Pool de procesos para decodificar + detectar + encoding
+import numpy as np                                        # Encodings y persistencia de la caché (.npz)
+import face_recognition                                   # Carga de imágenes y extracción de embeddings
+
+from detectores import obtener_detector                   # Detector intercambiable (HOG, Haar/LBP, DNN, cascada)
+from calidad import evaluar_calidad, CRITERIOS_POR_DEFECTO   # Fotos borrosas, chicas u oscuras no entran a la galería
+
+DIM = 128                                                 # Dimensión de los encodings de face_recognition
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")           # Archivos de imagen considerados
+
+
+def _codificar_imagen(ruta, detector="hog", criterios=None):
+    """
+    Trabajo de cada proceso del pool: carga la imagen, detecta con 'detector', evalúa la
+    calidad del rostro más grande y, si la pasa, extrae su embedding.
+    Retorna (encoding o None, mensaje de error o None, motivo de rechazo por calidad o None).
+    """
+    try:
+        image = face_recognition.load_image_file(ruta)
+        if image is None or image.size == 0:
+            return None, "imagen vacía o corrupta", None
+        locs = obtener_detector(detector).detectar(image)
+        if not locs:
+            return None, None, None
+        mayor = max(locs, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+        calidad = evaluar_calidad(image[:, :, ::-1], mayor, criterios, rgb=image)   # BGR para las medidas de OpenCV
+        if not calidad["apto"]:
+            return None, None, calidad["motivo"]
+        encs = face_recognition.face_encodings(image, known_face_locations=[mayor])
+        if not encs:
+            return None, None, None
+        return np.asarray(encs[0], dtype=np.float32), None, None
+    except Exception as e:
+        return None, str(e), None
+
+
+def _calentar():
+    return True                                           # Fuerza el arranque de los procesos del pool
+
+
+def _hash_archivo(ruta):
+    h = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class ConstructorEmbeddings:
+    """
+    Genera los embeddings de las carpetas del dataset repartiendo decodificación,
+    detección y encoding entre un pool de procesos que se mantiene vivo.
+    Mantiene una caché por imagen indexada por hash de contenido (SHA-1), de modo
+    que las imágenes sin cambios nunca se vuelven a codificar. Para no recalcular
+    el hash de todo el dataset en cada alta, se guarda también (mtime, tamaño) por ruta.
+    Antes del encoding se descartan las fotos de baja calidad (ver calidad.py).
+    La caché se persiste en un .npz sin pickle, junto con el detector y los criterios de
+    calidad que la generaron: si cambian, los encodings se vuelven a calcular.
+    """
+
+    def __init__(self, dataset_dir, ruta_cache, workers=None, detector="hog", criterios_calidad=None):
+        self.dataset_dir = dataset_dir
+        self.ruta_cache = ruta_cache
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.detector = detector or "hog"
+        self.criterios_calidad = dict(CRITERIOS_POR_DEFECTO, **(criterios_calidad or {}))   # Criterios efectivos
+        self._pool = None
+        self._lock = threading.Lock()
+        self._por_hash = {}                               # hash -> encoding (None si no hay rostro)
+        self._por_ruta = {}                               # ruta -> (mtime_ns, tamaño, hash)
+        self._cargar_cache()
+
+    # ----------------------------- pool ------------------------------
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def calentar(self):
+        """
+        Arranca los procesos del pool de antemano (conviene llamarlo antes de lanzar otros hilos).
+        """
+        pool = self._obtener_pool()
+        list(pool.map(_calentar, range(self.workers)))
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    # ----------------------------- caché -----------------------------
+    def _cargar_cache(self):
+        if not os.path.exists(self.ruta_cache):
+            return
+        try:
+            with np.load(self.ruta_cache, allow_pickle=False) as datos:
+                generada = json.loads(str(datos["parametros"])) if "parametros" in datos.files else None
+                if generada != self._parametros():
+                    print("[🔄] Caché de embeddings generada con otro detector o criterios de calidad, se recalcula")
+                    return
+                for h, enc, ok in zip(datos["hashes"], datos["encodings"], datos["con_rostro"]):
+                    self._por_hash[str(h)] = enc if ok else None
+                for ruta, mtime, tam, h in zip(datos["rutas"], datos["mtimes"], datos["tamanos"], datos["hashes_ruta"]):
+                    self._por_ruta[str(ruta)] = (int(mtime), int(tam), str(h))
+        except Exception as e:
+            print(f"[⚠️] Caché de embeddings ilegible, se reconstruye: {e}")
+            self._por_hash, self._por_ruta = {}, {}
+
+    def _guardar_cache(self):
+        # Descarta rutas que ya no existen y hashes que nadie referencia
+        self._por_ruta = {r: v for r, v in self._por_ruta.items() if os.path.exists(r)}
+        usados = {v[2] for v in self._por_ruta.values()}
+        self._por_hash = {h: e for h, e in self._por_hash.items() if h in usados}
+
+        hashes = list(self._por_hash)
+        encodings = np.zeros((len(hashes), DIM), dtype=np.float32)
+        con_rostro = np.zeros(len(hashes), dtype=bool)
+        for i, h in enumerate(hashes):
+            if self._por_hash[h] is not None:
+                encodings[i] = self._por_hash[h]
+                con_rostro[i] = True
+        rutas = list(self._por_ruta)
+
+        tmp = self.ruta_cache + ".tmp.npz"
+        np.savez(tmp,
+                 hashes=np.array(hashes, dtype=str), encodings=encodings, con_rostro=con_rostro,
+                 rutas=np.array(rutas, dtype=str),
+                 mtimes=np.array([self._por_ruta[r][0] for r in rutas], dtype=np.int64),
+                 tamanos=np.array([self._por_ruta[r][1] for r in rutas], dtype=np.int64),
+                 hashes_ruta=np.array([self._por_ruta[r][2] for r in rutas], dtype=str),
+                 parametros=np.array(json.dumps(self._parametros())))
+        os.replace(tmp, self.ruta_cache)
+
+    def _parametros(self):
+        # Ida y vuelta por JSON: se compara lo mismo que queda guardado (tuplas → listas, etc.)
+        return json.loads(json.dumps({"detector": self.detector, "calidad": self.criterios_calidad}, sort_keys=True))
+
+    def _hash_de(self, ruta):
+        st = os.stat(ruta)
+        previo = self._por_ruta.get(ruta)
+        if previo and previo[0] == st.st_mtime_ns and previo[1] == st.st_size:
+            return previo[2]                              # Sin cambios: no se vuelve a leer el archivo
+        h = _hash_archivo(ruta)
+        self._por_ruta[ruta] = (st.st_mtime_ns, st.st_size, h)
+        return h
+
+    # --------------------------- generación ---------------------------
+    def construir(self, nombre):
+        """
+        Genera los embeddings de 'dataset_dir/<nombre>' codificando sólo imágenes nuevas o modificadas.
+        Retorna un array (cantidad x 128) con un encoding por imagen con rostro, en orden de archivo.
+        """
+        carpeta = os.path.join(self.dataset_dir, nombre)
+        rutas = [os.path.join(carpeta, f) for f in sorted(os.listdir(carpeta))
+                 if f.lower().endswith(EXTENSIONES)]
+
+        with self._lock:
+            inicio = time.time()
+            hashes = {}
+            pendientes = {}                               # hash -> ruta (una sola vez por contenido)
+            for ruta in rutas:
+                try:
+                    h = self._hash_de(ruta)
+                except OSError as e:
+                    print(f"[❌] Error en {os.path.basename(ruta)}: {e}")
+                    continue
+                hashes[ruta] = h
+                if h not in self._por_hash and h not in pendientes:
+                    pendientes[h] = ruta
+
+            if pendientes:
+                pool = self._obtener_pool()
+                orden = list(pendientes.items())
+                chunk = max(1, len(orden) // (self.workers * 4))
+                resultados = pool.map(_codificar_imagen, [r for _, r in orden], repeat(self.detector),
+                                      repeat(self.criterios_calidad), chunksize=chunk)
+                for (h, ruta), (enc, error, motivo) in zip(orden, resultados):
+                    if error:
+                        print(f"[❌] Error en {os.path.basename(ruta)}: {error}")
+                        hashes.pop(ruta, None)            # No se cachea: se reintenta la próxima vez
+                        continue
+                    self._por_hash[h] = enc
+                    if motivo:
+                        print(f"[⚠️] {os.path.basename(ruta)} descartada por calidad ({motivo}), se omite.")
+                    elif enc is None:
+                        print(f"[⚠️] No se detectó rostro en {os.path.basename(ruta)}, se omite.")
+                self._guardar_cache()
+
+            encodings = [self._por_hash[h] for h in hashes.values() if self._por_hash.get(h) is not None]
+            duracion = time.time() - inicio
+
+        procesadas = len(pendientes)
+        velocidad = procesadas / duracion if duracion > 0 else 0.0
+        print(f"[⏱️] {nombre}: {len(rutas)} imágenes, {procesadas} codificadas, "
+              f"{len(rutas) - procesadas} desde caché en {duracion:.1f}s ({velocidad:.1f} img/s)")
+
+        if not encodings:
+            return np.empty((0, DIM), dtype=np.float32)
+        return np.stack(encodings).astype(np.float32)
+
+
+# Modo CLI: genera embeddings para todo el dataset (o los nombres indicados) en la galería empaquetada
+if __name__ == "__main__":
+    from galeria_empaquetada import GaleriaEmpaquetada
+    from configuracion import DETECTOR_ENROLAMIENTO, CRITERIOS_CALIDAD   # Los mismos que usa el bot: comparten la caché
+
+    dataset_dir, embeddings_dir = "dataset", "embeddings"
+    constructor = ConstructorEmbeddings(dataset_dir, os.path.join(embeddings_dir, "cache_imagenes.npz"),
+                                        detector=DETECTOR_ENROLAMIENTO, criterios_calidad=CRITERIOS_CALIDAD)
+    galeria_empaquetada = GaleriaEmpaquetada(embeddings_dir)
+
+    nombres = sys.argv[1:] or sorted(d for d in os.listdir(dataset_dir)
+                                     if os.path.isdir(os.path.join(dataset_dir, d)))
+    inicio = time.time()
+    for nombre in nombres:
+        encodings = constructor.construir(nombre)
+        previos = galeria_empaquetada.encodings_de(nombre)
+        if previos is not None and np.array_equal(previos, encodings):
+            print(f"[✅] {nombre} sin cambios.")
+            continue
+        if len(encodings):
+            galeria_empaquetada.guardar_identidad(nombre, encodings)
+            print(f"[📦] {nombre}: {len(encodings)} embeddings guardados")
+        else:
+            print(f"[⛔] No se generaron embeddings para {nombre}.")
+    constructor.cerrar()
+    print(f"\n🚀 Procesamiento completado en {time.time() - inicio:.1f}s.")
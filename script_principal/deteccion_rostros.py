@@ -0,0 +1,125 @@
+# === IMPORTS ===
+import cv2                                                # Conversión de color BGR → RGB
+import numpy as np                                        # Recortes contiguos para dlib
+import face_recognition                                   # Extracción de embeddings
+
+from detectores import obtener_detector                   # Detector intercambiable (HOG, Haar/LBP, DNN, cascada)
+
+MARGEN_RECORTE = 0.5                                      # Contexto alrededor de la caja (fracción del lado) al codificar un recorte
+
+
+def _buscar(rgb, detector, escala, upsample):
+    """
+    Corre 'detector' sobre 'rgb' reducido a 'escala' y devuelve las cajas
+    en coordenadas de 'rgb' (recortadas a sus bordes).
+    """
+    alto, ancho = rgb.shape[:2]
+    if escala != 1.0:
+        chico = cv2.resize(rgb, (max(1, int(ancho * escala)), max(1, int(alto * escala))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        chico = rgb
+    ubicaciones = []
+    for t, r, b, l in obtener_detector(detector).detectar(chico, upsample):
+        ubicaciones.append((max(0, int(t / escala)), min(ancho, int(r / escala)),
+                            min(alto, int(b / escala)), max(0, int(l / escala))))
+    return ubicaciones
+
+
+def detectar_ubicaciones(frame, detector="hog", regiones=None, escala=1.0, upsample_si_vacio=False):
+    """
+    Detecta los rostros de un frame BGR sin calcular encodings.
+    'detector' es una especificación de detectores.crear_detector() ("hog", "haar>hog", "dnn", ...).
+    Si se pasan 'regiones' (cajas top, right, bottom, left), sólo busca dentro de ellas
+    y lleva las ubicaciones a coordenadas del frame completo.
+    'escala' (< 1) detecta sobre una versión reducida y remapea las cajas a resolución
+    completa; el costo de HOG baja con el cuadrado de la escala. Si no aparece ningún
+    rostro y 'upsample_si_vacio' está activo, se repite con un upsample extra para
+    rostros chicos o lejanos.
+    Retorna (rgb, ubicaciones); 'rgb' (resolución completa) se reutiliza luego en codificar_rostros().
+    """
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)                    # face_recognition requiere RGB
+    zonas = regiones if regiones is not None else [(0, rgb.shape[1], rgb.shape[0], 0)]
+
+    for upsample in ((1, 2) if upsample_si_vacio else (1,)):
+        ubicaciones = []
+        for top, right, bottom, left in zonas:
+            recorte = np.ascontiguousarray(rgb[top:bottom, left:right])
+            for t, r, b, l in _buscar(recorte, detector, escala, upsample):
+                ubicaciones.append((t + top, r + left, b + top, l + left))
+        if ubicaciones:
+            break
+    return rgb, ubicaciones
+
+
+def ubicaciones_rostros(frame, detector="hog", regiones=None, escala=1.0, upsample_si_vacio=False):
+    """
+    Igual que detectar_ubicaciones(), pero retorna sólo las cajas. Es la versión para
+    el pool de procesos: de vuelta viaja una lista de tuplas y no el frame RGB completo.
+    """
+    return detectar_ubicaciones(frame, detector, regiones, escala, upsample_si_vacio)[1]
+
+
+def recortes_para_codificar(frame, ubicaciones, margen=MARGEN_RECORTE):
+    """
+    Recorta cada rostro del frame BGR con un margen de contexto para los landmarks.
+    Retorna [(recorte, ubicacion dentro del recorte)], lo que se envía al pool en lugar del frame.
+    """
+    alto, ancho = frame.shape[:2]
+    recortes = []
+    for top, right, bottom, left in ubicaciones:
+        my, mx = int((bottom - top) * margen), int((right - left) * margen)
+        t, r, b, l = max(0, top - my), min(ancho, right + mx), min(alto, bottom + my), max(0, left - mx)
+        recortes.append((np.ascontiguousarray(frame[t:b, l:r]), (top - t, right - l, bottom - t, left - l)))
+    return recortes
+
+
+def codificar_recortes(recortes):
+    """
+    Calcula el encoding de cada (recorte BGR, ubicacion) de recortes_para_codificar().
+    La conversión a RGB se hace acá, dentro del proceso que codifica.
+    Retorna la lista de encodings, en el mismo orden.
+    """
+    encodings = []
+    for recorte, ubicacion in recortes:
+        rgb = cv2.cvtColor(recorte, cv2.COLOR_BGR2RGB)
+        encodings.append(face_recognition.face_encodings(rgb, known_face_locations=[ubicacion])[0])
+    return encodings
+
+
+def codificar_rostros(frame, rgb, ubicaciones):
+    """
+    Calcula los encodings sólo de las ubicaciones indicadas (sin volver a detectar).
+    Retorna una lista de diccionarios con "ubicacion", "encoding" y "recorte" (BGR).
+    """
+    if not ubicaciones:
+        return []
+
+    encs = face_recognition.face_encodings(rgb, known_face_locations=ubicaciones)
+
+    rostros = []
+    for loc, enc in zip(ubicaciones, encs):
+        top, right, bottom, left = loc
+        rostros.append({
+            "ubicacion": loc,
+            "encoding": enc,
+            "recorte": frame[top:bottom, left:right],
+        })
+    return rostros
+
+
+def detectar_rostros(frame, detector="hog"):
+    """
+    Detecta todos los rostros de un frame BGR en una sola pasada.
+    Retorna una lista de diccionarios, uno por rostro:
+        - "ubicacion": (top, right, bottom, left) en coordenadas del frame
+        - "encoding": vector facial de 128 dimensiones
+        - "recorte": rostro recortado del frame original (BGR)
+    La detección se ejecuta una única vez y sus ubicaciones se reutilizan
+    para el encoding, evitando volver a detectar sobre el recorte.
+    """
+    if frame is None:
+        return []
+
+    rgb, locs = detectar_ubicaciones(frame, detector)                 # Única pasada de detección
+    return codificar_rostros(frame, rgb, locs)
@@ -0,0 +1,134 @@
+# === IMPORTS ===
+import time                                               # Control del rechequeo en reposo
+import cv2                                                # Reducción, diferencia de fondo y contornos
+import numpy as np                                        # Máscaras binarias
+
+
+class DetectorMovimiento:
+    """
+    Etapa previa barata a la detección facial: compara cada frame reducido en escala
+    de grises contra un fondo que se actualiza lentamente (media móvil). Sólo deja
+    pasar el frame a HOG si el área que cambió supera 'area_min' (fracción del frame),
+    y devuelve las regiones cambiadas para detectar sólo ahí.
+    En reposo, deja pasar un frame completo cada 'rechequeo' segundos (por si alguien
+    quedó quieto frente a la cámara).
+    Cuenta cuántos frames se evaluaron, cuántos se descartaron y por qué pasaron.
+    """
+
+    def __init__(self, ancho=160, umbral=25, area_min=0.005, alfa=0.05, rechequeo=10.0,
+                 margen=0.25, max_cobertura=0.5):
+        self.ancho = ancho                                # Ancho (px) del frame reducido para comparar
+        self.umbral = umbral                              # Diferencia mínima de gris para contar un píxel como cambiado
+        self.area_min = area_min                          # Fracción mínima del frame que tiene que cambiar
+        self.alfa = alfa                                  # Velocidad de adaptación del fondo
+        self.rechequeo = rechequeo                        # Segundos entre frames completos en reposo
+        self.margen = margen                              # Expansión de cada región (fracción de su lado)
+        self.max_cobertura = max_cobertura                # Si las regiones cubren más que esto, se usa el frame entero
+        self._fondo = None
+        self._ultimo_pase = 0.0
+
+        # Contadores
+        self.evaluados = 0
+        self.descartados = 0
+        self.por_movimiento = 0
+        self.por_rechequeo = 0
+        self.forzados = 0
+
+    def estadisticas(self):
+        return {
+            "evaluados": self.evaluados,
+            "descartados": self.descartados,
+            "por_movimiento": self.por_movimiento,
+            "por_rechequeo": self.por_rechequeo,
+            "forzados": self.forzados,
+        }
+
+    def evaluar(self, frame, forzar=False, ahora=None):
+        """
+        Decide si el frame debe pasar a detección facial.
+        Retorna (pasa, regiones): 'regiones' es una lista de cajas (top, right, bottom, left)
+        en coordenadas del frame original, o None para procesar el frame completo.
+        'forzar' deja pasar el frame completo (p. ej. mientras hay tracks activos).
+        """
+        ahora = ahora if ahora is not None else time.time()
+        self.evaluados += 1
+
+        alto_orig, ancho_orig = frame.shape[:2]
+        escala = self.ancho / ancho_orig
+        chico = cv2.resize(frame, (self.ancho, max(1, int(alto_orig * escala))), interpolation=cv2.INTER_AREA)
+        gris = cv2.GaussianBlur(cv2.cvtColor(chico, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._fondo is None:
+            self._fondo = gris.astype(np.float32)
+            self._ultimo_pase = ahora
+            self.por_rechequeo += 1
+            return True, None                             # Primer frame: sin referencia, se procesa entero
+
+        diferencia = cv2.absdiff(gris, cv2.convertScaleAbs(self._fondo))
+        cv2.accumulateWeighted(gris, self._fondo, self.alfa)
+        _, mascara = cv2.threshold(diferencia, self.umbral, 255, cv2.THRESH_BINARY)
+        mascara = cv2.dilate(mascara, None, iterations=2)
+        cambiado = cv2.countNonZero(mascara) / mascara.size
+
+        if forzar:
+            self.forzados += 1
+            self._ultimo_pase = ahora
+            return True, None
+
+        if cambiado < self.area_min:
+            if ahora - self._ultimo_pase >= self.rechequeo:
+                self.por_rechequeo += 1
+                self._ultimo_pase = ahora
+                return True, None
+            self.descartados += 1
+            return False, []
+
+        self.por_movimiento += 1
+        self._ultimo_pase = ahora
+        return True, self._regiones(mascara, escala, alto_orig, ancho_orig)
+
+    def _regiones(self, mascara, escala, alto, ancho):
+        contornos, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        minimo = self.area_min * mascara.size
+        cajas = []
+        for contorno in contornos:
+            if cv2.contourArea(contorno) < minimo / 4:
+                continue                                  # Ruido pequeño
+            x, y, w, h = cv2.boundingRect(contorno)
+            mx, my = w * self.margen, h * self.margen
+            top = max(0, int((y - my) / escala))
+            left = max(0, int((x - mx) / escala))
+            bottom = min(alto, int((y + h + my) / escala))
+            right = min(ancho, int((x + w + mx) / escala))
+            cajas.append((top, right, bottom, left))
+
+        cajas = unir_cajas(cajas)
+        cubierto = sum((b - t) * (r - l) for t, r, b, l in cajas)
+        if not cajas or cubierto > self.max_cobertura * alto * ancho:
+            return None                                   # Mucho movimiento: conviene el frame entero
+        return cajas
+
+
+def unir_cajas(cajas):
+    """
+    Une cajas (top, right, bottom, left) que se superponen hasta que no quede ninguna superpuesta.
+    """
+    cajas = list(cajas)
+    unidas = True
+    while unidas:
+        unidas = False
+        resultado = []
+        while cajas:
+            t, r, b, l = cajas.pop()
+            i = 0
+            while i < len(cajas):
+                t2, r2, b2, l2 = cajas[i]
+                if t < b2 and t2 < b and l < r2 and l2 < r:
+                    t, r, b, l = min(t, t2), max(r, r2), max(b, b2), min(l, l2)
+                    cajas.pop(i)
+                    unidas = True
+                else:
+                    i += 1
+            resultado.append((t, r, b, l))
+        cajas = resultado
+    return cajas
@@ -0,0 +1,183 @@
+# === IMPORTS ===
+import os                                                 # Rutas de los modelos locales
+import json                                               # Clave de caché para especificaciones con opciones
+import threading                                          # Una instancia de cada detector por hilo
+import cv2                                                # Cascadas Haar/LBP y red DNN de OpenCV
+import numpy as np                                        # Recortes contiguos y salida de la red
+import face_recognition                                   # Detector HOG/CNN de dlib
+
+from detector_movimiento import unir_cajas                # Une las regiones propuestas que se superponen
+
+DIRECTORIO_MODELOS = "modelos"                            # Modelos locales (cascada LBP, red DNN)
+RUTA_LBP = os.path.join(DIRECTORIO_MODELOS, "lbpcascade_frontalface_improved.xml")
+RUTA_DNN_CONFIG = os.path.join(DIRECTORIO_MODELOS, "deploy.prototxt")
+RUTA_DNN_MODELO = os.path.join(DIRECTORIO_MODELOS, "res10_300x300_ssd_iter_140000.caffemodel")
+
+
+class Detector:
+    """
+    Interfaz común: detectar(rgb, upsample) retorna las cajas (top, right, bottom, left)
+    de los rostros en coordenadas de 'rgb'. Para los detectores de OpenCV, cada
+    upsample por encima de 1 duplica la imagen antes de buscar (rostros chicos).
+    """
+    nombre = "base"
+
+    def detectar(self, rgb, upsample=1):
+        factor = 2 ** max(0, upsample - 1)
+        if factor == 1:
+            return self._detectar(rgb)
+        grande = cv2.resize(rgb, None, fx=factor, fy=factor, interpolation=cv2.INTER_LINEAR)
+        return [(t // factor, r // factor, b // factor, l // factor) for t, r, b, l in self._detectar(grande)]
+
+    def _detectar(self, rgb):
+        raise NotImplementedError
+
+
+class DetectorDlib(Detector):
+    """
+    Detector de face_recognition (dlib): "hog" (el de siempre) o "cnn" (más preciso y mucho más lento en CPU).
+    """
+
+    def __init__(self, modelo="hog"):
+        self.modelo = modelo
+        self.nombre = modelo
+
+    def detectar(self, rgb, upsample=1):
+        return face_recognition.face_locations(rgb, number_of_times_to_upsample=upsample, model=self.modelo)
+
+
+class DetectorCascadaOpenCV(Detector):
+    """
+    Cascada de OpenCV: Haar (incluida en opencv-python) o LBP (archivo local, más rápida
+    y con más falsos positivos). Muy barata; sirve como detector único o para proponer
+    regiones a un detector más caro.
+    """
+
+    def __init__(self, tipo="haar", ruta=None, factor_escala=1.1, vecinos=5, tam_min=24):
+        if ruta is None:
+            ruta = RUTA_LBP if tipo == "lbp" else os.path.join(cv2.data.haarcascades,
+                                                               "haarcascade_frontalface_default.xml")
+        self.clasificador = cv2.CascadeClassifier(ruta)
+        if self.clasificador.empty():
+            raise FileNotFoundError(f"No se pudo cargar la cascada {tipo}: {ruta}")
+        self.nombre = tipo
+        self.factor_escala = factor_escala
+        self.vecinos = vecinos
+        self.tam_min = tam_min
+
+    def _detectar(self, rgb):
+        gris = cv2.equalizeHist(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+        cajas = self.clasificador.detectMultiScale(gris, scaleFactor=self.factor_escala, minNeighbors=self.vecinos,
+                                                   minSize=(self.tam_min, self.tam_min))
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in cajas]
+
+
+class DetectorDNN(Detector):
+    """
+    Red SSD de OpenCV (res10 300x300, Caffe) con un modelo local. Más robusta que HOG con
+    rostros de perfil o mal iluminados y corre en CPU con cv2.dnn.
+    """
+
+    def __init__(self, modelo=RUTA_DNN_MODELO, config=RUTA_DNN_CONFIG, confianza=0.5, tamano=300):
+        for ruta in (modelo, config):
+            if not os.path.exists(ruta):
+                raise FileNotFoundError(f"Falta el archivo del detector DNN: {ruta}")
+        self.red = cv2.dnn.readNet(modelo, config)
+        self.red.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.nombre = "dnn"
+        self.confianza = confianza
+        self.tamano = tamano
+
+    def _detectar(self, rgb):
+        alto, ancho = rgb.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(rgb, (self.tamano, self.tamano)), 1.0, (self.tamano, self.tamano),
+                                     (104.0, 177.0, 123.0), swapRB=True)       # La red espera BGR
+        self.red.setInput(blob)
+        salida = self.red.forward()
+        cajas = []
+        for deteccion in salida[0, 0]:
+            if deteccion[2] < self.confianza:
+                continue
+            left, top, right, bottom = (deteccion[3:7] * np.array([ancho, alto, ancho, alto])).astype(int)
+            top, left = max(0, top), max(0, left)
+            bottom, right = min(alto, bottom), min(ancho, right)
+            if bottom > top and right > left:
+                cajas.append((int(top), int(right), int(bottom), int(left)))
+        return cajas
+
+
+class DetectorEnCascada(Detector):
+    """
+    Dos pasos: un detector barato ('propone') marca regiones candidatas y el detector caro
+    ('verifica') sólo busca dentro de ellas, agrandadas en 'margen' (fracción del lado).
+    Sin candidatas no se corre el detector caro. Las cajas que se devuelven son las del
+    verificador, llevadas a coordenadas de la imagen completa.
+    """
+
+    def __init__(self, propone, verifica, margen=0.5):
+        self.propone = propone
+        self.verifica = verifica
+        self.margen = margen
+        self.nombre = f"{propone.nombre}>{verifica.nombre}"
+
+    def detectar(self, rgb, upsample=1):
+        alto, ancho = rgb.shape[:2]
+        regiones = []
+        for t, r, b, l in self.propone.detectar(rgb, upsample):
+            mx, my = int((r - l) * self.margen), int((b - t) * self.margen)
+            regiones.append((max(0, t - my), min(ancho, r + mx), min(alto, b + my), max(0, l - mx)))
+
+        ubicaciones = []
+        for top, right, bottom, left in unir_cajas(regiones):
+            recorte = np.ascontiguousarray(rgb[top:bottom, left:right])
+            for t, r, b, l in self.verifica.detectar(recorte, upsample):
+                ubicaciones.append((t + top, r + left, b + top, l + left))
+        return ubicaciones
+
+
+def crear_detector(especificacion):
+    """
+    Construye un detector a partir de su especificación:
+        - "hog", "cnn", "haar", "lbp", "dnn"
+        - "barato>caro" para el modo en cascada (ej. "haar>hog", "lbp>dnn")
+        - un diccionario {"tipo": ..., <opciones>} para ajustar parámetros, ej.
+          {"tipo": "dnn", "confianza": 0.6} o
+          {"tipo": "cascada", "propone": "haar", "verifica": "hog", "margen": 0.5}
+    """
+    if isinstance(especificacion, dict):
+        opciones = dict(especificacion)
+        tipo = opciones.pop("tipo")
+    else:
+        tipo, opciones = especificacion, {}
+
+    if tipo == "cascada":
+        return DetectorEnCascada(crear_detector(opciones.pop("propone")), crear_detector(opciones.pop("verifica")),
+                                 **opciones)
+    if ">" in tipo:
+        propone, verifica = tipo.split(">", 1)
+        return DetectorEnCascada(crear_detector(propone), crear_detector(verifica), **opciones)
+    if tipo in ("hog", "cnn"):
+        return DetectorDlib(tipo)
+    if tipo in ("haar", "lbp"):
+        return DetectorCascadaOpenCV(tipo, **opciones)
+    if tipo == "dnn":
+        return DetectorDNN(**opciones)
+    raise ValueError(f"Detector desconocido: {tipo}")
+
+
+_locales = threading.local()                              # Caché de detectores del hilo actual
+
+
+def obtener_detector(especificacion):
+    """
+    Retorna el detector de 'especificacion' creado una sola vez por hilo (las redes y
+    cascadas de OpenCV no se comparten entre hilos). Al recibir sólo la especificación,
+    también sirve dentro de un pool de procesos.
+    """
+    cache = getattr(_locales, "detectores", None)
+    if cache is None:
+        cache = _locales.detectores = {}
+    clave = json.dumps(especificacion, sort_keys=True)
+    if clave not in cache:
+        cache[clave] = crear_detector(especificacion)
+    return cache[clave]
@@ -0,0 +1,120 @@
+# === IMPORTS ===
+import os                                                 # Carpetas de destino
+import time                                               # Duración de cada tanda de escritura
+import threading                                          # Hilo de escritura y sincronización de la cola
+from collections import deque                             # Lotes pendientes
+import cv2                                                # Codificación JPEG en memoria
+
+CALIDAD_JPEG = 90                                         # Calidad de las imágenes codificadas
+
+
+def codificar_jpeg(imagen, calidad=CALIDAD_JPEG):
+    """
+    Codifica una imagen BGR a JPEG en memoria. Retorna los bytes, o None si no se pudo.
+    """
+    if imagen is None or imagen.size == 0:
+        return None
+    ok, jpeg = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, calidad])
+    return jpeg.tobytes() if ok else None
+
+
+class EscritorImagenes:
+    """
+    Escribe imágenes a disco en segundo plano, por lotes: quien genera las imágenes
+    (el pipeline) nunca espera al disco. Cada lote es una lista de (ruta, imagen BGR o
+    bytes JPEG); la codificación JPEG también se hace en este hilo. El hilo toma todos
+    los lotes pendientes de una vez y, al terminar cada uno, llama a su 'al_terminar'
+    con las rutas escritas (en el orden del lote).
+    Con 'metricas' se registra la duración de cada tanda ("disco") y se cuentan las
+    imágenes y los bytes escritos.
+    """
+
+    def __init__(self, metricas=None, calidad=CALIDAD_JPEG):
+        self.metricas = metricas
+        self.calidad = calidad
+        self._lotes = deque()
+        self._cond = threading.Condition()
+        self._en_curso = 0
+        self._activo = False
+        self._hilo = None
+
+    # ------------------------------ ciclo de vida ------------------------------
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, name="escritor-imagenes", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, timeout=10):
+        self.vaciar(timeout)
+        self._activo = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(timeout=timeout)
+            self._hilo = None
+
+    def vaciar(self, timeout=None):
+        """
+        Espera a que se escriban los lotes pendientes. Retorna True si no quedó ninguno.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._lotes and not self._en_curso, timeout=timeout)
+
+    def pendientes(self):
+        with self._cond:
+            return len(self._lotes)
+
+    # --------------------------------- escritura --------------------------------
+    def escribir(self, archivos, al_terminar=None):
+        """
+        Encola un lote de (ruta, imagen o bytes JPEG). Retorna inmediatamente.
+        """
+        with self._cond:
+            self._lotes.append((list(archivos), al_terminar))
+            self._cond.notify_all()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._lotes or not self._activo)
+                if not self._lotes:
+                    return
+                tanda = list(self._lotes)                 # Todos los lotes pendientes en una sola pasada
+                self._lotes.clear()
+                self._en_curso = len(tanda)
+
+            inicio = time.perf_counter()
+            for archivos, al_terminar in tanda:
+                rutas = self._escribir_lote(archivos)
+                if al_terminar is not None:
+                    try:
+                        al_terminar(rutas)
+                    except Exception as e:
+                        print(f"[💥] Error al cerrar un lote de imágenes: {e}")
+            if self.metricas is not None:
+                self.metricas.observar("disco", time.perf_counter() - inicio)
+
+            with self._cond:
+                self._en_curso = 0
+                self._cond.notify_all()
+
+    def _escribir_lote(self, archivos):
+        rutas = []
+        for ruta, imagen in archivos:
+            datos = imagen if isinstance(imagen, bytes) else codificar_jpeg(imagen, self.calidad)
+            if datos is None:
+                continue
+            try:
+                os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+                with open(ruta, "wb") as f:
+                    f.write(datos)
+            except OSError as e:
+                print(f"[❌] No se pudo guardar {ruta}: {e}")
+                continue
+            rutas.append(ruta)
+            if self.metricas is not None:
+                self.metricas.contar("imagenes_escritas")
+                self.metricas.contar("bytes_escritos", len(datos))
+        return rutas
@@ -0,0 +1,153 @@
+# === IMPORTS ===
+import os                                                 # Listado de carpetas de imágenes
+import time                                               # Ritmo de reproducción a velocidad nativa
+import threading                                          # Hilo reproductor (modo nativo)
+from collections import deque                             # Buffer de los últimos frames, como en la cámara
+import cv2                                                # Lectura de video e imágenes
+
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FuenteReplay:
+    """
+    Fuente de frames grabados con la misma interfaz que LectorCamaraDual, para correr el
+    pipeline sin cámara (pruebas y benchmarks). Acepta un archivo de video o una carpeta
+    de imágenes (en orden de nombre).
+    - Velocidad nativa: un hilo publica los frames al ritmo del video ('fps'); si el
+      pipeline no da abasto, los frames intermedios se pierden igual que con la cámara.
+    - Velocidad máxima ('maxima=True'): cada esperar_frame() entrega el frame siguiente,
+      sin saltear ninguno; sirve para medir el costo por frame.
+    Al terminar (sin 'repetir'), 'terminado' pasa a True y esperar_frame() retorna None.
+    """
+
+    def __init__(self, ruta, maxima=False, fps=None, repetir=False, tam_buffer=2):
+        self.ruta = ruta
+        self.maxima = maxima
+        self.repetir = repetir
+        self._es_carpeta = os.path.isdir(ruta)
+        self._archivos = []
+        self._cap = None
+        self._posicion = 0
+        self.fps = fps
+        self._buffer = deque(maxlen=tam_buffer)
+        self._lock = threading.Lock()
+        self._nuevo_frame = threading.Condition(self._lock)
+        self._numero = 0
+        self._hilo = None
+        self._activo = False
+        self.terminado = False
+        self.conectado = False
+        self.leidos = 0                                   # Frames leídos de la fuente
+
+    def _abrir(self):
+        if self._es_carpeta:
+            self._archivos = sorted(os.path.join(self.ruta, f) for f in os.listdir(self.ruta)
+                                    if f.lower().endswith(EXTENSIONES))
+            self.fps = self.fps or 10.0
+        else:
+            self._cap = cv2.VideoCapture(self.ruta)
+            if not self._cap.isOpened():
+                raise ValueError(f"No se pudo abrir el video {self.ruta}")
+            self.fps = self.fps or self._cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self._posicion = 0
+
+    def _siguiente(self):
+        """
+        Lee el próximo frame de la fuente (None al terminar, salvo con 'repetir').
+        """
+        for _ in range(2):                                # Segundo intento tras rebobinar
+            if self._es_carpeta:
+                while self._posicion < len(self._archivos):
+                    frame = cv2.imread(self._archivos[self._posicion])
+                    self._posicion += 1
+                    if frame is not None:
+                        self.leidos += 1
+                        return frame
+            else:
+                ret, frame = self._cap.read()
+                if ret and frame is not None:
+                    self.leidos += 1
+                    return frame
+            if not self.repetir:
+                return None
+            if self._es_carpeta:
+                self._posicion = 0
+            else:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return None
+
+    def _publicar(self, frame):
+        with self._nuevo_frame:
+            if frame is None:
+                self.terminado = True
+            else:
+                self._numero += 1
+                self._buffer.append((time.time(), self._numero, frame))
+            self._nuevo_frame.notify_all()
+
+    # ------------------------------ ciclo de vida ------------------------------
+    def iniciar(self):
+        if self.conectado:
+            return self
+        self._abrir()
+        self.conectado = True
+        if not self.maxima:
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle_nativo, daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._activo = False
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self.conectado = False
+
+    def _bucle_nativo(self):
+        inicio = time.perf_counter()
+        publicados = 0
+        while self._activo:
+            frame = self._siguiente()
+            self._publicar(frame)
+            if frame is None:
+                return
+            publicados += 1
+            espera = inicio + publicados / self.fps - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+    # ------------------------ interfaz de la cámara ------------------------
+    def ultimo_frame(self):
+        info = self.ultimo_frame_info()
+        return info[2] if info is not None else None
+
+    def ultimo_frame_info(self):
+        with self._lock:
+            return self._buffer[-1] if self._buffer else None
+
+    def esperar_frame(self, posterior_a=0, timeout=None):
+        """
+        Igual que LectorCamara.esperar_frame(); retorna None al vencer el timeout o al terminar.
+        """
+        if self.maxima:
+            self._publicar(self._siguiente())
+        with self._nuevo_frame:
+            ok = self._nuevo_frame.wait_for(
+                lambda: self.terminado or (self._buffer and self._buffer[-1][1] > posterior_a), timeout=timeout)
+            if not ok or not self._buffer or self._buffer[-1][1] <= posterior_a:
+                return None
+            return self._buffer[-1]
+
+    def tiempo_frame(self, numero):
+        """
+        Segundos de video del frame 'numero': el reloj con el que se miden la recolección
+        de desconocidos y su límite, sea cual sea la velocidad de reproducción.
+        """
+        return numero / (self.fps or 25.0)
+
+    def frame_principal(self, referencia):
+        return referencia, 1.0, 1.0                       # Un único stream a resolución completa
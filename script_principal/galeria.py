@@ -0,0 +1,149 @@
+# === IMPORTS ===
+import numpy as np                                        # Álgebra vectorizada sobre la matriz de encodings
+
+
+class Galeria:
+    """
+    Base de rostros conocidos en forma de matriz contigua float32 (N x 128)
+    más un arreglo de etiquetas enteras que indexa 'nombres'.
+    Las filas de una misma identidad quedan contiguas, lo que permite calcular
+    la mejor distancia por identidad con una sola reducción vectorizada.
+    Una vez construida no se modifica: para actualizarla se crea una nueva.
+    Con un 'indice' aproximado (ver indice_vectorial.py) cada consulta sólo se
+    compara con las filas candidatas que el índice devuelve.
+    """
+
+    def __init__(self, encodings_por_nombre=None, dim=128, indice=None):
+        encodings_por_nombre = encodings_por_nombre or {}
+        bloques = []
+        matrices = []
+        inicio = 0
+        for nombre, encodings in encodings_por_nombre.items():
+            bloque = np.asarray(encodings, dtype=np.float32).reshape(-1, dim)
+            if len(bloque) == 0:
+                continue
+            bloques.append((nombre, inicio, len(bloque)))
+            matrices.append(bloque)
+            inicio += len(bloque)
+
+        if matrices:
+            matriz = np.ascontiguousarray(np.concatenate(matrices))
+        else:
+            matriz = np.empty((0, dim), dtype=np.float32)
+        self._preparar(matriz, bloques, indice=indice)
+
+    @classmethod
+    def desde_bloques(cls, matriz, bloques, normas=None, indice=None):
+        """
+        Construye la galería sobre una matriz existente (p. ej. un np.memmap) sin copiarla.
+        'bloques' es una lista de (nombre, inicio, cantidad); las filas que no pertenecen
+        a ningún bloque se ignoran al comparar. 'normas' permite reutilizar ||g||² ya calculado.
+        """
+        galeria = cls.__new__(cls)
+        galeria._preparar(matriz, bloques, normas, indice)
+        return galeria
+
+    def _preparar(self, matriz, bloques, normas=None, indice=None):
+        self.matriz = matriz
+        self.indice = indice                              # None / exacto: fuerza bruta; IVF: sólo candidatos
+        self.dim = matriz.shape[1]
+        self.nombres = []                                 # Nombre de cada identidad (índice = etiqueta)
+        self.etiquetas = np.full(len(matriz), -1, dtype=np.int32)   # -1: fila sin identidad (descartada)
+
+        # Segmentos contiguos que cubren toda la matriz: identidades y huecos intermedios
+        inicios = []
+        validos = []
+        fila = 0
+        for nombre, inicio, cantidad in sorted(bloques, key=lambda b: b[1]):
+            if cantidad <= 0:
+                continue
+            if inicio > fila:
+                inicios.append(fila)                      # Hueco de filas descartadas
+            validos.append(len(inicios))
+            inicios.append(inicio)
+            self.etiquetas[inicio:inicio + cantidad] = len(self.nombres)
+            self.nombres.append(nombre)
+            fila = inicio + cantidad
+        if 0 < fila < len(matriz):
+            inicios.append(fila)                          # Filas descartadas al final
+
+        self._inicios = np.asarray(inicios, dtype=np.int64)         # Fila donde empieza cada segmento
+        self._validos = np.asarray(validos, dtype=np.int64)         # Segmentos que son identidades
+        self._cantidad = int(np.count_nonzero(self.etiquetas >= 0))
+        if normas is None:
+            normas = np.einsum("ij,ij->i", matriz, matriz)          # ||g||² precalculado
+        self._normas = normas
+
+    def __len__(self):
+        return self._cantidad
+
+    def distancias(self, encodings):
+        """
+        Distancia euclídea entre cada encoding consultado (M x 128) y cada fila
+        de la galería. Retorna una matriz M x N.
+        """
+        consultas = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        normas_q = np.einsum("ij,ij->i", consultas, consultas)
+        d2 = normas_q[:, None] + self._normas[None, :] - 2.0 * (consultas @ self.matriz.T)
+        np.maximum(d2, 0.0, out=d2)                                           # Errores de redondeo
+        return np.sqrt(d2)
+
+    def identificar(self, encodings, tolerancia=0.4):
+        """
+        Compara todos los rostros de un frame contra la galería en un solo cálculo.
+        Para cada encoding retorna un diccionario con:
+            - "nombre": identidad más cercana, o None si supera la tolerancia
+            - "distancia": distancia a la identidad más cercana
+            - "margen": diferencia con la segunda identidad más cercana (inf si no hay)
+        """
+        consultas = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(consultas) == 0:
+            return []
+        if not self.nombres:
+            return [{"nombre": None, "distancia": float("inf"), "margen": float("inf")}
+                    for _ in range(len(consultas))]
+
+        candidatos = self.indice.candidatos(consultas) if self.indice is not None else None
+        if candidatos is not None:
+            return [self._identificar_candidatos(q, filas, tolerancia) for q, filas in zip(consultas, candidatos)]
+
+        # Mínima distancia por identidad: M x K (K = cantidad de identidades)
+        por_segmento = np.minimum.reduceat(self.distancias(consultas), self._inicios, axis=1)
+        por_identidad = por_segmento[:, self._validos]
+
+        resultados = []
+        for fila in por_identidad:
+            mejor = int(np.argmin(fila))
+            distancia = float(fila[mejor])
+            if len(fila) > 1:
+                segunda = float(np.partition(fila, 1)[1])
+                margen = segunda - distancia
+            else:
+                margen = float("inf")
+            resultados.append({
+                "nombre": self.nombres[mejor] if distancia <= tolerancia else None,
+                "distancia": distancia,
+                "margen": margen,
+            })
+        return resultados
+
+    def _identificar_candidatos(self, consulta, filas, tolerancia):
+        """
+        Igual que identificar() para una consulta, pero sólo contra las filas candidatas.
+        El margen se calcula con la segunda identidad entre los candidatos.
+        """
+        filas = filas[self.etiquetas[filas] >= 0]                            # Descarta filas sin identidad
+        if len(filas) == 0:
+            return {"nombre": None, "distancia": float("inf"), "margen": float("inf")}
+
+        d2 = float(consulta @ consulta) + self._normas[filas] - 2.0 * (self.matriz[filas] @ consulta)
+        distancias = np.sqrt(np.maximum(d2, 0.0))
+        etiquetas = self.etiquetas[filas]
+        mejor = int(np.argmin(distancias))
+        distancia = float(distancias[mejor])
+        otras = distancias[etiquetas != etiquetas[mejor]]
+        return {
+            "nombre": self.nombres[etiquetas[mejor]] if distancia <= tolerancia else None,
+            "distancia": distancia,
+            "margen": float(otras.min()) - distancia if len(otras) else float("inf"),
+        }
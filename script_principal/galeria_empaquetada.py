@@ -0,0 +1,244 @@
+# === IMPORTS ===
+import os                                                 # Rutas, reemplazo atómico de archivos
+import sys                                                # Argumentos de línea de comandos
+import json                                               # Índice de nombres/offsets legible
+import shutil                                             # Mover los .pkl ya migrados
+import pickle                                             # Lectura de los .pkl heredados (sólo en la migración)
+import threading                                          # Serializa escrituras dentro del proceso
+from contextlib import contextmanager                     # Bloqueo de escritura como bloque 'with'
+import numpy as np                                        # Matriz float32 y mapeo en memoria
+try:
+    import fcntl                                          # Bloqueo entre procesos (bot, CLI de embeddings, compactación)
+except ImportError:
+    fcntl = None                                          # Windows: sólo se serializa dentro del proceso
+
+FORMATO = "galeria-empaquetada"                           # Identificador del formato en el índice
+VERSION_FORMATO = 1                                       # Versión del formato en disco
+ARCHIVO_INDICE = "galeria.json"                           # Índice: versión, archivo de datos, nombres y offsets
+ARCHIVO_BLOQUEO = "galeria.lock"                          # Lo toma quien escribe, aunque sea otro proceso
+DIM = 128                                                 # Dimensión de los encodings de face_recognition
+
+
+class GaleriaEmpaquetada:
+    """
+    Galería en disco en un único archivo binario float32 (filas x 128) más un índice JSON.
+    El archivo de datos sólo crece: cada alta agrega un bloque al final y el índice pasa
+    a apuntar al bloque nuevo; el bloque anterior de esa identidad queda descartado
+    hasta la próxima compactación. El índice se reemplaza de forma atómica, por lo que
+    los lectores ven siempre un estado consistente.
+    Varios procesos pueden mapear el mismo archivo (np.memmap) y compartir la copia
+    en memoria del sistema operativo. Las escrituras toman un bloqueo de archivo
+    (galeria.lock), así el bot y el CLI pueden escribir a la vez sin pisarse el índice.
+
+    Índice:
+        {"formato", "version", "revision", "dim", "datos", "filas",
+         "identidades": [{"nombre", "inicio", "cantidad"[, "metadatos"]}, ...]}
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, ARCHIVO_INDICE)
+        self.ruta_bloqueo = os.path.join(directorio, ARCHIVO_BLOQUEO)
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    # ---------------------------- lectura ----------------------------
+    def leer_indice(self):
+        """
+        Retorna el índice vigente (dict). Si todavía no existe, un índice vacío.
+        """
+        if not os.path.exists(self.ruta_indice):
+            return {"formato": FORMATO, "version": VERSION_FORMATO, "revision": 0, "dim": DIM,
+                    "datos": "galeria_000000.f32", "filas": 0, "identidades": []}
+        with open(self.ruta_indice, "r", encoding="utf-8") as f:
+            indice = json.load(f)
+        if indice.get("formato") != FORMATO or indice.get("version") != VERSION_FORMATO:
+            raise ValueError(f"Formato de galería no soportado: {indice.get('formato')} v{indice.get('version')}")
+        return indice
+
+    def mapear(self, indice=None):
+        """
+        Mapea en memoria (sólo lectura) las filas del archivo de datos descritas por el índice.
+        Retorna (indice, matriz); la matriz es un np.memmap compartible entre procesos.
+        """
+        indice = indice or self.leer_indice()
+        if indice["filas"] == 0:
+            return indice, np.empty((0, indice["dim"]), dtype=np.float32)
+        ruta_datos = os.path.join(self.directorio, indice["datos"])
+        matriz = np.memmap(ruta_datos, dtype=np.float32, mode="r", shape=(indice["filas"], indice["dim"]))
+        return indice, matriz
+
+    def encodings_de(self, nombre):
+        """
+        Retorna una copia (cantidad x 128) de los encodings vigentes de una identidad, o None.
+        """
+        indice, matriz = self.mapear()
+        for ident in indice["identidades"]:
+            if ident["nombre"] == nombre:
+                return np.array(matriz[ident["inicio"]:ident["inicio"] + ident["cantidad"]])
+        return None
+
+    # --------------------------- escritura ---------------------------
+    @contextmanager
+    def _bloqueo(self):
+        """
+        Exclusión para leer-modificar-publicar el índice: entre hilos con el lock del
+        proceso y entre procesos con flock sobre galeria.lock (espera si otro lo tiene).
+        """
+        with self._lock, open(self.ruta_bloqueo, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _escribir_indice(self, indice):
+        indice["revision"] += 1
+        tmp = self.ruta_indice + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(indice, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ruta_indice)                 # Publicación atómica del índice
+
+    def _agregar_filas(self, indice, encodings):
+        """
+        Escribe 'encodings' al final de las filas vigentes del archivo de datos.
+        Retorna la fila de inicio. Los bytes sobrantes de una escritura interrumpida se truncan.
+        """
+        datos = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, indice["dim"]))
+        ruta_datos = os.path.join(self.directorio, indice["datos"])
+        inicio = indice["filas"]
+        modo = "r+b" if os.path.exists(ruta_datos) else "w+b"
+        with open(ruta_datos, modo) as f:
+            f.seek(inicio * indice["dim"] * 4)
+            f.write(datos.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        indice["filas"] = inicio + len(datos)
+        return inicio
+
+    def guardar_identidad(self, nombre, encodings, metadatos=None):
+        """
+        Agrega (o reemplaza) todos los encodings de una identidad.
+        'metadatos' (dict serializable a JSON) se guarda junto a la identidad en el índice.
+        Retorna la nueva revisión del índice.
+        """
+        return self.guardar_identidades({nombre: encodings}, {nombre: metadatos} if metadatos is not None else None)
+
+    def guardar_identidades(self, encodings_por_nombre, metadatos_por_nombre=None):
+        """
+        Igual que guardar_identidad() para varias identidades, con una sola escritura
+        de datos y una sola publicación del índice (altas masivas).
+        """
+        metadatos_por_nombre = metadatos_por_nombre or {}
+        with self._bloqueo():
+            indice = self.leer_indice()
+            bloques = {n: np.asarray(e, dtype=np.float32).reshape(-1, indice["dim"])
+                       for n, e in encodings_por_nombre.items()}
+            inicio = self._agregar_filas(indice, np.concatenate(list(bloques.values())))
+            indice["identidades"] = [i for i in indice["identidades"] if i["nombre"] not in bloques]
+            for nombre, bloque in bloques.items():
+                ident = {"nombre": nombre, "inicio": inicio, "cantidad": len(bloque)}
+                if nombre in metadatos_por_nombre:
+                    ident["metadatos"] = metadatos_por_nombre[nombre]
+                indice["identidades"].append(ident)
+                inicio += len(bloque)
+            self._escribir_indice(indice)
+            revision = indice["revision"]
+
+        if self.filas_descartadas() > max(1024, self.filas_vigentes()):
+            self.compactar()                              # Más de la mitad del archivo es basura
+        return revision
+
+    def eliminar_identidad(self, nombre):
+        """
+        Quita una identidad del índice (sus filas se liberan en la próxima compactación).
+        """
+        with self._bloqueo():
+            indice = self.leer_indice()
+            indice["identidades"] = [i for i in indice["identidades"] if i["nombre"] != nombre]
+            self._escribir_indice(indice)
+
+    def filas_vigentes(self):
+        return sum(i["cantidad"] for i in self.leer_indice()["identidades"])
+
+    def filas_descartadas(self):
+        indice = self.leer_indice()
+        return indice["filas"] - sum(i["cantidad"] for i in indice["identidades"])
+
+    def compactar(self):
+        """
+        Reescribe sólo las filas vigentes en un archivo de datos nuevo y apunta el índice a él.
+        El archivo anterior se borra; los procesos que todavía lo tienen mapeado conservan su copia.
+        """
+        with self._bloqueo():
+            indice, matriz = self.mapear()
+            anterior = indice["datos"]
+            nuevo = f"galeria_{indice['revision'] + 1:06d}.f32"
+            identidades = []
+            fila = 0
+            with open(os.path.join(self.directorio, nuevo), "wb") as f:
+                for ident in sorted(indice["identidades"], key=lambda i: i["inicio"]):
+                    bloque = matriz[ident["inicio"]:ident["inicio"] + ident["cantidad"]]
+                    f.write(np.ascontiguousarray(bloque).tobytes())
+                    identidades.append(dict(ident, inicio=fila))
+                    fila += ident["cantidad"]
+                f.flush()
+                os.fsync(f.fileno())
+            del matriz
+
+            descartadas = indice["filas"] - fila
+            indice.update({"datos": nuevo, "filas": fila, "identidades": identidades})
+            self._escribir_indice(indice)
+
+            try:
+                os.remove(os.path.join(self.directorio, anterior))
+            except OSError:
+                pass                                      # No existía o sigue abierto (Windows)
+            print(f"[🗜️] Galería compactada: {fila} filas vigentes, {descartadas} descartadas")
+
+
+def migrar_pickles(directorio, galeria_empaquetada=None):
+    """
+    Migra los .pkl por persona (formato anterior) a la galería empaquetada.
+    Cada .pkl migrado se mueve a '<directorio>/pkl_migrados/'. Retorna la cantidad migrada.
+    """
+    pkls = sorted(a for a in os.listdir(directorio) if a.endswith(".pkl"))
+    if not pkls:
+        return 0
+
+    galeria_empaquetada = galeria_empaquetada or GaleriaEmpaquetada(directorio)
+    destino = os.path.join(directorio, "pkl_migrados")
+    os.makedirs(destino, exist_ok=True)
+
+    migrados = 0
+    for archivo in pkls:
+        ruta = os.path.join(directorio, archivo)
+        try:
+            with open(ruta, "rb") as f:
+                data = pickle.load(f)
+            if len(data["encodings"]):
+                galeria_empaquetada.guardar_identidad(data["name"], data["encodings"])
+            shutil.move(ruta, os.path.join(destino, archivo))
+            migrados += 1
+            print(f"[📦] {archivo} migrado a la galería empaquetada")
+        except Exception as e:
+            print(f"[❌] No se pudo migrar {archivo}: {e}")
+    return migrados
+
+
+# Modo CLI: python galeria_empaquetada.py --migrar|--compactar [directorio]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("--migrar", "--compactar"):
+        print("Uso: python galeria_empaquetada.py --migrar|--compactar [directorio_embeddings]")
+        sys.exit(1)
+
+    directorio = sys.argv[2] if len(sys.argv) > 2 else "embeddings"
+    if sys.argv[1] == "--migrar":
+        print(f"[✅] {migrar_pickles(directorio)} archivos .pkl migrados")
+    else:
+        GaleriaEmpaquetada(directorio).compactar()
@@ -0,0 +1,203 @@
+# === IMPORTS ===
+import os                                                 # Rutas y reemplazo atómico del índice persistido
+import sys                                                # Argumentos de línea de comandos
+import time                                               # Medición de tiempos en el benchmark
+import numpy as np                                        # k-means y listas invertidas vectorizadas
+
+FORMATO = "indice-ivf"
+VERSION = 1
+
+
+def _mas_cercano(datos, centroides, bloque=8192):
+    """
+    Centroide más cercano de cada fila de 'datos' (procesado por bloques para acotar memoria).
+    Retorna (indices, distancias²).
+    """
+    normas_c = np.einsum("ij,ij->i", centroides, centroides)
+    indices = np.empty(len(datos), dtype=np.int32)
+    d2 = np.empty(len(datos), dtype=np.float32)
+    for i in range(0, len(datos), bloque):
+        parte = np.asarray(datos[i:i + bloque], dtype=np.float32)
+        dist = normas_c[None, :] - 2.0 * (parte @ centroides.T)              # ||x||² no cambia el argmin
+        indices[i:i + bloque] = np.argmin(dist, axis=1)
+        d2[i:i + bloque] = np.maximum(dist[np.arange(len(parte)), indices[i:i + bloque]]
+                                      + np.einsum("ij,ij->i", parte, parte), 0.0)
+    return indices, d2
+
+
+def kmeans(datos, k, iteraciones=20, semilla=0):
+    """
+    k-means (inicialización k-means++) sobre las filas de 'datos'.
+    Retorna (centroides k' x dim, asignacion por fila); k' <= k si hay menos filas que k.
+    """
+    datos = np.asarray(datos, dtype=np.float32)
+    rng = np.random.default_rng(semilla)
+    k = max(1, min(k, len(datos)))
+
+    # k-means++: cada centroide nuevo se elige con probabilidad proporcional a d² al más cercano
+    centroides = np.empty((k, datos.shape[1]), dtype=np.float32)
+    centroides[0] = datos[rng.integers(len(datos))]
+    d2 = np.einsum("ij,ij->i", datos - centroides[0], datos - centroides[0])
+    for c in range(1, k):
+        total = float(d2.sum())
+        elegido = rng.choice(len(datos), p=d2 / total) if total > 0 else rng.integers(len(datos))
+        centroides[c] = datos[elegido]
+        d2 = np.minimum(d2, np.einsum("ij,ij->i", datos - centroides[c], datos - centroides[c]))
+
+    asignacion = np.zeros(len(datos), dtype=np.int32)
+    for it in range(iteraciones):
+        nueva, _ = _mas_cercano(datos, centroides)
+        if it > 0 and np.array_equal(nueva, asignacion):
+            break                                         # Convergió
+        asignacion = nueva
+
+        # Promedio por grupo con una sola reducción sobre las filas ordenadas por grupo
+        orden = np.argsort(asignacion, kind="stable")
+        grupos, inicios, conteos = np.unique(asignacion[orden], return_index=True, return_counts=True)
+        centroides[grupos] = np.add.reduceat(datos[orden], inicios, axis=0) / conteos[:, None]
+        vacios = np.setdiff1d(np.arange(k), grupos)
+        if len(vacios):
+            centroides[vacios] = datos[rng.choice(len(datos), len(vacios), replace=False)]   # Re-siembra
+    return centroides, asignacion
+
+
+class IndiceExacto:
+    """
+    Búsqueda por fuerza bruta: todas las filas son candidatas (resultado exacto).
+    """
+    tipo = "exacto"
+
+    def candidatos(self, consultas):
+        return None                                       # None = comparar contra toda la galería
+
+
+class IndiceIVF:
+    """
+    Índice aproximado por listas invertidas (IVF): las filas de la galería se reparten
+    entre 'nlistas' centroides de k-means y cada consulta sólo se compara con las filas
+    de sus 'nprobe' listas más cercanas. 'nprobe' regula recall vs. velocidad
+    (nprobe = nlistas equivale a la búsqueda exacta).
+    Es inmutable: agregar filas retorna un índice nuevo, así una galería ya publicada
+    nunca ve cambiar su índice. Las filas nuevas se asignan a los centroides existentes;
+    al crecer mucho respecto de lo entrenado conviene reentrenar (ver necesita_reentrenar).
+    """
+    tipo = "ivf"
+
+    def __init__(self, centroides, asignacion, nprobe=8, entrenadas=None, datos=None):
+        self.centroides = np.asarray(centroides, dtype=np.float32)
+        self.asignacion = np.asarray(asignacion, dtype=np.int32)    # Lista de cada fila de la matriz
+        self.nprobe = nprobe                              # Listas revisadas por consulta
+        self.entrenadas = entrenadas if entrenadas is not None else len(self.asignacion)
+        self.datos = datos                                # Archivo de datos de la galería que indexa
+        self._orden = np.argsort(self.asignacion, kind="stable").astype(np.int64)
+        self._limites = np.searchsorted(self.asignacion[self._orden], np.arange(len(self.centroides) + 1))
+
+    @property
+    def filas(self):
+        return len(self.asignacion)
+
+    @classmethod
+    def entrenar(cls, matriz, filas_validas=None, nlistas=None, nprobe=8, muestra_por_lista=64, datos=None, semilla=0):
+        """
+        Entrena los centroides con una muestra de las filas válidas y asigna todas las filas.
+        Por defecto nlistas ≈ √N.
+        """
+        filas_validas = np.arange(len(matriz)) if filas_validas is None else np.asarray(filas_validas)
+        nlistas = nlistas or max(1, int(np.sqrt(len(filas_validas))))
+        rng = np.random.default_rng(semilla)
+        muestra = filas_validas
+        if len(muestra) > nlistas * muestra_por_lista:
+            muestra = np.sort(rng.choice(filas_validas, nlistas * muestra_por_lista, replace=False))
+        centroides, _ = kmeans(matriz[muestra], nlistas, semilla=semilla)
+        asignacion, _ = _mas_cercano(matriz, centroides)
+        return cls(centroides, asignacion, nprobe, entrenadas=len(filas_validas), datos=datos)
+
+    def agregar(self, matriz):
+        """
+        Retorna un índice nuevo que además cubre las filas [self.filas, len(matriz)).
+        """
+        nuevas, _ = _mas_cercano(matriz[self.filas:], self.centroides)
+        return IndiceIVF(self.centroides, np.concatenate([self.asignacion, nuevas]),
+                         self.nprobe, self.entrenadas, self.datos)
+
+    def necesita_reentrenar(self, filas, factor=4.0):
+        return filas > factor * max(1, self.entrenadas)
+
+    def candidatos(self, consultas):
+        """
+        Filas candidatas de cada consulta (lista de arreglos de índices).
+        """
+        consultas = np.asarray(consultas, dtype=np.float32)
+        nprobe = min(self.nprobe, len(self.centroides))
+        normas_c = np.einsum("ij,ij->i", self.centroides, self.centroides)
+        dist = normas_c[None, :] - 2.0 * (consultas @ self.centroides.T)
+        listas = np.argpartition(dist, nprobe - 1, axis=1)[:, :nprobe]
+        return [np.concatenate([self._orden[self._limites[c]:self._limites[c + 1]] for c in fila])
+                for fila in listas]
+
+    def guardar(self, ruta):
+        """
+        Persiste centroides y asignaciones (npz, reemplazo atómico).
+        """
+        tmp = ruta + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, formato=FORMATO, version=VERSION, centroides=self.centroides,
+                     asignacion=self.asignacion, entrenadas=self.entrenadas, datos=self.datos or "")
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, nprobe=8):
+        """
+        Lee un índice persistido. Retorna None si no existe o no es de este formato/versión.
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta, allow_pickle=False) as datos:
+                if str(datos["formato"]) != FORMATO or int(datos["version"]) != VERSION:
+                    return None
+                return cls(datos["centroides"], datos["asignacion"], nprobe,
+                           int(datos["entrenadas"]), str(datos["datos"]) or None)
+        except Exception as e:
+            print(f"[⚠️] Índice vectorial ilegible ({e}), se reconstruye")
+            return None
+
+
+# Modo CLI: python indice_vectorial.py <embeddings_dir> [nprobes separados por coma] [consultas]
+# Mide recall (misma identidad que la búsqueda exacta) y tiempo por consulta con el índice IVF.
+if __name__ == "__main__":
+    from galeria import Galeria
+    from galeria_empaquetada import GaleriaEmpaquetada
+
+    if len(sys.argv) < 2:
+        print("Uso: python indice_vectorial.py <embeddings_dir> [1,4,8,16,32] [1000]")
+        sys.exit(1)
+
+    indice, matriz = GaleriaEmpaquetada(sys.argv[1]).mapear()
+    bloques = [(i["nombre"], i["inicio"], i["cantidad"]) for i in indice["identidades"]]
+    nprobes = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 4, 8, 16, 32]
+    cantidad = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    exacta = Galeria.desde_bloques(matriz, bloques)
+    validas = np.flatnonzero(exacta.etiquetas >= 0)
+    rng = np.random.default_rng(0)
+    consultas = matriz[rng.choice(validas, min(cantidad, len(validas)), replace=False)]
+    consultas = consultas + rng.normal(0, 0.02, consultas.shape).astype(np.float32)   # Rostros "nuevos" cercanos
+
+    inicio = time.perf_counter()
+    ivf = IndiceIVF.entrenar(matriz, validas)
+    print(f"[🧭] {len(validas)} embeddings, {len(ivf.centroides)} listas, entrenado en {time.perf_counter() - inicio:.1f}s")
+
+    inicio = time.perf_counter()
+    referencia = [r["nombre"] for r in exacta.identificar(consultas, tolerancia=float("inf"))]
+    ms_exacta = 1000 * (time.perf_counter() - inicio) / len(consultas)
+    print(f"{'nprobe':>7} {'ms/consulta':>12} {'recall':>7}")
+    print(f"{'exacto':>7} {ms_exacta:>12.3f} {1.0:>7.3f}")
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        galeria = Galeria.desde_bloques(matriz, bloques, exacta._normas, indice=ivf)
+        inicio = time.perf_counter()
+        nombres = [r["nombre"] for r in galeria.identificar(consultas, tolerancia=float("inf"))]
+        ms = 1000 * (time.perf_counter() - inicio) / len(consultas)
+        recall = np.mean([a == b for a, b in zip(nombres, referencia)])
+        print(f"{nprobe:>7} {ms:>12.3f} {recall:>7.3f}")
@@ -0,0 +1,223 @@
+# === IMPORTS ===
+import cv2                                                # Captura de video RTSP
+import time                                               # Control de tiempo, backoff de reconexión
+import threading                                          # Hilo lector en segundo plano
+from collections import deque                             # Buffer circular de los últimos frames
+
+
+class LectorCamara:
+    """
+    Mantiene abierto el stream RTSP y decodifica en un hilo de fondo.
+    Guarda sólo los frames más recientes en un buffer circular y reconecta
+    con backoff exponencial si la cámara se cae. Evita el handshake RTSP
+    y la espera de keyframe que implicaba abrir/cerrar la cámara por frame.
+    """
+
+    def __init__(self, url, tam_buffer=2, backoff_inicial=1.0, backoff_max=30.0):
+        self.url = url                                    # Dirección RTSP de la cámara
+        self.backoff_inicial = backoff_inicial            # Espera inicial (s) antes de reconectar
+        self.backoff_max = backoff_max                    # Espera máxima (s) entre reintentos
+        self._buffer = deque(maxlen=tam_buffer)           # (timestamp, numero, frame) más recientes
+        self._lock = threading.Lock()
+        self._nuevo_frame = threading.Condition(self._lock)
+        self._control = threading.Lock()                  # Serializa iniciar()/detener()
+        self._parar = threading.Event()                   # Señal de parada del hilo actual (uno nuevo por hilo)
+        self._hilo = None
+        self._numero = 0                                  # Contador incremental de frames leídos
+        self.conectado = False                            # Estado actual de la conexión
+
+    def iniciar(self):
+        """
+        Arranca el hilo lector (idempotente). Retorna la propia instancia.
+        Si el hilo anterior se detuvo pero sigue bloqueado en cap.read(), no se arranca
+        otro sobre el mismo buffer: se reintenta en el próximo llamado.
+        """
+        with self._control:
+            if self._hilo is not None and self._hilo.is_alive():
+                return self                               # Corriendo, o detenido pero todavía en cap.read()
+            self._parar = threading.Event()
+            self._hilo = threading.Thread(target=self._bucle_lectura, args=(self._parar,), daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        """
+        Detiene el hilo lector, libera la cámara y descarta los frames del buffer.
+        """
+        with self._control:
+            self._parar.set()
+            if self._hilo is not None:
+                self._hilo.join(timeout=5)
+                if not self._hilo.is_alive():
+                    self._hilo = None                     # Si sigue bloqueado, iniciar() lo sabrá y no duplica el lector
+            with self._lock:
+                self._buffer.clear()
+
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive() and not self._parar.is_set()
+
+    def _abrir(self):
+        cap = cv2.VideoCapture(self.url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)               # Minimiza la latencia interna del backend
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _bucle_lectura(self, parar):
+        backoff = self.backoff_inicial
+        while not parar.is_set():
+            cap = self._abrir()
+            if cap is None:
+                print(f"[📡] No se pudo conectar a la cámara, reintento en {backoff:.0f}s")
+                parar.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            self.conectado = True
+            backoff = self.backoff_inicial                # Conexión exitosa: reinicia el backoff
+            try:
+                while not parar.is_set():
+                    ret, frame = cap.read()
+                    if parar.is_set():
+                        break                             # Detenido mientras esperaba el frame: no se publica
+                    if not ret or frame is None:
+                        print("[📡] Stream interrumpido, reconectando...")
+                        break
+                    with self._nuevo_frame:
+                        self._numero += 1
+                        self._buffer.append((time.time(), self._numero, frame))
+                        self._nuevo_frame.notify_all()
+            finally:
+                self.conectado = False
+                cap.release()
+
+    def ultimo_frame(self):
+        """
+        Retorna el frame más reciente sin bloquear, o None si todavía no hay ninguno.
+        """
+        with self._lock:
+            if not self._buffer:
+                return None
+            return self._buffer[-1][2]
+
+    def ultimo_frame_info(self):
+        """
+        Igual que ultimo_frame() pero retorna (timestamp, numero, frame) o None.
+        El número permite saber si el frame ya fue procesado antes.
+        """
+        with self._lock:
+            if not self._buffer:
+                return None
+            return self._buffer[-1]
+
+    def esperar_frame(self, posterior_a=0, timeout=None):
+        """
+        Espera hasta que haya un frame con número mayor a 'posterior_a'.
+        Retorna (timestamp, numero, frame) o None si vence el timeout.
+        """
+        with self._nuevo_frame:
+            ok = self._nuevo_frame.wait_for(
+                lambda: self._buffer and self._buffer[-1][1] > posterior_a, timeout=timeout)
+            if not ok:
+                return None
+            return self._buffer[-1]
+
+
+def escalar_caja(caja, factor_y, factor_x):
+    """
+    Lleva una caja (top, right, bottom, left) de una resolución a otra.
+    """
+    top, right, bottom, left = caja
+    return (int(top * factor_y), int(right * factor_x), int(bottom * factor_y), int(left * factor_x))
+
+
+class LectorCamaraDual:
+    """
+    Lectura con dos streams de la misma cámara (p. ej. Tapo: stream2 = sub, stream1 = principal).
+    El substream de baja resolución se decodifica siempre y alimenta movimiento, detección
+    y seguimiento. El stream principal sólo se abre cuando se piden recortes en alta
+    resolución (encoding, enrolamiento, foto para Telegram) y se cierra tras
+    'inactividad_principal' segundos sin pedidos, así no se decodifica 1080p en reposo.
+    Sin 'url_sub' se comporta como un único stream (el principal hace de ambos).
+    """
+    terminado = False                                     # Un stream en vivo no termina (ver FuenteReplay)
+
+    def __init__(self, url_principal, url_sub=None, inactividad_principal=30.0, max_desfase=0.5):
+        self.inactividad_principal = inactividad_principal      # Segundos sin pedidos antes de cerrar el principal
+        self.max_desfase = max_desfase                          # Antigüedad máxima (s) de un frame principal utilizable
+        self._deteccion = LectorCamara(url_sub or url_principal)
+        self._principal = LectorCamara(url_principal) if url_sub else None
+        self._ultimo_pedido = 0.0
+        self._vigilante = None
+        self._parar = threading.Event()                   # Despierta al vigilante para que termine
+        self._lock_principal = threading.Lock()           # Apertura (pedidos) y cierre (vigilante) del principal
+        self._activo = False
+
+    def iniciar(self):
+        self._deteccion.iniciar()
+        if not self._activo:
+            self._activo = True
+            self._parar.clear()
+            if self._principal is not None:
+                self._vigilante = threading.Thread(target=self._vigilar_principal, daemon=True)
+                self._vigilante.start()
+        return self
+
+    def detener(self):
+        self._activo = False
+        self._parar.set()
+        if self._vigilante is not None:
+            self._vigilante.join()                        # No queda un vigilante viejo si se vuelve a iniciar
+            self._vigilante = None
+        self._deteccion.detener()
+        if self._principal is not None:
+            with self._lock_principal:
+                self._principal.detener()
+
+    # Interfaz del stream de detección (igual a LectorCamara)
+    @property
+    def conectado(self):
+        return self._deteccion.conectado
+
+    def ultimo_frame(self):
+        return self._deteccion.ultimo_frame()
+
+    def ultimo_frame_info(self):
+        return self._deteccion.ultimo_frame_info()
+
+    def esperar_frame(self, posterior_a=0, timeout=None):
+        return self._deteccion.esperar_frame(posterior_a, timeout)
+
+    def frame_principal(self, referencia):
+        """
+        Retorna (frame, factor_y, factor_x) del stream principal para recortar en alta
+        resolución cajas detectadas sobre 'referencia' (frame del stream de detección),
+        o None si el principal no tiene un frame reciente (se abre para los próximos pedidos)
+        o si el lector está detenido.
+        """
+        if not self._activo:
+            return None                                   # Detenido: no se reabre el stream principal
+        if self._principal is None:
+            return referencia, 1.0, 1.0                   # Un solo stream: ya es la resolución completa
+
+        self._ultimo_pedido = time.time()
+        if not self._lock_principal.acquire(blocking=False):
+            return None                                   # El vigilante lo está cerrando: no se espera
+        try:
+            if self._activo:                              # detener() pudo correr desde el chequeo de arriba
+                self._principal.iniciar()                 # Idempotente: abre el stream si estaba cerrado
+        finally:
+            self._lock_principal.release()
+        info = self._principal.ultimo_frame_info()
+        if info is None or time.time() - info[0] > self.max_desfase:
+            return None
+        frame = info[2]
+        return frame, frame.shape[0] / referencia.shape[0], frame.shape[1] / referencia.shape[1]
+
+    def _vigilar_principal(self):
+        while not self._parar.wait(1):
+            with self._lock_principal:                    # Sin pedidos que lo reabran mientras se cierra
+                if self._principal.activo() and time.time() - self._ultimo_pedido > self.inactividad_principal:
+                    print("[📡] Stream principal sin uso, se cierra hasta el próximo pedido")
+                    self._principal.detener()
@@ -0,0 +1,282 @@
+# === IMPORTS ===
+import os                                                 # RSS del proceso (/proc/self/statm)
+import time                                               # Cronómetro de alta resolución
+import bisect                                             # Ubicación del bucket de cada observación
+import threading                                          # Registro compartido entre hilos y servidor HTTP
+from collections import deque                             # Ventana de observaciones recientes (percentiles)
+from contextlib import contextmanager                     # medir() como bloque 'with'
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer   # Endpoint de métricas local
+
+# Límites (segundos) de los buckets de los histogramas de latencia
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIJO = "vigilancia_"                                   # Prefijo de las métricas exportadas
+
+
+def rss_bytes():
+    """
+    Memoria residente del proceso en bytes (Linux: /proc; en otros sistemas, el pico vía resource).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return pico if os.uname().sysname == "Darwin" else pico * 1024
+        except Exception:
+            return 0
+
+
+def rss_pico_bytes():
+    """
+    Pico de memoria residente del proceso en bytes (Linux: VmHWM, propio de este proceso;
+    en otros sistemas, ru_maxrss).
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if os.uname().sysname == "Darwin" else pico * 1024
+    except Exception:
+        return 0
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos (acumulativos al exportar), con suma, cantidad y máximo.
+    Guarda además las últimas 'ventana' observaciones para percentiles exactos recientes.
+    Registrar una observación es O(log buckets), apto para dejarlo siempre activo.
+    """
+
+    def __init__(self, buckets=BUCKETS, ventana=2048):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)           # Último = +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+        self.maximo = 0.0
+        self.recientes = deque(maxlen=ventana)
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+        self.maximo = max(self.maximo, valor)
+        self.recientes.append(valor)
+
+    def cuantil(self, q):
+        """
+        Cuantil de las observaciones recientes, o None sin datos.
+        """
+        if not self.recientes:
+            return None
+        ordenados = sorted(self.recientes)
+        return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+class Metricas:
+    """
+    Registro de métricas del proceso: contadores, valores instantáneos (gauges),
+    histogramas de latencia por etapa y medidores que se evalúan al consultar
+    (profundidad de colas, RSS, etc.), también con una etiqueta (p. ej. por cámara).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._valores = {}
+        self._histogramas = {}
+        self._medidores = {}                              # nombre → función sin argumentos
+        self._etiquetados = {}                            # nombre → (etiqueta, función → {valor de la etiqueta: número})
+        self._ayuda = {}
+        self.inicio = time.time()
+
+    # ----------------------------- registro -----------------------------
+    def contar(self, nombre, n=1):
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + n
+
+    def fijar(self, nombre, valor):
+        with self._lock:
+            self._valores[nombre] = valor
+
+    def observar(self, nombre, segundos):
+        with self._lock:
+            histograma = self._histogramas.get(nombre)
+            if histograma is None:
+                histograma = self._histogramas[nombre] = Histograma()
+            histograma.observar(segundos)
+
+    @contextmanager
+    def medir(self, nombre):
+        """
+        Cronometra el bloque 'with' y lo registra en el histograma 'nombre'.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio)
+
+    def registrar_medidor(self, nombre, funcion, ayuda=None):
+        """
+        'funcion' se evalúa en cada consulta (p. ej. lambda: cola.pendientes()).
+        """
+        with self._lock:
+            self._medidores[nombre] = funcion
+            if ayuda:
+                self._ayuda[nombre] = ayuda
+
+    def registrar_medidor_etiquetado(self, nombre, etiqueta, funcion, ayuda=None):
+        """
+        Como registrar_medidor(), pero 'funcion' retorna {valor de 'etiqueta': número} y se
+        exporta una serie por valor (p. ej. etiqueta "camara": {"entrada": 75, "patio": 12}).
+        Los números None se omiten.
+        """
+        with self._lock:
+            self._etiquetados[nombre] = (etiqueta, funcion)
+            if ayuda:
+                self._ayuda[nombre] = ayuda
+
+    # ----------------------------- consulta -----------------------------
+    def _series_etiquetadas(self):
+        series = {}
+        for nombre, (etiqueta, funcion) in self._etiquetados.items():
+            try:
+                series[nombre] = (etiqueta, {str(k): float(v) for k, v in funcion().items() if v is not None})
+            except Exception:
+                pass                                      # Un medidor roto no debe romper la consulta
+        return series
+
+    def _instantaneos(self):
+        valores = dict(self._valores)
+        for nombre, funcion in self._medidores.items():
+            try:
+                valores[nombre] = float(funcion())
+            except Exception:
+                pass                                      # Un medidor roto no debe romper la consulta
+        return valores
+
+    def prometheus(self):
+        """
+        Exporta todo en el formato de texto de Prometheus.
+        """
+        with self._lock:
+            contadores = dict(self._contadores)
+            valores = self._instantaneos()
+            etiquetados = self._series_etiquetadas()
+            histogramas = {n: (h.buckets, list(h.conteos), h.suma, h.cantidad) for n, h in self._histogramas.items()}
+
+        lineas = [f"# TYPE {PREFIJO}uptime_segundos gauge", f"{PREFIJO}uptime_segundos {time.time() - self.inicio:.0f}"]
+        for nombre, valor in sorted(contadores.items()):
+            lineas += [f"# TYPE {PREFIJO}{nombre}_total counter", f"{PREFIJO}{nombre}_total {valor}"]
+        for nombre, valor in sorted(valores.items()):
+            if nombre in self._ayuda:
+                lineas.append(f"# HELP {PREFIJO}{nombre} {self._ayuda[nombre]}")
+            lineas += [f"# TYPE {PREFIJO}{nombre} gauge", f"{PREFIJO}{nombre} {valor:g}"]
+        for nombre, (etiqueta, serie) in sorted(etiquetados.items()):
+            if nombre in self._ayuda:
+                lineas.append(f"# HELP {PREFIJO}{nombre} {self._ayuda[nombre]}")
+            lineas.append(f"# TYPE {PREFIJO}{nombre} gauge")
+            for valor_etiqueta, valor in sorted(serie.items()):
+                valor_etiqueta = valor_etiqueta.replace("\\", "\\\\").replace('"', '\\"')
+                lineas.append(f'{PREFIJO}{nombre}{{{etiqueta}="{valor_etiqueta}"}} {valor:g}')
+        for nombre, (buckets, conteos, suma, cantidad) in sorted(histogramas.items()):
+            base = f"{PREFIJO}{nombre}_segundos"
+            lineas.append(f"# TYPE {base} histogram")
+            acumulado = 0
+            for limite, conteo in zip(buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{base}_bucket{{le="{limite:g}"}} {acumulado}')
+            lineas.append(f'{base}_bucket{{le="+Inf"}} {cantidad}')
+            lineas += [f"{base}_sum {suma:.6f}", f"{base}_count {cantidad}"]
+        return "\n".join(lineas) + "\n"
+
+    def como_dict(self):
+        """
+        Todas las métricas como diccionario serializable (latencias en segundos).
+        """
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.inicio,
+                "contadores": dict(self._contadores),
+                "valores": self._instantaneos(),
+                "etapas": {n: {"cantidad": h.cantidad, "promedio": h.suma / h.cantidad if h.cantidad else None,
+                               "p50": h.cuantil(0.5), "p95": h.cuantil(0.95), "p99": h.cuantil(0.99),
+                               "maximo": h.maximo}
+                           for n, h in sorted(self._histogramas.items())},
+            }
+
+    def resumen(self):
+        """
+        Resumen legible (para /stats): latencias por etapa, contadores y valores actuales.
+        """
+        with self._lock:
+            contadores = dict(self._contadores)
+            valores = self._instantaneos()
+            etapas = [(n, h.cantidad, h.suma / h.cantidad if h.cantidad else 0.0, h.cuantil(0.95), h.maximo)
+                      for n, h in sorted(self._histogramas.items())]
+
+        horas = (time.time() - self.inicio) / 3600
+        lineas = [f"📊 Estadísticas ({horas:.1f} h en marcha)", "", "⏱️ Etapas (prom / p95 / máx, ms):"]
+        for nombre, cantidad, promedio, p95, maximo in etapas:
+            lineas.append(f"  {nombre}: {1000 * promedio:.1f} / {1000 * (p95 or 0):.0f} / {1000 * maximo:.0f} ({cantidad})")
+        lineas += ["", "🔢 Contadores:"]
+        lineas += [f"  {n}: {v}" + (f" ({v / horas:.0f}/h)" if horas >= 0.1 else "") for n, v in sorted(contadores.items())]
+        lineas += ["", "📏 Actual:"]
+        for nombre, valor in sorted(valores.items()):
+            texto = f"{valor / 1e6:.1f} MB" if nombre.endswith("_bytes") else f"{valor:g}"
+            lineas.append(f"  {nombre}: {texto}")
+        return "\n".join(lineas)
+
+
+class ServidorMetricas:
+    """
+    Endpoint HTTP local (GET /metrics) con las métricas en formato Prometheus.
+    Escucha por defecto sólo en 127.0.0.1.
+    """
+
+    def __init__(self, metricas, puerto=9108, host="127.0.0.1"):
+        self.metricas = metricas
+        self.direccion = (host, puerto)
+        self._servidor = None
+
+    def iniciar(self):
+        metricas = self.metricas
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass                                      # Sin un log por cada scrape
+
+        try:
+            self._servidor = ThreadingHTTPServer(self.direccion, _Manejador)
+        except OSError as e:
+            print(f"[⚠️] No se pudo abrir el endpoint de métricas en {self.direccion}: {e}")
+            return self
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        print(f"[📊] Métricas en http://{self.direccion[0]}:{self.direccion[1]}/metrics")
+        return self
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -0,0 +1,231 @@
+# === IMPORTS ===
+import os                                                 # Lectura de fotos desde disco
+import time                                               # Backoff y espera de retry_after
+import threading                                          # Hilo de envío y sincronización de la cola
+from collections import deque                             # Cola acotada de mensajes pendientes
+import requests                                           # Cliente HTTP con sesión y pool de conexiones
+from requests.adapters import HTTPAdapter
+
+
+class NotificadorTelegram:
+    """
+    Despachador de notificaciones a Telegram que no bloquea a quien las genera.
+    Los mensajes se encolan en una cola acotada y un hilo los envía reutilizando
+    una sesión HTTP (conexiones persistentes), con timeouts, reintentos con backoff
+    exponencial y respeto del 'retry_after' que Telegram informa en los 429. Para no
+    llegar a los 429, el hilo espera entre envíos al chat al menos 'intervalo_min'
+    segundos y no pasa de 'max_por_minuto' (límites de Telegram: ~1/s por chat, 20/min en grupos).
+    Si la cola se llena se descarta el mensaje más viejo; los mensajes con la misma
+    'clave' que todavía no salieron se reemplazan por el más reciente (coalescencia).
+    'base_url' permite apuntar a un servidor HTTP local para pruebas.
+    Con 'metricas' (ver metricas.py) se registra la duración de cada envío (reintentos incluidos).
+    """
+
+    def __init__(self, token, chat_id, base_url="https://api.telegram.org", tam_cola=100,
+                 timeout=(3.05, 20), reintentos=5, backoff_inicial=1.0, backoff_max=60.0, metricas=None,
+                 intervalo_min=1.0, max_por_minuto=20):
+        self.url = f"{base_url.rstrip('/')}/bot{token}"
+        self.chat_id = chat_id
+        self.timeout = timeout                            # (conexión, lectura) en segundos
+        self.reintentos = reintentos                      # Intentos por mensaje ante errores transitorios
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.metricas = metricas
+        self.intervalo_min = intervalo_min                # Segundos mínimos entre dos envíos al chat
+        self.max_por_minuto = max_por_minuto              # Envíos máximos por minuto al chat (None = sin tope)
+        self._envios = deque()                            # Instantes (monotónicos) de los envíos del último minuto
+
+        self.sesion = requests.Session()
+        self.sesion.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.sesion.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._cola = deque()
+        self._tam_cola = tam_cola
+        self._cond = threading.Condition()
+        self._en_curso = 0
+        self._activo = False
+        self._hilo = None
+
+        # Estadísticas
+        self.enviados = 0
+        self.fallidos = 0
+        self.descartados = 0
+        self.coalescidos = 0
+
+    # ------------------------------ ciclo de vida ------------------------------
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, timeout=10):
+        self.vaciar(timeout)
+        self._activo = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(timeout=timeout)
+            self._hilo = None
+
+    def vaciar(self, timeout=None):
+        """
+        Espera a que se envíen los mensajes pendientes. Retorna True si la cola quedó vacía.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._cola and not self._en_curso, timeout=timeout)
+
+    def pendientes(self):
+        with self._cond:
+            return len(self._cola)
+
+    # --------------------------------- encolado --------------------------------
+    def _encolar(self, metodo, datos, foto=None, clave=None):
+        with self._cond:
+            if clave is not None:
+                for i, item in enumerate(self._cola):
+                    if item["clave"] == clave:
+                        self._cola[i] = {"metodo": metodo, "datos": datos, "foto": foto, "clave": clave}
+                        self.coalescidos += 1
+                        return
+            if len(self._cola) >= self._tam_cola:
+                self._cola.popleft()                      # Política: se descarta el más viejo
+                self.descartados += 1
+            self._cola.append({"metodo": metodo, "datos": datos, "foto": foto, "clave": clave})
+            self._cond.notify_all()
+
+    def enviar_mensaje(self, texto, clave=None):
+        """
+        Encola un mensaje de texto. Retorna inmediatamente.
+        """
+        self._encolar("sendMessage", {"chat_id": self.chat_id, "text": texto}, clave=clave)
+
+    def enviar_foto(self, foto, caption="", clave=None):
+        """
+        Encola una foto (bytes JPEG o ruta a un archivo) con su texto. Retorna inmediatamente.
+        Las rutas se leen al encolar, así el archivo puede moverse o borrarse después.
+        """
+        if isinstance(foto, (str, os.PathLike)):
+            with open(foto, "rb") as f:
+                foto = f.read()
+        self._encolar("sendPhoto", {"chat_id": self.chat_id, "caption": caption}, foto=foto, clave=clave)
+
+    # ---------------------------------- envío ----------------------------------
+    def _bucle(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._cola or not self._activo)
+                if not self._cola:
+                    return
+                item = self._cola.popleft()
+                self._en_curso += 1
+            inicio = time.perf_counter()
+            try:
+                if self._enviar(item):
+                    self.enviados += 1
+                else:
+                    self.fallidos += 1
+            except Exception as e:                        # Un error inesperado no puede matar el hilo de envío
+                print(f"[💥] Error enviando {item['metodo']}: {e}")
+                self.fallidos += 1
+            finally:
+                if self.metricas is not None:
+                    self.metricas.observar("notificacion", time.perf_counter() - inicio)
+                with self._cond:
+                    self._en_curso -= 1
+                    self._cond.notify_all()
+
+    def _esperar_turno(self):
+        """
+        Límite propio por chat, antes de cada intento: respeta 'intervalo_min' desde el
+        envío anterior y 'max_por_minuto' en una ventana deslizante de 60 s.
+        """
+        ahora = time.monotonic()
+        while self._envios and ahora - self._envios[0] >= 60:
+            self._envios.popleft()
+        espera = self._envios[-1] + self.intervalo_min - ahora if self._envios else 0.0
+        if self.max_por_minuto and len(self._envios) >= self.max_por_minuto:
+            espera = max(espera, self._envios[-self.max_por_minuto] + 60 - ahora)
+        if espera > 0:
+            if self.metricas is not None:
+                self.metricas.contar("notificaciones_demoradas")
+            time.sleep(espera)
+        self._envios.append(time.monotonic())
+
+    def _enviar(self, item):
+        backoff = self.backoff_inicial
+        for intento in range(1, self.reintentos + 1):
+            self._esperar_turno()
+            try:
+                files = {"photo": ("foto.jpg", item["foto"], "image/jpeg")} if item["foto"] is not None else None
+                resp = self.sesion.post(f"{self.url}/{item['metodo']}", data=item["datos"],
+                                        files=files, timeout=self.timeout)
+                if resp.status_code == 200:
+                    return True
+                if resp.status_code == 429:
+                    # Telegram indica cuántos segundos esperar antes de reintentar
+                    try:
+                        espera = float(resp.json()["parameters"]["retry_after"])
+                    except (ValueError, TypeError, KeyError, AttributeError):
+                        espera = backoff                  # Cuerpo no JSON o sin 'retry_after'
+                    espera = max(0.0, espera)
+                    print(f"[⏳] Telegram limitó el envío, reintento en {espera:.0f}s")
+                    time.sleep(espera)
+                    continue
+                if resp.status_code < 500:
+                    print(f"[❌] Telegram rechazó {item['metodo']} ({resp.status_code}): {resp.text[:200]}")
+                    return False                          # Error del pedido: no tiene sentido reintentar
+                print(f"[⚠️] Telegram respondió {resp.status_code} (intento {intento}/{self.reintentos})")
+            except requests.RequestException as e:
+                print(f"[⚠️] Error de red enviando {item['metodo']} (intento {intento}/{self.reintentos}): {e}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+        return False
+
+
+class NotificadorLocal:
+    """
+    Reemplazo de NotificadorTelegram sin red, para replay y benchmarks.
+    Misma interfaz; los mensajes quedan en 'mensajes' y, si se indica 'directorio',
+    las fotos se escriben ahí para poder revisarlas.
+    """
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio
+        self.mensajes = []                                # {"metodo", "texto", "clave", "hora"}
+        self._lock = threading.Lock()
+        self.enviados = 0
+        self.fallidos = 0
+        self.descartados = 0
+        self.coalescidos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def iniciar(self):
+        return self
+
+    def detener(self, timeout=10):
+        pass
+
+    def vaciar(self, timeout=None):
+        return True
+
+    def pendientes(self):
+        return 0
+
+    def enviar_mensaje(self, texto, clave=None):
+        with self._lock:
+            self.mensajes.append({"metodo": "sendMessage", "texto": texto, "clave": clave, "hora": time.time()})
+            self.enviados += 1
+
+    def enviar_foto(self, foto, caption="", clave=None):
+        if isinstance(foto, (str, os.PathLike)):
+            with open(foto, "rb") as f:
+                foto = f.read()
+        with self._lock:
+            self.mensajes.append({"metodo": "sendPhoto", "texto": caption, "clave": clave, "hora": time.time()})
+            self.enviados += 1
+            if self.directorio:
+                with open(os.path.join(self.directorio, f"foto_{self.enviados:05d}.jpg"), "wb") as f:
+                    f.write(foto)
@@ -0,0 +1,221 @@
+# === IMPORTS ===
+import threading                                          # Hilos de la fuente y de los trabajadores de cada etapa
+from collections import deque                             # Cola acotada con descarte del más viejo
+
+DESCARTAR_VIEJO = "descartar_viejo"                       # Cola llena: se pierde el elemento más viejo
+BLOQUEAR = "bloquear"                                     # Cola llena: la etapa anterior espera lugar
+
+
+class ColaAcotada:
+    """
+    Cola acotada entre dos etapas del pipeline.
+    - "descartar_viejo": si está llena, poner() descarta el elemento más viejo. La etapa
+      siguiente siempre toma trabajo reciente y la latencia queda acotada aunque no dé abasto.
+    - "bloquear": poner() espera lugar; no se pierde nada (p. ej. replay a velocidad máxima).
+    cerrar() marca el fin: tomar() entrega lo pendiente y después retorna None.
+    """
+
+    def __init__(self, capacidad=2, politica=DESCARTAR_VIEJO):
+        if politica not in (DESCARTAR_VIEJO, BLOQUEAR):
+            raise ValueError(f"Política de cola desconocida: {politica}")
+        self.capacidad = max(1, capacidad)
+        self.politica = politica
+        self._items = deque()
+        self._cambio = threading.Condition()
+        self.cerrada = False
+        self.descartados = 0                              # Elementos perdidos por cola llena
+
+    def __len__(self):
+        return len(self._items)
+
+    def poner(self, item):
+        """
+        Agrega 'item'. Retorna False si la cola ya estaba cerrada.
+        """
+        with self._cambio:
+            if self.politica == BLOQUEAR:
+                self._cambio.wait_for(lambda: self.cerrada or len(self._items) < self.capacidad)
+            if self.cerrada:
+                return False
+            if len(self._items) >= self.capacidad:
+                self._items.popleft()
+                self.descartados += 1
+            self._items.append(item)
+            self._cambio.notify_all()
+            return True
+
+    def tomar(self):
+        """
+        Espera y retorna el elemento más viejo; None cuando la cola está cerrada y vacía.
+        """
+        with self._cambio:
+            self._cambio.wait_for(lambda: self._items or self.cerrada)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cambio.notify_all()
+            return item
+
+    def cerrar(self, vaciar=False):
+        """
+        No acepta más elementos. Con 'vaciar' descarta además lo pendiente (detención inmediata).
+        """
+        with self._cambio:
+            self.cerrada = True
+            if vaciar:
+                self._items.clear()
+            self._cambio.notify_all()
+
+
+class Etapa:
+    """
+    Una etapa del pipeline: 'trabajadores' hilos toman elementos de su cola de entrada,
+    aplican 'funcion(item)' y pasan el resultado a la etapa siguiente (None = no sigue).
+    Con 'ordenada', los resultados salen en el orden en que se tomaron aunque los
+    trabajadores terminen desordenados (necesario antes de una etapa con estado, como
+    el seguimiento). Un error en un elemento se registra y no detiene la etapa.
+    """
+
+    def __init__(self, nombre, funcion, trabajadores=1, capacidad=2, politica=DESCARTAR_VIEJO, ordenada=False):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.trabajadores = max(1, trabajadores)
+        self.ordenada = ordenada
+        self.entrada = ColaAcotada(capacidad, politica)
+        self.salida = None                                # Entrada de la etapa siguiente (la asigna Pipeline)
+        self.procesados = 0
+        self.errores = 0
+        self._hilos = []
+        self._vivos = 0
+        self._lock = threading.Lock()
+        self._lock_toma = threading.Lock()                # Toma + número de orden atómicos
+        self._lock_salida = threading.Lock()              # Emisión en orden
+        self._tomados = 0
+        self._proximo = 0
+        self._listos = {}                                 # Número de orden → resultado (etapas ordenadas)
+
+    def iniciar(self):
+        self._vivos = self.trabajadores
+        self._hilos = [threading.Thread(target=self._bucle, name=f"{self.nombre}-{i + 1}", daemon=True)
+                       for i in range(self.trabajadores)]
+        for hilo in self._hilos:
+            hilo.start()
+        return self
+
+    def esperar(self, timeout=None):
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+    def _tomar(self):
+        with self._lock_toma:
+            item = self.entrada.tomar()
+            orden = self._tomados
+            if item is not None:
+                self._tomados += 1
+            return orden, item
+
+    def _emitir(self, orden, resultado):
+        if not self.ordenada:
+            if resultado is not None and self.salida is not None:
+                self.salida.poner(resultado)
+            return
+        with self._lock_salida:
+            self._listos[orden] = resultado
+            while self._proximo in self._listos:
+                listo = self._listos.pop(self._proximo)
+                self._proximo += 1
+                if listo is not None and self.salida is not None:
+                    self.salida.poner(listo)
+
+    def _bucle(self):
+        while True:
+            orden, item = self._tomar()
+            if item is None:
+                break
+            try:
+                resultado = self.funcion(item)
+            except Exception as e:
+                resultado = None
+                with self._lock:
+                    self.errores += 1
+                print(f"[💥] Error en la etapa {self.nombre}: {e}")
+            with self._lock:
+                self.procesados += 1
+            self._emitir(orden, resultado)
+
+        with self._lock:
+            self._vivos -= 1
+            ultimo = self._vivos == 0
+        if ultimo and self.salida is not None:
+            self.salida.cerrar()                          # La etapa siguiente termina al vaciar su cola
+
+
+class Pipeline:
+    """
+    Cadena fuente → etapas unidas por colas acotadas. La fuente es un iterable (p. ej. un
+    generador de frames) que recorre su propio hilo; los None que produzca se ignoran.
+    Al agotarse la fuente, cada etapa termina lo pendiente y cierra la siguiente.
+    Con 'metricas', registra la profundidad y los descartes de la cola de cada etapa.
+    """
+
+    def __init__(self, fuente, etapas, metricas=None):
+        self.fuente = fuente
+        self.etapas = etapas
+        for previa, siguiente in zip(etapas, etapas[1:]):
+            previa.salida = siguiente.entrada
+        self._hilo = None
+        self._activo = False
+        if metricas is not None:
+            for etapa in etapas:
+                metricas.registrar_medidor(f"cola_{etapa.nombre}", etapa.entrada.__len__,
+                                           f"Elementos esperando la etapa {etapa.nombre}")
+                metricas.registrar_medidor(f"descartados_{etapa.nombre}", lambda e=etapa: e.entrada.descartados,
+                                           f"Elementos descartados por cola llena antes de {etapa.nombre}")
+
+    def iniciar(self):
+        self._activo = True
+        for etapa in self.etapas:
+            etapa.iniciar()
+        self._hilo = threading.Thread(target=self._alimentar, name="fuente", daemon=True)
+        self._hilo.start()
+        return self
+
+    def _alimentar(self):
+        entrada = self.etapas[0].entrada
+        try:
+            for item in self.fuente:
+                if not self._activo:
+                    break
+                if item is not None and not entrada.poner(item):
+                    break
+        except Exception as e:
+            print(f"[💥] Error en la fuente del pipeline: {e}")
+        finally:
+            entrada.cerrar()
+
+    def esperar(self):
+        """
+        Bloquea hasta que la fuente se agote y todas las etapas terminen lo pendiente.
+        """
+        if self._hilo is not None:
+            self._hilo.join()
+        for etapa in self.etapas:
+            etapa.esperar()
+
+    def detener(self, timeout=5):
+        """
+        Detención inmediata: descarta lo pendiente en todas las colas.
+        """
+        self._activo = False
+        for etapa in self.etapas:
+            etapa.entrada.cerrar(vaciar=True)
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        for etapa in self.etapas:
+            etapa.esperar(timeout)
+
+    def estadisticas(self):
+        return {e.nombre: {"trabajadores": e.trabajadores, "pendientes": len(e.entrada),
+                           "descartados": e.entrada.descartados, "procesados": e.procesados,
+                           "errores": e.errores}
+                for e in self.etapas}
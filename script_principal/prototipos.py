@@ -0,0 +1,182 @@
+# === IMPORTS ===
+import os                                                 # Ruta de la galería de prototipos
+import sys                                                # Argumentos de línea de comandos
+import json                                               # Exportación del reporte
+import hashlib                                            # Huella de los encodings de origen de cada identidad
+import numpy as np                                        # Distancias y estadísticas de dispersión
+
+from galeria import Galeria                               # Comparación en lote para el reporte de precisión
+from galeria_empaquetada import GaleriaEmpaquetada        # Galería completa y galería de prototipos en disco
+from indice_vectorial import kmeans                       # Agrupamiento de los encodings de cada identidad
+
+SUBDIRECTORIO = "prototipos"                              # Galería de prototipos dentro de embeddings/
+
+
+def directorio_prototipos(embeddings_dir):
+    return os.path.join(embeddings_dir, SUBDIRECTORIO)
+
+
+def _huella(encodings):
+    return hashlib.sha1(np.ascontiguousarray(encodings, dtype=np.float32).tobytes()).hexdigest()
+
+
+def calcular_prototipos(encodings, maximo=5):
+    """
+    Agrupa los encodings de una identidad (ráfagas casi repetidas) en a lo sumo 'maximo'
+    prototipos con k-means. Retorna (prototipos k x 128, estadisticas), donde las
+    estadísticas describen la dispersión de cada grupo alrededor de su prototipo:
+    "soporte" (encodings por prototipo), "radio_medio" y "radio_max".
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    prototipos, asignacion = kmeans(encodings, maximo)
+    distancias = np.linalg.norm(encodings - prototipos[asignacion], axis=1)
+    soporte = np.bincount(asignacion, minlength=len(prototipos))
+
+    # Prototipos que quedaron sin encodings (re-siembra de k-means en la última vuelta) no aportan nada
+    usados = soporte > 0
+    prototipos, soporte = prototipos[usados], soporte[usados]
+    remapeo = np.cumsum(usados) - 1
+    asignacion = remapeo[asignacion]
+
+    radio_medio = np.bincount(asignacion, weights=distancias, minlength=len(prototipos)) / soporte
+    radio_max = np.zeros(len(prototipos))
+    np.maximum.at(radio_max, asignacion, distancias)
+    return prototipos, {
+        "originales": int(len(encodings)),
+        "soporte": soporte.tolist(),
+        "radio_medio": [round(float(r), 4) for r in radio_medio],
+        "radio_max": [round(float(r), 4) for r in radio_max],
+    }
+
+
+def compactar_identidad(completa, prototipos, nombre, maximo=5, encodings=None):
+    """
+    Recalcula los prototipos de 'nombre' a partir de la galería completa y los guarda
+    en la galería de prototipos (con sus estadísticas). Si la identidad ya no existe,
+    la quita también de los prototipos. Retorna la revisión de la galería de prototipos.
+    """
+    encodings = encodings if encodings is not None else completa.encodings_de(nombre)
+    if encodings is None or len(encodings) == 0:
+        prototipos.eliminar_identidad(nombre)
+        return prototipos.leer_indice()["revision"]
+
+    centros, estadisticas = calcular_prototipos(encodings, maximo)
+    estadisticas["origen"] = _huella(encodings)
+    estadisticas["maximo"] = maximo
+    return prototipos.guardar_identidad(nombre, centros, metadatos=estadisticas)
+
+
+def sincronizar(completa, prototipos, maximo=5):
+    """
+    Compacta (en lote) las identidades de la galería completa cuyos prototipos faltan o
+    están desactualizados, y quita las que ya no existen. Retorna cuántas se actualizaron.
+    """
+    indice, matriz = completa.mapear()
+    vigentes = {i["nombre"]: i.get("metadatos", {}) for i in prototipos.leer_indice()["identidades"]}
+
+    actualizadas = 0
+    nombres = set()
+    for ident in indice["identidades"]:
+        nombre = ident["nombre"]
+        nombres.add(nombre)
+        encodings = np.array(matriz[ident["inicio"]:ident["inicio"] + ident["cantidad"]])
+        previo = vigentes.get(nombre)
+        if previo and previo.get("origen") == _huella(encodings) and previo.get("maximo") == maximo:
+            continue
+        compactar_identidad(completa, prototipos, nombre, maximo, encodings)
+        actualizadas += 1
+
+    for nombre in set(vigentes) - nombres:
+        prototipos.eliminar_identidad(nombre)
+        actualizadas += 1
+    return actualizadas
+
+
+def _exactitud(galeria, consultas, esperados, tolerancia):
+    resultados = galeria.identificar(consultas, tolerancia)
+    correctos = sum(r["nombre"] == e for r, e in zip(resultados, esperados))
+    rechazados = sum(r["nombre"] is None for r in resultados)
+    return correctos, rechazados, len(resultados) - correctos - rechazados
+
+
+def reporte(completa, maximo=5, tolerancia=0.4, pliegues=5, semilla=0):
+    """
+    Compara la galería completa contra la de prototipos sobre el dataset existente.
+    Validación cruzada por identidad: cada pliegue de encodings se consulta contra una
+    galería armada con el resto (completa o compactada en prototipos).
+    Retorna un diccionario con el factor de reducción y la exactitud antes/después.
+    """
+    indice, matriz = completa.mapear()
+    por_nombre = {i["nombre"]: np.array(matriz[i["inicio"]:i["inicio"] + i["cantidad"]])
+                  for i in indice["identidades"]}
+    rng = np.random.default_rng(semilla)
+    particion = {n: rng.integers(pliegues, size=len(e)) for n, e in por_nombre.items()}
+
+    filas_completa = sum(len(e) for e in por_nombre.values())
+    filas_prototipos = sum(len(calcular_prototipos(e, maximo)[0]) for e in por_nombre.values())
+
+    totales = {"completa": [0, 0, 0], "prototipos": [0, 0, 0]}
+    consultas_totales = 0
+    for p in range(pliegues):
+        entrenamiento = {n: e[particion[n] != p] for n, e in por_nombre.items()}
+        entrenamiento = {n: e for n, e in entrenamiento.items() if len(e)}
+        consultas = [(n, enc) for n, e in por_nombre.items() for enc in e[particion[n] == p]]
+        if not consultas or not entrenamiento:
+            continue
+        esperados = [n for n, _ in consultas]
+        encs = np.array([enc for _, enc in consultas])
+        consultas_totales += len(consultas)
+
+        galerias = {
+            "completa": Galeria(entrenamiento),
+            "prototipos": Galeria({n: calcular_prototipos(e, maximo)[0] for n, e in entrenamiento.items()}),
+        }
+        for clave, galeria in galerias.items():
+            for i, valor in enumerate(_exactitud(galeria, encs, esperados, tolerancia)):
+                totales[clave][i] += valor
+
+    def _resumen(valores):
+        correctos, rechazados, confundidos = valores
+        total = max(1, consultas_totales)
+        return {"exactitud": correctos / total, "rechazados": rechazados / total, "confundidos": confundidos / total}
+
+    return {
+        "identidades": len(por_nombre),
+        "maximo_prototipos": maximo,
+        "tolerancia": tolerancia,
+        "consultas": consultas_totales,
+        "filas_completa": filas_completa,
+        "filas_prototipos": filas_prototipos,
+        "factor_reduccion": filas_completa / max(1, filas_prototipos),
+        "completa": _resumen(totales["completa"]),
+        "prototipos": _resumen(totales["prototipos"]),
+    }
+
+
+# Modo CLI:
+#   python prototipos.py --compactar [embeddings_dir] [maximo]
+#   python prototipos.py --reporte [embeddings_dir] [maximo] [salida.json]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("--compactar", "--reporte"):
+        print("Uso: python prototipos.py --compactar|--reporte [directorio_embeddings] [maximo] [salida.json]")
+        sys.exit(1)
+
+    directorio = sys.argv[2] if len(sys.argv) > 2 else "embeddings"
+    maximo = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    completa = GaleriaEmpaquetada(directorio)
+
+    if sys.argv[1] == "--compactar":
+        actualizadas = sincronizar(completa, GaleriaEmpaquetada(directorio_prototipos(directorio)), maximo)
+        print(f"[🧩] {actualizadas} identidades con prototipos actualizados")
+    else:
+        r = reporte(completa, maximo)
+        print(f"[🧩] {r['identidades']} identidades: {r['filas_completa']} → {r['filas_prototipos']} embeddings "
+              f"(x{r['factor_reduccion']:.1f} menos)")
+        print(f"{'galería':>11} {'exactitud':>10} {'rechazados':>11} {'confundidos':>12}")
+        for clave in ("completa", "prototipos"):
+            v = r[clave]
+            print(f"{clave:>11} {v['exactitud']:>10.3f} {v['rechazados']:>11.3f} {v['confundidos']:>12.3f}")
+        if len(sys.argv) > 4:
+            with open(sys.argv[4], "w", encoding="utf-8") as f:
+                json.dump(r, f, indent=2)
+            print(f"\n[💾] Reporte guardado en {sys.argv[4]}")
@@ -0,0 +1,157 @@
+# === IMPORTS ===
+import os                                                 # Carpetas de capturas por desconocido
+import time                                               # Espaciado entre capturas y límite de tiempo
+import threading                                          # Uso desde varias etapas del pipeline
+import numpy as np                                        # Distancias vectorizadas rostro ↔ objetivo
+
+from escritor_imagenes import EscritorImagenes, codificar_jpeg   # Escritura por lotes en segundo plano
+
+
+class RecolectorDesconocidos:
+    """
+    Junta imágenes de rostros desconocidos a partir de los frames que el loop
+    principal ya está procesando, en lugar de frenar la detección con una ráfaga.
+    Cada desconocido es un "objetivo" con su encoding de referencia y su track; en cada
+    frame los rostros de ese track (o, si traen encoding, los más cercanos dentro de la
+    tolerancia) se asignan al objetivo y su recorte es una candidata si pasó el espaciado
+    mínimo desde la anterior. Cada rostro puede traer "calidad" (puntaje 0–1) y "apto"
+    (ver calidad.py): los no aptos no cuentan y, de las candidatas, se conservan en
+    memoria las 'cantidad' de mejor puntaje (no las primeras).
+    Un objetivo termina al evaluar 'candidatas' capturas o al vencer 'limite' segundos
+    (medidos con el 'instante' de cada frame: el reloj en vivo, el tiempo del video en replay):
+    si tiene al menos 'minimo', el 'escritor' guarda las capturas en segundo plano (la
+    mejor primero) y recién entonces se entrega a 'al_terminar', con la mejor también
+    como bytes JPEG en "foto"; si no, se descarta. Nada se escribe a disco mientras dura
+    la recolección. cerrar_pendientes() cierra todos los objetivos abiertos (fin de la fuente).
+    Puede seguir varios desconocidos a la vez. Es seguro llamarlo desde varios hilos.
+    """
+
+    def __init__(self, directorio, al_terminar, cantidad=20, espaciado=2.0, limite=90.0,
+                 tolerancia=0.4, minimo=3, candidatas=None, escritor=None):
+        self.directorio = directorio                      # Carpeta base (temp_unknown)
+        self.al_terminar = al_terminar                    # Callback(desconocido) al completar un objetivo
+        self.cantidad = cantidad                          # Capturas por desconocido
+        self.candidatas = max(cantidad, candidatas or cantidad + cantidad // 2)   # Capturas evaluadas por desconocido
+        self.espaciado = espaciado                        # Segundos mínimos entre capturas de un mismo objetivo
+        self.limite = limite                              # Segundos máximos de recolección por objetivo
+        self.tolerancia = tolerancia                      # Distancia máxima al encoding de referencia
+        self.minimo = minimo                              # Capturas mínimas para no descartar
+        self.escritor = escritor or EscritorImagenes().iniciar()   # Guarda las capturas sin frenar al pipeline
+        self._objetivos = {}                              # id -> estado del objetivo
+        self._lock = threading.RLock()
+
+    def activos(self):
+        return len(self._objetivos)
+
+    def sigue_a(self, encoding, track=None):
+        """
+        True si el encoding (o el track) corresponde a un desconocido que ya se está recolectando.
+        """
+        with self._lock:
+            return self._sigue_a(encoding, track)
+
+    def _sigue_a(self, encoding, track):
+        if not self._objetivos:
+            return False
+        if track is not None and any(o["track"] == track for o in self._objetivos.values()):
+            return True
+        if encoding is None:
+            return False
+        refs = np.array([o["encoding"] for o in self._objetivos.values()])
+        return bool(np.min(np.linalg.norm(refs - encoding, axis=1)) <= self.tolerancia)
+
+    def iniciar(self, desconocido_id, rostro, hora, instante=None):
+        """
+        Comienza a recolectar un desconocido a partir del rostro que lo disparó
+        (con "encoding", "recorte" y opcionalmente "track"); ese primer recorte ya cuenta como captura.
+        'instante' (segundos) es el momento del frame; por defecto, el reloj.
+        """
+        with self._lock:
+            self._iniciar(desconocido_id, rostro, hora, time.time() if instante is None else instante)
+
+    def _iniciar(self, desconocido_id, rostro, hora, instante):
+        objetivo = {
+            "id": desconocido_id,
+            "carpeta": os.path.join(self.directorio, desconocido_id),
+            "encoding": rostro["encoding"],
+            "track": rostro.get("track"),
+            "hora": hora,
+            "inicio": instante,
+            "ultima": 0.0,
+            "evaluadas": 0,
+            "mejores": [],                                # (puntaje, orden, recorte) de las mejores capturas
+        }
+        self._objetivos[desconocido_id] = objetivo
+        self._agregar(objetivo, rostro, instante)
+
+    def _agregar(self, objetivo, rostro, instante):
+        objetivo["evaluadas"] += 1
+        objetivo["ultima"] = instante
+        objetivo["mejores"].append((rostro.get("calidad", 0.0), objetivo["evaluadas"], rostro["recorte"].copy()))
+        if len(objetivo["mejores"]) > self.cantidad:
+            objetivo["mejores"].remove(min(objetivo["mejores"], key=lambda m: m[:2]))
+
+    def procesar(self, rostros, instante=None):
+        """
+        Se llama una vez por frame (aunque no haya rostros) con los rostros detectados.
+        Cada rostro trae "recorte" y, opcionalmente, "track", "encoding" (None si en este
+        frame no se codificó), "calidad" y "apto". Suma las candidatas que correspondan y
+        cierra los objetivos completos o vencidos a 'instante' (por defecto, el reloj).
+        """
+        with self._lock:
+            self._procesar(rostros, time.time() if instante is None else instante)
+
+    def cerrar_pendientes(self):
+        """
+        Cierra todos los objetivos abiertos, completos o no (p. ej. al terminar un replay).
+        """
+        with self._lock:
+            for objetivo in list(self._objetivos.values()):
+                self._cerrar(objetivo)
+
+    def _procesar(self, rostros, ahora):
+        if not self._objetivos:
+            return
+
+        objetivos = list(self._objetivos.values())
+        por_track = {o["track"]: o for o in objetivos if o["track"] is not None}
+        refs = np.array([o["encoding"] for o in objetivos])
+        for rostro in rostros:
+            if rostro.get("apto") is False:
+                continue                                  # Borroso, chico, oscuro...: no es candidata
+            objetivo = por_track.get(rostro.get("track"))
+            if objetivo is None and rostro.get("encoding") is not None:
+                dist = np.linalg.norm(refs - rostro["encoding"], axis=1)
+                i = int(np.argmin(dist))                  # Cada rostro cuenta sólo para su objetivo más cercano
+                if dist[i] <= self.tolerancia:
+                    objetivo = objetivos[i]
+            if (objetivo is not None and ahora - objetivo["ultima"] >= self.espaciado
+                    and objetivo["evaluadas"] < self.candidatas):
+                self._agregar(objetivo, rostro, ahora)
+
+        for objetivo in objetivos:
+            if objetivo["evaluadas"] >= self.candidatas or ahora - objetivo["inicio"] >= self.limite:
+                self._cerrar(objetivo)
+
+    def _cerrar(self, objetivo):
+        del self._objetivos[objetivo["id"]]
+        mejores = sorted(objetivo["mejores"], key=lambda m: m[:2], reverse=True)
+        if len(mejores) < self.minimo:
+            print(f"[🗑️] {objetivo['id']} descartado por baja cantidad de imágenes ({len(mejores)} capturas)")
+            return
+
+        foto = codificar_jpeg(mejores[0][2])             # La mejor: se guarda y se envía sin releerla
+        archivos = [(os.path.join(objetivo["carpeta"], f"{objetivo['id']}_{n}.jpg"), foto if n == 1 else recorte)
+                    for n, (_, _, recorte) in enumerate(mejores, 1)]
+
+        def guardadas(fotos):
+            print(f"[📸] {objetivo['id']}: {len(fotos)} capturas recolectadas (mejores de {objetivo['evaluadas']})")
+            self.al_terminar({
+                "id": objetivo["id"],
+                "encodings": [objetivo["encoding"]],
+                "imagenes": fotos,
+                "foto": foto,
+                "hora": objetivo["hora"],
+            })
+
+        self.escritor.escribir(archivos, al_terminar=guardadas)
@@ -0,0 +1,127 @@
+# === IMPORTS ===
+import time                                               # Marcas de tiempo de cada track
+
+
+def iou(a, b):
+    """
+    Intersección sobre unión de dos cajas (top, right, bottom, left).
+    """
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _distancia_centroides(a, b):
+    """
+    Distancia entre centros de dos cajas, relativa al lado promedio de ambas.
+    """
+    ca = ((a[0] + a[2]) / 2, (a[1] + a[3]) / 2)
+    cb = ((b[0] + b[2]) / 2, (b[1] + b[3]) / 2)
+    lado = ((a[2] - a[0]) + (a[1] - a[3]) + (b[2] - b[0]) + (b[1] - b[3])) / 4
+    return ((ca[0] - cb[0]) ** 2 + (ca[1] - cb[1]) ** 2) ** 0.5 / max(lado, 1)
+
+
+class Rastreador:
+    """
+    Seguimiento liviano de varios rostros entre detecciones consecutivas.
+    Asocia cada detección con un track existente por IoU (o, si se movió mucho,
+    por cercanía de centros) y asigna IDs persistentes. Así el encoding y la
+    comparación con la galería se hacen sólo cuando un track empieza o cuando
+    toca re-verificarlo, no en cada frame.
+    Cada track es un diccionario con: "id", "ubicacion", "inicio", "visto",
+    "verificado", "pendiente", "encoding", "nombre", "distancia".
+    """
+
+    def __init__(self, iou_min=0.3, distancia_max=0.75, ttl=3.0, reverificar=10.0):
+        self.iou_min = iou_min                            # IoU mínimo para asociar por superposición
+        self.distancia_max = distancia_max                # Distancia de centros máxima (en lados de caja)
+        self.ttl = ttl                                    # Segundos sin ver un track antes de cerrarlo
+        self.reverificar = reverificar                    # Segundos entre re-verificaciones de identidad
+        self._tracks = {}
+        self._siguiente_id = 1
+
+    def activos(self):
+        return list(self._tracks.values())
+
+    def actualizar(self, ubicaciones, ahora=None, reservar=None):
+        """
+        Asocia las ubicaciones detectadas en el frame actual con los tracks.
+        Con 'reservar' (segundos), los tracks enviados a verificar no se vuelven a pedir
+        durante ese lapso o hasta que llegue su asignar() (pipeline: el encoding de un
+        frame anterior todavía está en curso).
+        Retorna (tracks, a_verificar, eventos):
+            - tracks: el track asignado a cada ubicación (misma posición)
+            - a_verificar: índices de ubicaciones que necesitan encoding + comparación
+            - eventos: lista de ("inicio" | "fin", track)
+        """
+        ahora = ahora if ahora is not None else time.time()
+        existentes = list(self._tracks.values())
+
+        # Candidatos ordenados: primero por IoU (mayor a menor), luego por cercanía de centros
+        pares = []
+        for ti, track in enumerate(existentes):
+            for di, loc in enumerate(ubicaciones):
+                iou_par = iou(track["ubicacion"], loc)
+                if iou_par >= self.iou_min:
+                    pares.append((1.0 + iou_par, ti, di))
+                else:
+                    d = _distancia_centroides(track["ubicacion"], loc)
+                    if d <= self.distancia_max:
+                        pares.append((1.0 - d, ti, di))
+        pares.sort(reverse=True)
+
+        tracks = [None] * len(ubicaciones)
+        usados = set()
+        for _, ti, di in pares:
+            if ti in usados or tracks[di] is not None:
+                continue
+            usados.add(ti)
+            tracks[di] = existentes[ti]
+
+        eventos = []
+        a_verificar = []
+        for di, loc in enumerate(ubicaciones):
+            track = tracks[di]
+            if track is None:
+                track = {"id": self._siguiente_id, "ubicacion": loc, "inicio": ahora, "visto": ahora,
+                         "verificado": None, "pendiente": None, "encoding": None, "nombre": None,
+                         "distancia": None}
+                self._siguiente_id += 1
+                self._tracks[track["id"]] = track
+                tracks[di] = track
+                eventos.append(("inicio", track))
+            track["ubicacion"] = loc
+            track["visto"] = ahora
+            if track["pendiente"] is not None and ahora < track["pendiente"]:
+                continue                                  # Su verificación ya está en curso
+            if track["verificado"] is None or ahora - track["verificado"] >= self.reverificar:
+                a_verificar.append(di)
+                if reservar:
+                    track["pendiente"] = ahora + reservar
+
+        for track in existentes:
+            if ahora - track["visto"] > self.ttl:
+                del self._tracks[track["id"]]
+                eventos.append(("fin", track))
+
+        return tracks, a_verificar, eventos
+
+    def liberar(self, track):
+        """
+        Cancela la verificación en curso del track (p. ej. rostro de baja calidad): se vuelve a pedir en el próximo frame.
+        """
+        track["pendiente"] = None
+
+    def asignar(self, track, encoding, resultado, ahora=None):
+        """
+        Guarda en el track el encoding y el resultado de la comparación con la galería.
+        """
+        track["encoding"] = encoding
+        track["pendiente"] = None
+        track["nombre"] = resultado["nombre"]
+        track["distancia"] = resultado["distancia"]
+        track["verificado"] = ahora if ahora is not None else time.time()
@@ -0,0 +1,354 @@
+# === IMPORTS ===
+import os                                                 # Clave de conexión por variable de entorno
+import sys                                                # Intérprete y argumentos de los procesos trabajadores
+import time                                               # Latidos, backoff de reinicio
+import threading                                          # Conexiones, eventos y chequeo de salud
+import subprocess                                         # Un proceso trabajador por cámara (o por grupo de cámaras)
+from multiprocessing.connection import Listener, Client   # Canal local autenticado supervisor ↔ trabajadores
+import cv2                                                # Hilos de OpenCV por proceso
+
+INTERVALO_LATIDO_S = 1                                    # Cada cuánto cada trabajador informa sus latidos
+INTERVALO_METRICAS_S = 15                                 # Cada cuánto cada cámara envía sus métricas
+VARIABLE_CLAVE = "VIGILANCIA_CLAVE"                       # Clave de la conexión (no va en la línea de comandos)
+
+
+# ============================ PROCESO TRABAJADOR ============================
+def trabajador(direccion, grupo, clave):
+    """
+    Punto de entrada de cada proceso trabajador: se conecta al supervisor, recibe sus
+    cámaras y parámetros, corre la vigilancia de cada una y le envía avisos, latidos y
+    métricas. La galería se mapea del disco en modo lectura y sólo se vuelve a mapear
+    cuando el supervisor anuncia una revisión nueva. Termina si se pierde la conexión.
+    """
+    from lector_camara import LectorCamaraDual            # Sólo en los trabajadores: el supervisor no carga modelos
+    from almacen_embeddings import AlmacenEmbeddings
+    from metricas import Metricas
+    from vigilancia_camara import VigilanciaCamara
+    from escritor_imagenes import codificar_jpeg
+
+    conexion = Client(direccion, authkey=clave)
+    lock_envio = threading.Lock()
+
+    def enviar(mensaje):
+        with lock_envio:
+            conexion.send(mensaje)
+
+    enviar({"tipo": "hola", "grupo": grupo, "pid": os.getpid()})
+    config = conexion.recv()
+    cv2.setNumThreads(1)                                  # El paralelismo lo dan los procesos
+
+    galeria = config["galeria"]
+    almacen = AlmacenEmbeddings(galeria["directorio"], indice=galeria["indice"], nprobe=galeria["nprobe"],
+                                guardar_indice=False)
+    revision = {"anunciada": config["revision"], "cargada": None}
+
+    def recargar():
+        if revision["anunciada"] != revision["cargada"] or almacen.esperando_ivf:   # O falta el índice IVF guardado
+            revision["cargada"] = revision["anunciada"]
+            almacen.actualizar()
+
+    def al_conocido(persona, recorte, hora, camara):
+        foto = codificar_jpeg(recorte)                    # Viaja como bytes: ni el trabajador ni el supervisor tocan el disco
+        if foto is not None:
+            enviar({"tipo": "conocido", "camara": camara, "nombre": persona, "foto": foto, "hora": hora})
+
+    recargar()
+    vigilancias = {}
+    for camara in config["camaras"]:
+        nombre = camara["nombre"]
+
+        def al_desconocido(desconocido, camara=nombre):
+            vigilancias[camara].desconocidos_recientes.agregar(desconocido["id"], desconocido["encodings"])
+            enviar({"tipo": "desconocido", "camara": camara, "desconocido": dict(desconocido, camara=camara)})
+
+        vigilancias[nombre] = VigilanciaCamara(
+            camara, LectorCamaraDual(camara["rtsp"], camara["rtsp_sub"]), almacen, config["directorio_desconocidos"],
+            al_conocido, al_desconocido, metricas=Metricas(),
+            parametros=dict(config["parametros"], prefijo_desconocidos=f"desconocido_{nombre}"),
+            recargar_galeria=recargar)
+
+    def escuchar():
+        try:
+            while True:
+                mensaje = conexion.recv()
+                if mensaje["tipo"] == "revision":
+                    revision["anunciada"] = mensaje["valor"]
+                elif mensaje["tipo"] == "eliminar":       # Desconocido ya resuelto por el usuario (Sí/No)
+                    for vigilancia in vigilancias.values():
+                        vigilancia.desconocidos_recientes.eliminar(mensaje["id"])
+        except (EOFError, OSError):
+            pass
+        print(f"[🔌] Trabajador {grupo}: se perdió la conexión con el supervisor")
+        os._exit(1)
+
+    threading.Thread(target=escuchar, daemon=True).start()
+    for vigilancia in vigilancias.values():
+        vigilancia.camara.iniciar()
+        threading.Thread(target=vigilancia.ejecutar, name=f"vigilancia-{vigilancia.nombre}", daemon=True).start()
+
+    ultimo_envio = 0.0
+    while True:
+        enviar({"tipo": "latido", "latidos": {n: v.latido for n, v in vigilancias.items()}})
+        if time.time() - ultimo_envio >= INTERVALO_METRICAS_S:
+            for nombre, vigilancia in vigilancias.items():
+                datos = vigilancia.metricas.como_dict()
+                datos["conectada"] = bool(vigilancia.camara.conectado)
+                enviar({"tipo": "metricas", "camara": nombre, "datos": datos})
+            ultimo_envio = time.time()
+        time.sleep(INTERVALO_LATIDO_S)
+
+
+# ================================ SUPERVISOR ================================
+class Supervisor:
+    """
+    Corre la vigilancia de varias cámaras en procesos separados (uno por cámara, o
+    'procesos' procesos con las cámaras repartidas), así la detección de cada cámara
+    usa su propio núcleo sin pelear por el GIL. Vive dentro del proceso principal
+    (cap_rostro.py), junto al bot y al notificador.
+    - Trabajadores: intérpretes nuevos ('python supervisor.py --trabajador'), que sólo
+      cargan lo necesario para detectar; se comunican por un socket local autenticado.
+    - Galería: todos mapean la misma galería empaquetada en modo lectura (una sola copia
+      en memoria vía page cache). La mantiene el proceso principal; publicar_revision()
+      avisa a los trabajadores que la vuelvan a mapear.
+    - Eventos: los avisos de conocidos (JPEG en memoria) y los desconocidos ya recolectados
+      se entregan a 'al_conocido(nombre, foto, hora, camara)' / 'al_desconocido(desconocido)'.
+    - Salud: cada cámara envía un latido; un proceso que terminó o cuyas cámaras no avanzan
+      hace más de 'latido_max' segundos se reinicia, con espera creciente si vuelve a fallar
+      enseguida. 'al_aviso(texto)' recibe los avisos de reinicio.
+    """
+
+    def __init__(self, camaras, directorio_galeria, directorio_desconocidos, al_conocido, al_desconocido,
+                 parametros=None, procesos=None, indice="auto", nprobe=8, latido_max=60.0, al_aviso=None,
+                 metricas=None):
+        self.camaras = camaras
+        self.directorio_desconocidos = directorio_desconocidos
+        self.al_conocido = al_conocido
+        self.al_desconocido = al_desconocido
+        self.al_aviso = al_aviso
+        self.latido_max = latido_max                      # Segundos sin avance antes de reiniciar un proceso
+        self.galeria = {"directorio": directorio_galeria, "indice": indice, "nprobe": nprobe}
+
+        # Cámaras de cada proceso
+        cantidad = min(len(camaras), procesos or len(camaras))
+        self.grupos = [[camaras[j] for j in range(i, len(camaras), cantidad)] for i in range(cantidad)]
+
+        # Núcleos repartidos entre los procesos
+        parametros = dict(parametros or {})
+        parametros["trabajadores_deteccion"] = max(1, (os.cpu_count() or 2) // len(camaras))
+        parametros["trabajadores_codificacion"] = 1
+        self.parametros = parametros
+
+        self._clave = os.urandom(16)
+        self._listener = None
+        self._revision = None
+        self._lock = threading.Lock()
+        self._procesos = [None] * cantidad                # subprocess.Popen de cada grupo
+        self._conexiones = [None] * cantidad
+        self._inicios = [0.0] * cantidad
+        self._reinicios = [0] * cantidad
+        self._fallos_seguidos = [0] * cantidad
+        self._proximo_intento = [0.0] * cantidad
+        self._latidos = {}                                # Cámara → último avance informado
+        self._metricas_camaras = {}                       # Cámara → (recibido, última métrica)
+        self._activo = False
+
+        if metricas is not None:
+            metricas.registrar_medidor("camaras", lambda: len(self.camaras))
+            metricas.registrar_medidor("procesos_camaras_vivos", self.vivos, "Procesos trabajadores en marcha")
+            metricas.registrar_medidor("procesos_camaras_reinicios", lambda: sum(self._reinicios))
+            # Lo que cada trabajador informa, por cámara (lo mismo que muestra resumen())
+            por_camara = lambda clave: lambda: {c["camara"]: c[clave] for c in self.estado()}
+            for nombre, clave, ayuda in (
+                    ("camara_frames_procesados", "frames", "Frames procesados por la cámara"),
+                    ("camara_latencia_p95_segundos", "latencia_p95", "p95 reciente de la latencia del pipeline"),
+                    ("camara_reinicios", "reinicios", "Reinicios del proceso de la cámara"),
+                    ("camara_latido_segundos", "latido_s", "Segundos desde el último avance del pipeline"),
+                    ("camara_conectada", "conectada", "1 si el stream de la cámara está conectado"),
+                    ("camara_proceso_vivo", "vivo", "1 si el proceso de la cámara está en marcha")):
+                metricas.registrar_medidor_etiquetado(nombre, "camara", por_camara(clave), ayuda)
+
+    # ------------------------------ ciclo de vida ------------------------------
+    def iniciar(self):
+        self._listener = Listener(("127.0.0.1", 0), authkey=self._clave)
+        self._activo = True
+        threading.Thread(target=self._aceptar, daemon=True).start()
+        for i in range(len(self.grupos)):
+            self._lanzar(i)
+        threading.Thread(target=self._vigilar, daemon=True).start()
+        print(f"[🎥] Supervisor: {len(self.camaras)} cámaras en {len(self.grupos)} procesos")
+        return self
+
+    def detener(self, timeout=5):
+        self._activo = False
+        for proceso in self._procesos:
+            if proceso is not None and proceso.poll() is None:
+                proceso.terminate()
+        for proceso in self._procesos:
+            if proceso is not None:
+                try:
+                    proceso.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    proceso.kill()
+        if self._listener is not None:
+            self._listener.close()
+
+    def publicar_revision(self, revision):
+        """
+        Avisa a los trabajadores que la galería cambió (la vuelven a mapear en su próxima recarga).
+        """
+        if revision == self._revision:
+            return
+        self._revision = revision
+        for i in range(len(self.grupos)):
+            self._enviar(i, {"tipo": "revision", "valor": revision})
+
+    def olvidar_desconocido(self, identidad):
+        """
+        Quita un desconocido del caché de desconocidos recientes de cada trabajador.
+        """
+        for i in range(len(self.grupos)):
+            self._enviar(i, {"tipo": "eliminar", "id": identidad})
+
+    def _lanzar(self, i):
+        ahora = time.time()
+        for camara in self.grupos[i]:
+            self._latidos[camara["nombre"]] = ahora       # Gracia de arranque hasta el primer latido real
+        host, puerto = self._listener.address
+        comando = [sys.executable, os.path.abspath(__file__), "--trabajador", f"{host}:{puerto}", str(i)]
+        self._procesos[i] = subprocess.Popen(comando, env=dict(os.environ, **{VARIABLE_CLAVE: self._clave.hex()}))
+        self._inicios[i] = ahora
+
+    # ------------------------------- conexiones -------------------------------
+    def _enviar(self, i, mensaje):
+        with self._lock:
+            conexion = self._conexiones[i]
+            if conexion is None:
+                return
+            try:
+                conexion.send(mensaje)
+            except (OSError, EOFError):
+                self._conexiones[i] = None
+
+    def _aceptar(self):
+        while self._activo:
+            try:
+                conexion = self._listener.accept()
+            except OSError:
+                return                                    # Listener cerrado
+            except Exception as e:
+                print(f"[⚠️] Conexión rechazada: {e}")      # Clave incorrecta, etc.
+                continue
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        """
+        Saluda a un trabajador, le envía su configuración y procesa sus mensajes.
+        """
+        try:
+            hola = conexion.recv()
+            i = hola["grupo"]
+            with self._lock:
+                self._conexiones[i] = conexion
+                conexion.send({"camaras": self.grupos[i], "parametros": self.parametros, "galeria": self.galeria,
+                               "directorio_desconocidos": self.directorio_desconocidos, "revision": self._revision})
+            while True:
+                mensaje = conexion.recv()
+                try:
+                    self._procesar(mensaje)
+                except Exception as e:
+                    print(f"[💥] Error procesando un evento de {mensaje.get('camara')}: {e}")
+        except (EOFError, OSError):
+            pass                                          # El trabajador terminó; lo detecta _vigilar()
+
+    def _procesar(self, mensaje):
+        tipo = mensaje["tipo"]
+        if tipo == "latido":
+            self._latidos.update(mensaje["latidos"])
+        elif tipo == "conocido":
+            self.al_conocido(mensaje["nombre"], mensaje["foto"], mensaje["hora"], mensaje["camara"])
+        elif tipo == "desconocido":
+            self.al_desconocido(mensaje["desconocido"])
+        elif tipo == "metricas":
+            self._metricas_camaras[mensaje["camara"]] = (time.time(), mensaje["datos"])
+
+    # ---------------------------------- salud ----------------------------------
+    def vivos(self):
+        return sum(1 for p in self._procesos if p is not None and p.poll() is None)
+
+    def _vigilar(self):
+        while self._activo:
+            time.sleep(5)
+            ahora = time.time()
+            for i, proceso in enumerate(self._procesos):
+                if not self._activo:
+                    return
+                nombres = ", ".join(c["nombre"] for c in self.grupos[i])
+                motivo = None
+                if proceso is not None and proceso.poll() is None:
+                    quieto = ahora - min(self._latidos[c["nombre"]] for c in self.grupos[i])
+                    if quieto <= self.latido_max:
+                        if ahora - self._inicios[i] > 600:
+                            self._fallos_seguidos[i] = 0  # Estable: se olvidan los fallos anteriores
+                        continue
+                    motivo = f"sin avanzar hace {quieto:.0f}s"
+                    proceso.kill()
+                    proceso.wait()
+                elif proceso is not None:
+                    motivo = f"terminó con código {proceso.returncode}"
+
+                if motivo is not None:
+                    self._procesos[i] = None
+                    self._fallos_seguidos[i] += 1
+                    espera = min(300, 5 * 2 ** (self._fallos_seguidos[i] - 1))
+                    self._proximo_intento[i] = ahora + espera
+                    print(f"[🚑] Proceso de {nombres} {motivo}; se reinicia en {espera}s")
+                    if self.al_aviso is not None:
+                        self.al_aviso(f"⚠️ Vigilancia de {nombres} {motivo}. Reiniciando...")
+                if self._procesos[i] is None and ahora >= self._proximo_intento[i]:
+                    self._reinicios[i] += 1
+                    self._lanzar(i)
+
+    def estado(self):
+        """
+        Estado de cada cámara: proceso, latido, reinicios y últimas métricas recibidas.
+        """
+        ahora = time.time()
+        estado = []
+        for i, camaras in enumerate(self.grupos):
+            proceso = self._procesos[i]
+            for camara in camaras:
+                nombre = camara["nombre"]
+                recibido, datos = self._metricas_camaras.get(nombre, (None, {}))
+                estado.append({
+                    "camara": nombre,
+                    "pid": proceso.pid if proceso is not None else None,
+                    "vivo": proceso is not None and proceso.poll() is None,
+                    "latido_s": ahora - self._latidos.get(nombre, ahora),
+                    "reinicios": self._reinicios[i],
+                    "conectada": datos.get("conectada"),
+                    "frames": datos.get("contadores", {}).get("frames_procesados", 0),
+                    "latencia_p95": datos.get("etapas", {}).get("latencia_pipeline", {}).get("p95"),
+                    "metricas_s": ahora - recibido if recibido else None,
+                })
+        return estado
+
+    def resumen(self):
+        """
+        Resumen legible (para /stats) del estado de cada cámara.
+        """
+        lineas = ["🎥 Cámaras:"]
+        for c in self.estado():
+            icono = "🟢" if c["vivo"] and c["conectada"] else ("🟡" if c["vivo"] else "🔴")
+            p95 = f"{1000 * c['latencia_p95']:.0f} ms" if c["latencia_p95"] is not None else "-"
+            lineas.append(f"  {icono} {c['camara']}: {c['frames']} frames, p95 {p95}, "
+                          f"latido hace {c['latido_s']:.0f}s, {c['reinicios']} reinicios")
+        return "\n".join(lineas)
+
+
+# Proceso trabajador: python supervisor.py --trabajador <host:puerto> <grupo> (lo lanza Supervisor)
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "--trabajador" or VARIABLE_CLAVE not in os.environ:
+        print("Este módulo lo usa cap_rostro.py cuando camaras.json define varias cámaras.")
+        sys.exit(1)
+    host, puerto = sys.argv[2].rsplit(":", 1)
+    trabajador((host, int(puerto)), int(sys.argv[3]), bytes.fromhex(os.environ[VARIABLE_CLAVE]))
@@ -0,0 +1,56 @@
+# === IMPORTS ===
+import queue                                              # Cola de trabajos de enrolamiento
+import threading                                          # Hilo trabajador de larga vida
+from concurrent.futures import Future                     # Resultado de cada trabajo (compatible con asyncio.wrap_future)
+
+
+class TrabajadorEnrolamiento:
+    """
+    Hilo de larga vida que procesa altas de personas dentro del mismo proceso,
+    con los modelos ya cargados y el pool de embeddings caliente.
+    'encolar(nombre)' retorna un Future que se resuelve con el resultado de
+    'funcion_enrolar(nombre)' (p. ej. la revisión de la galería ya publicada)
+    o con la excepción que haya ocurrido.
+    """
+
+    def __init__(self, funcion_enrolar):
+        self.funcion_enrolar = funcion_enrolar            # Recibe un nombre y retorna el resultado del alta
+        self._cola = queue.Queue()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._cola.put(None)                              # Marca de fin
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+
+    def encolar(self, nombre):
+        """
+        Agrega un trabajo de enrolamiento. Retorna un concurrent.futures.Future.
+        """
+        futuro = Future()
+        self._cola.put((nombre, futuro))
+        return futuro
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def _bucle(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                break
+            nombre, futuro = trabajo
+            if not futuro.set_running_or_notify_cancel():
+                continue                                  # Cancelado antes de empezar
+            try:
+                futuro.set_result(self.funcion_enrolar(nombre))
+            except Exception as e:
+                print(f"[💥] Error en enrolamiento de {nombre}: {e}")
+                futuro.set_exception(e)
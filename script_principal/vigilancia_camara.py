@@ -0,0 +1,352 @@
+# === IMPORTS ===
+import time                                               # Pausas, latido y latencia de punta a punta
+import cv2                                                # Conversión a RGB para medir el giro de los rostros a verificar
+from datetime import datetime, timedelta                  # Hora de cada detección y demora entre avisos
+
+from lector_camara import escalar_caja                    # Cajas del substream al stream principal
+from deteccion_rostros import ubicaciones_rostros, recortes_para_codificar, codificar_recortes   # Detección y encoding por separado
+from seguimiento import Rastreador                        # Tracks persistentes: encoding sólo al iniciar o re-verificar
+from detector_movimiento import DetectorMovimiento        # Compuerta por movimiento: evita HOG con la escena quieta
+from zonas import ZonasCamara                             # Zonas de interés y de exclusión de la cámara
+from calidad import evaluar_calidad                       # Compuerta de calidad antes del encoding
+from escritor_imagenes import EscritorImagenes            # Capturas de desconocidos a disco en segundo plano
+from recolector_desconocidos import RecolectorDesconocidos  # Capturas de desconocidos sin frenar la detección
+from cache_desconocidos import CacheDesconocidos          # Desconocidos recientes: matriz con TTL y búsqueda en lote
+from pipeline import Pipeline, Etapa                      # Etapas en hilos unidas por colas acotadas
+
+# Parámetros de la vigilancia (cap_rostro.py los completa con sus constantes)
+PARAMETROS_POR_DEFECTO = {
+    "tolerancia": 0.4,                                    # Distancia máxima para considerar un rostro como conocido
+    "demora_notificacion_min": 5,                         # Minutos mínimos entre avisos de una misma persona
+    "capturas_desconocido": 20,                           # Imágenes a juntar por cada desconocido
+    "candidatas_desconocido": 30,                         # Capturas evaluadas por desconocido (se guardan las mejores)
+    "criterios_calidad": None,                            # Umbrales de calidad (ver calidad.py; None = por defecto)
+    "espaciado_capturas_s": 2,                            # Segundos mínimos entre capturas de un mismo desconocido
+    "limite_recoleccion_s": 90,                           # Tiempo máximo para juntar las capturas de un desconocido
+    "reverificar_track_s": 10,                            # Cada cuántos segundos se vuelve a codificar un rostro seguido
+    "area_movimiento_min": 0.005,                         # Fracción del frame que debe cambiar para correr la detección
+    "rechequeo_reposo_s": 10,                             # Con la escena quieta, un frame completo cada N segundos
+    "ttl_desconocidos_s": 7200,                           # Tiempo que se recuerda a un desconocido
+    "max_encodings_desconocidos": 10000,                  # Tope de encodings de desconocidos en memoria
+    "pausa_entre_frames_s": 0.2,                          # Intervalo mínimo entre frames tomados de la cámara
+    "recarga_galeria_s": 10,                              # Cada cuántos segundos se llama a 'recargar_galeria'
+    "trabajadores_deteccion": 1,                          # Detecciones en paralelo
+    "trabajadores_codificacion": 1,                       # Encodings en paralelo
+    "capacidad_colas": 2,                                 # Elementos en espera entre dos etapas
+    "politica_colas": "descartar_viejo",                  # "descartar_viejo" o "bloquear"
+    "prefijo_desconocidos": "desconocido",                # IDs de desconocidos: <prefijo>_<n>
+}
+
+
+class VigilanciaCamara:
+    """
+    Vigilancia de una cámara como pipeline: captura → detección → seguimiento →
+    codificación → acciones. Cada etapa corre en sus propios hilos (detección y
+    codificación con varios trabajadores) y las une una cola acotada; con la política
+    "descartar_viejo" una etapa lenta pierde los frames más viejos en lugar de acumular atraso.
+    Lo que no es de la cámara se delega en callbacks:
+        - al_conocido(nombre, recorte, hora, camara): persona de la galería (ya pasada la
+          demora mínima entre avisos de esta cámara)
+        - al_desconocido(desconocido): desconocido con sus capturas ya recolectadas
+    'almacen' es un AlmacenEmbeddings (se lee 'almacen.galeria' en cada frame) y
+    'recargar_galeria' se llama periódicamente para sincronizarlo.
+    Con 'pool' (ProcessPoolExecutor), la detección y el encoding corren en otros procesos.
+    Los frames y recortes quedan en memoria; sólo las capturas de desconocidos van a disco,
+    por lotes, a través de 'escritor' (EscritorImagenes).
+    'latido' marca la última vez que el pipeline avanzó (para los chequeos de salud).
+    """
+
+    def __init__(self, config, camara, almacen, directorio_desconocidos, al_conocido, al_desconocido,
+                 metricas=None, parametros=None, desconocidos_recientes=None, recargar_galeria=None, pool=None,
+                 escritor=None):
+        self.config = config                              # Ajustes de la cámara (camaras.json)
+        self.nombre = config["nombre"]
+        self.camara = camara                              # LectorCamaraDual o FuenteReplay
+        self.almacen = almacen
+        self.al_conocido = al_conocido
+        self.al_desconocido = al_desconocido
+        self.metricas = metricas
+        self.recargar_galeria = recargar_galeria
+        self.pool = pool
+        self.parametros = p = dict(PARAMETROS_POR_DEFECTO, **(parametros or {}))
+
+        self.movimiento = DetectorMovimiento(area_min=p["area_movimiento_min"], rechequeo=p["rechequeo_reposo_s"])
+        self.escritor = escritor or EscritorImagenes(metricas=metricas).iniciar()
+        self.zonas = ZonasCamara(config.get("zonas"), config.get("exclusiones"))
+        self.rastreador = Rastreador(reverificar=p["reverificar_track_s"])
+        self.recolector = RecolectorDesconocidos(directorio_desconocidos, al_desconocido,
+                                                 cantidad=p["capturas_desconocido"], espaciado=p["espaciado_capturas_s"],
+                                                 limite=p["limite_recoleccion_s"], tolerancia=p["tolerancia"],
+                                                 candidatas=p["candidatas_desconocido"], escritor=self.escritor)
+        if desconocidos_recientes is None:
+            desconocidos_recientes = CacheDesconocidos(capacidad=p["max_encodings_desconocidos"],
+                                                       ttl=p["ttl_desconocidos_s"], tolerancia=p["tolerancia"])
+        self.desconocidos_recientes = desconocidos_recientes
+        self.ultima_notificacion = {}                     # Último aviso por persona (en esta cámara)
+        self.contador_desconocidos = 1                    # ID incremental de desconocidos (se reinicia cada día)
+        self.fecha_contador = datetime.now().date()
+        self.activa = True                                # False pausa la captura
+        self.latido = time.time()
+        self.pipeline = None
+
+        if metricas is not None:
+            metricas.registrar_medidor("recolecciones_activas", self.recolector.activos)
+            metricas.registrar_medidor("tracks_activos", lambda: len(self.rastreador.activos()))
+            metricas.registrar_medidor("camara_conectada", lambda: self.camara.conectado)
+
+    # ------------------------------ métricas ------------------------------
+    def _contar(self, nombre, n=1):
+        if self.metricas is not None:
+            self.metricas.contar(nombre, n)
+
+    def _observar(self, nombre, segundos):
+        if self.metricas is not None:
+            self.metricas.observar(nombre, segundos)
+
+    def _medir(self, nombre, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            self._observar(nombre, time.perf_counter() - inicio)
+
+    def _ejecutar(self, funcion, *args):
+        """
+        Corre 'funcion' en el pool de procesos (si hay) o en el hilo actual.
+        """
+        if self.pool is None:
+            return funcion(*args)
+        return self.pool.submit(funcion, *args).result()
+
+    # ------------------------------ etapas ------------------------------
+    def frames(self):
+        """
+        Fuente del pipeline: toma el frame más reciente del lector (nunca uno ya visto), lo
+        filtra por movimiento, acota las regiones a buscar a las zonas de la cámara y lo
+        entrega como trabajo para la detección. Con rostros en seguimiento el filtro de
+        movimiento no se aplica. También recarga la galería periódicamente.
+        Termina cuando la cámara termina (fin del video en modo replay).
+        """
+        p = self.parametros
+        ultima_carga = time.time()                       # Marca de última recarga de embeddings
+        ultimo_frame = 0                                 # Número del último frame tomado
+        proximo = 0.0
+        tiempo_frame = getattr(self.camara, "tiempo_frame", None)   # Replay: tiempo del video de cada frame
+        instante = None                                  # Reloj de la recolección (None = time.time())
+
+        while True:
+            if not self.activa:
+                self.latido = time.time()
+                time.sleep(1)                            # Pausa si la vigilancia está desactivada
+                continue
+
+            # Recarga periódica de base de rostros (embeddings)
+            if self.recargar_galeria is not None and time.time() - ultima_carga > p["recarga_galeria_s"]:
+                self.recargar_galeria()                  # Sólo relee lo que cambió
+                ultima_carga = time.time()
+
+            espera = proximo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            proximo = time.perf_counter() + p["pausa_entre_frames_s"]
+
+            info = self._medir("captura", self.camara.esperar_frame, ultimo_frame, 1)   # Enseguida si ya hay uno nuevo
+            if info is None:
+                if self.camara.terminado:
+                    return                               # Fin del video en modo replay
+                self.latido = time.time()
+                self.recolector.procesar([], instante)   # Cámara conectando: cierra recolecciones vencidas
+                continue
+
+            marca, numero, frame = info
+            instante = tiempo_frame(numero) if tiempo_frame is not None else marca
+            self._contar("frames_procesados")
+            if ultimo_frame and numero > ultimo_frame + 1:
+                self._contar("frames_salteados", numero - ultimo_frame - 1)   # Llegaron mientras se procesaba el anterior
+            ultimo_frame = numero
+            self._observar("antiguedad_frame", time.time() - marca)
+
+            pasa, regiones = self._medir("movimiento", self.movimiento.evaluar, frame,
+                                         bool(self.rastreador.activos()))   # Compuerta barata antes de HOG
+            if not pasa:
+                self._contar("frames_sin_movimiento")
+                self.latido = time.time()
+                self.recolector.procesar([], instante)   # Escena sin cambios: no se corre HOG
+                continue
+
+            regiones = self.zonas.regiones(regiones, *frame.shape[:2])
+            if regiones == []:
+                self._contar("frames_fuera_de_zona")
+                self.latido = time.time()
+                self.recolector.procesar([], instante)   # Sólo cambió algo fuera de las zonas
+                continue
+
+            yield {"marca": marca, "instante": instante, "numero": numero, "frame": frame, "regiones": regiones}
+
+    def _detectar(self, trabajo):
+        """
+        Detecta las ubicaciones de los rostros (sin encodings) con el detector de la cámara:
+        sólo sobre lo que cambió, en resolución reducida; las cajas vuelven a resolución completa.
+        """
+        trabajo["ubicaciones"] = self._medir(
+            "deteccion", self._ejecutar, ubicaciones_rostros, trabajo["frame"], self.config["detector"],
+            trabajo["regiones"], self.config["escala_deteccion"], self.config["upsample_si_vacio"])
+        trabajo["ubicaciones"], descartados = self.zonas.filtrar(trabajo["ubicaciones"], *trabajo["frame"].shape[:2])
+        if descartados:
+            self._contar("rostros_fuera_de_zona", descartados)   # No se siguen ni se codifican
+        self._contar("rostros_detectados", len(trabajo["ubicaciones"]))
+        return trabajo
+
+    def _seguir(self, trabajo):
+        """
+        Asocia las detecciones con los tracks (en orden de frame) y decide cuáles codificar:
+        sólo los nuevos o a re-verificar. Busca además el frame del stream principal para
+        recortes y encodings en alta resolución.
+        """
+        ubicaciones = trabajo["ubicaciones"]
+        tracks, a_verificar, eventos = self.rastreador.actualizar(ubicaciones, reservar=2.0)   # Su encoding viaja por el pipeline
+        for tipo, track in eventos:
+            if tipo == "fin":
+                print(f"[👣] {self.nombre}: track {track['id']} ({track['nombre'] or 'desconocido'}) salió de escena "
+                      f"tras {track['visto'] - track['inicio']:.0f}s")
+
+        # Frame del stream principal si hay uno reciente; si no (stream principal abriéndose
+        # o sin substream) el mismo frame de detección
+        frame = trabajo["frame"]
+        frame_hd, ubicaciones_hd = frame, ubicaciones
+        if ubicaciones:
+            principal = self.camara.frame_principal(frame)
+            if principal is not None and principal[0] is not frame:
+                frame_hd, factor_y, factor_x = principal
+                ubicaciones_hd = [escalar_caja(loc, factor_y, factor_x) for loc in ubicaciones]
+
+        trabajo.update(tracks=tracks, a_verificar=a_verificar, frame_hd=frame_hd, ubicaciones_hd=ubicaciones_hd)
+        return trabajo
+
+    def _codificar(self, trabajo):
+        """
+        Puntúa la calidad de cada rostro (tamaño, nitidez, luz; el giro sólo en los que hay
+        que verificar) y calcula en alta resolución los encodings de los que la pasan. Los
+        que no, se posponen: su track se vuelve a pedir en el próximo frame.
+        """
+        a_verificar = trabajo["a_verificar"]
+        frame_hd = trabajo["frame_hd"]
+        rgb_hd = cv2.cvtColor(frame_hd, cv2.COLOR_BGR2RGB) if a_verificar else None   # Sólo para medir el giro
+        verificar = set(a_verificar)
+        criterios = self.parametros["criterios_calidad"]
+        trabajo["calidades"] = self._medir("calidad", lambda: [
+            evaluar_calidad(frame_hd, loc, criterios, rgb_hd if i in verificar else None)
+            for i, loc in enumerate(trabajo["ubicaciones_hd"])])
+        trabajo["a_codificar"] = [i for i in a_verificar if trabajo["calidades"][i]["apto"]]
+        for i in a_verificar:
+            if not trabajo["calidades"][i]["apto"]:
+                self._contar(f"rostros_descartados_{trabajo['calidades'][i]['motivo']}")   # No se paga el encoding
+        ubicaciones = [trabajo["ubicaciones_hd"][i] for i in trabajo["a_codificar"]]
+        # Al encoding (en el pool, si hay) viajan sólo los recortes de los rostros, no el frame
+        encodings = self._medir(
+            "codificacion", lambda: self._ejecutar(codificar_recortes, recortes_para_codificar(frame_hd, ubicaciones))
+            if ubicaciones else [])
+        trabajo["codificados"] = [{"ubicacion": (t, r, b, l), "encoding": enc, "recorte": frame_hd[t:b, l:r]}
+                                  for (t, r, b, l), enc in zip(ubicaciones, encodings)]
+        self._contar("rostros_codificados", len(trabajo["codificados"]))
+        return trabajo
+
+    def _acciones(self, trabajo):
+        """
+        Compara los rostros codificados contra la galería, alimenta el recolector de desconocidos
+        y actúa: aviso de conocidos (con demora mínima por persona) y alta de desconocidos.
+        """
+        ahora = datetime.now()
+
+        # Reinicio diario del contador de desconocidos
+        if ahora.date() != self.fecha_contador:
+            est = self.desconocidos_recientes.estadisticas()
+            print(f"[🧠] Desconocidos recientes: {est['entradas']} encodings de {est['identidades']} personas, "
+                  f"{est['memoria_bytes'] / 1e6:.1f} MB, aciertos {est['tasa_aciertos']:.0%} de {est['consultas']} consultas")
+            self.contador_desconocidos = 1
+            self.fecha_contador = ahora.date()
+
+        tracks, codificados, frame_hd = trabajo["tracks"], trabajo["codificados"], trabajo["frame_hd"]
+        # Comparación de los rostros codificados contra la galería en un solo cálculo
+        resultados = self._medir("comparacion", self.almacen.galeria.identificar,
+                                 [r["encoding"] for r in codificados], self.parametros["tolerancia"])
+        encodings_frame = {}
+        for i, rostro, resultado in zip(trabajo["a_codificar"], codificados, resultados):
+            self.rastreador.asignar(tracks[i], rostro["encoding"], resultado)
+            encodings_frame[i] = rostro["encoding"]
+        for i in set(trabajo["a_verificar"]) - set(trabajo["a_codificar"]):
+            self.rastreador.liberar(tracks[i])           # Baja calidad: se reintenta con el próximo frame
+
+        rostros = []
+        for i, (loc, track) in enumerate(zip(trabajo["ubicaciones"], tracks)):
+            top, right, bottom, left = trabajo["ubicaciones_hd"][i]
+            rostros.append({
+                "ubicacion": loc,
+                "recorte": frame_hd[top:bottom, left:right],
+                "track": track["id"],
+                "encoding": encodings_frame.get(i),      # None si este frame no se codificó
+                "calidad": trabajo["calidades"][i]["puntaje"],
+                "apto": trabajo["calidades"][i]["apto"],
+            })
+        # Suma capturas a los desconocidos en recolección
+        self._medir("recoleccion", self.recolector.procesar, rostros, trabajo["instante"])
+        if rostros:
+            self._actuar(rostros, tracks, ahora, trabajo["instante"])
+        self._observar("latencia_pipeline", time.time() - trabajo["marca"])   # Desde la captura del frame
+        self.latido = time.time()
+
+    def _actuar(self, rostros, tracks, ahora, instante):
+        """
+        Avisa de los conocidos que no se avisaron recientemente e inicia la recolección
+        de los desconocidos nuevos.
+        """
+        demora = timedelta(minutes=self.parametros["demora_notificacion_min"])
+
+        # Desconocidos recién verificados: una sola búsqueda en lote contra los desconocidos recientes
+        nuevos = [i for i, track in enumerate(tracks) if track["nombre"] is None and rostros[i]["encoding"] is not None]
+        repetidos = {i: dueno is not None for i, (dueno, _) in
+                     zip(nuevos, self.desconocidos_recientes.buscar([rostros[i]["encoding"] for i in nuevos]))}
+
+        for i, (rostro, track) in enumerate(zip(rostros, tracks)):
+            enc = rostro["encoding"]
+            if track["nombre"] is not None:
+                name = track["nombre"]
+                ultima = self.ultima_notificacion.get(name)
+
+                # Avisa si no fue detectado recientemente
+                if not ultima or ahora - ultima > demora:
+                    self.ultima_notificacion[name] = ahora
+                    self.al_conocido(name, rostro["recorte"], ahora, self.nombre)
+
+            elif enc is not None:
+                # Desconocido recién verificado: ¿ya fue detectado como desconocido recientemente?
+                if repetidos[i]:
+                    continue
+
+                # Ya se están juntando imágenes de este rostro
+                if self.recolector.sigue_a(enc, track["id"]):
+                    continue
+
+                # Nuevo desconocido: las capturas se juntan en segundo plano con los próximos frames
+                desconocido_id = f"{self.parametros['prefijo_desconocidos']}_{self.contador_desconocidos}"
+                self.recolector.iniciar(desconocido_id, rostro, ahora, instante)
+                self._contar("desconocidos_nuevos")
+                self.contador_desconocidos += 1
+
+    # ------------------------------ ciclo de vida ------------------------------
+    def ejecutar(self):
+        """
+        Arma el pipeline y lo corre hasta que se agote la fuente (fin del video en modo replay).
+        """
+        p = self.parametros
+        politica, capacidad = p["politica_colas"], p["capacidad_colas"]
+        self.pipeline = Pipeline(self.frames(), [
+            Etapa("deteccion", self._detectar, p["trabajadores_deteccion"], capacidad, politica, ordenada=True),
+            Etapa("seguimiento", self._seguir, 1, capacidad, politica),
+            Etapa("codificacion", self._codificar, p["trabajadores_codificacion"], capacidad, politica, ordenada=True),
+            Etapa("acciones", self._acciones, 1, capacidad, politica),
+        ], metricas=self.metricas)
+        self.pipeline.iniciar()
+        self.pipeline.esperar()
+        self.recolector.cerrar_pendientes()              # Fuente agotada: cierra también las que no vencieron
+        self.escritor.vaciar()                           # Capturas pendientes a disco antes de terminar
@@ -0,0 +1,101 @@
+# === IMPORTS ===
+import cv2                                                # Rasterizado de los polígonos
+import numpy as np                                        # Máscara de zonas válidas
+
+from detector_movimiento import unir_cajas                # Une las regiones de búsqueda que se superponen
+
+
+def _validar(poligonos, clave):
+    validados = []
+    for poligono in poligonos or []:
+        puntos = np.asarray(poligono, dtype=np.float32)
+        if puntos.ndim != 2 or puntos.shape[1] != 2 or len(puntos) < 3:
+            raise ValueError(f"'{clave}': cada polígono necesita al menos 3 puntos [x, y]")
+        if puntos.min() < 0 or puntos.max() > 1:
+            raise ValueError(f"'{clave}': las coordenadas van de 0 a 1 (fracción del ancho y del alto)")
+        validados.append(puntos)
+    return validados
+
+
+class ZonasCamara:
+    """
+    Zonas de interés y de exclusión de una cámara, como polígonos con coordenadas
+    relativas (0–1) para que valgan igual en el substream y en el stream principal.
+    - 'zonas': sólo se busca dentro de ellas (None o vacío = todo el frame). La detección
+      corre sobre el rectángulo que contiene cada zona.
+    - 'exclusiones': áreas donde no se acepta un rostro (un televisor, un cartel, la calle).
+    Un rostro se descarta si su centro cae fuera de las zonas o dentro de una exclusión.
+    """
+
+    def __init__(self, zonas=None, exclusiones=None):
+        self.zonas = _validar(zonas, "zonas")
+        self.exclusiones = _validar(exclusiones, "exclusiones")
+        self._tamano = None
+        self._mascara = None                              # 1 = se puede buscar/aceptar un rostro
+        self._cajas = None                                # Rectángulos de las zonas (None = frame completo)
+
+    @property
+    def activas(self):
+        return bool(self.zonas or self.exclusiones)
+
+    def _preparar(self, alto, ancho):
+        if self._tamano == (alto, ancho):
+            return
+        escala = np.array([ancho - 1, alto - 1], dtype=np.float32)
+        a_pixeles = lambda poligono: np.round(poligono * escala).astype(np.int32)
+
+        if self.zonas:
+            mascara = np.zeros((alto, ancho), dtype=np.uint8)
+            cv2.fillPoly(mascara, [a_pixeles(p) for p in self.zonas], 1)
+            cajas = []
+            for poligono in self.zonas:
+                x, y, w, h = cv2.boundingRect(a_pixeles(poligono))
+                cajas.append((y, min(ancho, x + w), min(alto, y + h), x))
+            self._cajas = unir_cajas(cajas)
+        else:
+            mascara = np.ones((alto, ancho), dtype=np.uint8)
+            self._cajas = None
+        if self.exclusiones:
+            cv2.fillPoly(mascara, [a_pixeles(p) for p in self.exclusiones], 0)
+        self._mascara = mascara
+        self._tamano = (alto, ancho)
+
+    def regiones(self, regiones, alto, ancho):
+        """
+        Acota las regiones a buscar (cajas top, right, bottom, left; None = frame completo)
+        a los rectángulos de las zonas. Descarta las que no tocan ningún píxel válido
+        (p. ej. movimiento sólo en el televisor excluido). Retorna None (frame completo
+        sin zonas), o una lista que puede quedar vacía: no hay nada que buscar.
+        """
+        if not self.activas:
+            return regiones
+        self._preparar(alto, ancho)
+        if regiones is None:
+            if self._cajas is None and not self.exclusiones:
+                return None
+            regiones = self._cajas if self._cajas is not None else [(0, ancho, alto, 0)]
+        elif self._cajas is not None:
+            recortadas = []
+            for t, r, b, l in regiones:
+                for zt, zr, zb, zl in self._cajas:
+                    caja = (max(t, zt), min(r, zr), min(b, zb), max(l, zl))
+                    if caja[0] < caja[2] and caja[3] < caja[1]:
+                        recortadas.append(caja)
+            regiones = unir_cajas(recortadas)
+        return [(t, r, b, l) for t, r, b, l in regiones if self._mascara[t:b, l:r].any()]
+
+    def filtrar(self, ubicaciones, alto, ancho):
+        """
+        Separa las ubicaciones cuyo centro cae en una zona válida de las descartadas.
+        Retorna (aceptadas, cantidad de descartadas).
+        """
+        if not self.activas or not ubicaciones:
+            return ubicaciones, 0
+        self._preparar(alto, ancho)
+        aceptadas = []
+        for t, r, b, l in ubicaciones:
+            y = min(alto - 1, max(0, (t + b) // 2))
+            x = min(ancho - 1, max(0, (l + r) // 2))
+            if self._mascara[y, x]:
+                aceptadas.append((t, r, b, l))
+        return aceptadas, len(ubicaciones) - len(aceptadas)